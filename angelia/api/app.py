@@ -18,11 +18,12 @@ from angelia.api.exceptions import (
     ValidationError,
     uncaught_error_handler,
 )
-from angelia.api.helpers.vault import load_secrets
+from angelia.api.helpers.vault import load_secrets, secret_refresher
 from angelia.encryption import JweException
 from angelia.hermes.db import DB
 from angelia.report import api_logger  # noqa: F401
 from angelia.resources.urls import INTERNAL_END_POINTS, RESOURCE_END_POINTS
+from angelia.settings import settings
 
 
 def load_resources(app: falcon.App) -> None:
@@ -36,10 +37,12 @@ def create_app() -> falcon.App:
         middleware=[
             middleware.AzureRefMiddleware(),
             middleware.MetricMiddleware(),
+            middleware.QueryAccountingMiddleware(),
             middleware.SharedDataMiddleware(),
             middleware.DatabaseSessionManager(),
             middleware.AuthenticationMiddleware(),
             middleware.FailureEventMiddleware(),
+            middleware.ConditionalRequestMiddleware(),
         ],
     )
     app.add_error_handler(Exception, uncaught_error_handler)
@@ -65,4 +68,6 @@ def create_app() -> falcon.App:
 
     load_resources(app)
     load_secrets("all")
+    if settings.VAULT_REFRESH_ENABLED:
+        secret_refresher.start()
     return app
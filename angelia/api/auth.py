@@ -1,10 +1,12 @@
 import datetime
+import hashlib
+import time
 from abc import ABC, abstractmethod
 from base64 import b64decode
 from collections.abc import Callable
 from enum import Enum
 from functools import lru_cache, wraps
-from typing import Any, cast
+from typing import TYPE_CHECKING, Any, cast
 
 import falcon
 import jwt
@@ -23,10 +25,16 @@ from angelia.api.custom_error_handlers import (
 )
 from angelia.api.exceptions import ValidationError
 from angelia.api.helpers.vault import dynamic_get_b2b_token_secret, get_access_token_secret
+from angelia.api.metrics import cache_counter
 from angelia.api.validators import check_valid_email
 from angelia.hermes.db import DB
 from angelia.hermes.models import Channel, ClientApplication
+from angelia.lib.cache import LRUCache
 from angelia.report import ctx
+from angelia.settings import settings
+
+if TYPE_CHECKING:
+    from jwt.algorithms import AllowedPublicKeys
 
 
 class TokenType(str, Enum):
@@ -210,7 +218,7 @@ class BaseJwtAuth(BaseAuth):
 
     def decode_jwt_token(
         self,
-        secret: str,
+        secret: "str | AllowedPublicKeys",
         options: dict | None = None,
         algorithms: list[str] | None = None,
         leeway_secs: int = 0,
@@ -257,7 +265,7 @@ class BaseJwtAuth(BaseAuth):
 
     def validate_jwt_token(
         self,
-        secret: str | None = None,
+        secret: "str | AllowedPublicKeys | None" = None,
         options: dict | None = None,
         algorithms: list[str] | None = None,
         leeway_secs: int = 0,
@@ -276,7 +284,14 @@ class BaseJwtAuth(BaseAuth):
             raise TokenHTTPError(INVALID_REQUEST) from None
 
 
+# Access tokens whose signature has been verified by this process, keyed by a hash of the token. Each entry holds
+# the kid, secret, headers and claims the token was verified with until it expires.
+access_token_cache = LRUCache(name="access_token", max_size=settings.ACCESS_TOKEN_CACHE_MAX_SIZE)
+
+
 class AccessToken(BaseJwtAuth):
+    leeway_secs = 5
+
     def __init__(self) -> None:
         super().__init__("Access Token", "bearer")
 
@@ -293,15 +308,57 @@ class AccessToken(BaseJwtAuth):
         for code consistency the function will raise an authentication error if the claim is absent.
 
         """
+        if settings.ACCESS_TOKEN_CACHE_ENABLED and self._load_verified_token(request):
+            return self.auth_data
+
         self.get_token_from_header(request)
 
         if "kid" not in self.headers:
             raise falcon.HTTPUnauthorized(title=f"{self.token_type} must have a kid header", code="INVALID_TOKEN")
         secret = get_access_token_secret(self.headers["kid"])
         # Note a secret = False raises an error
-        self.validate_jwt_access_token(secret=secret, algorithms=["HS512"], leeway_secs=5)
+        self.validate_jwt_access_token(secret=secret, algorithms=["HS512"], leeway_secs=self.leeway_secs)
+
+        if settings.ACCESS_TOKEN_CACHE_ENABLED:
+            # cached no longer than the token would be accepted without the leeway
+            ttl = self.auth_data["exp"] - self.leeway_secs - time.time()
+            if ttl > 0:
+                access_token_cache.set(
+                    self._cache_key(self.jwt_payload),
+                    (self.headers["kid"], secret, self.headers, self.auth_data),
+                    ttl,
+                )
+
         return self.auth_data
 
+    @staticmethod
+    def _cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _load_verified_token(self, request: falcon.Request) -> bool:
+        """
+        Sets the headers and claims of a token verified by an earlier request, returning False if it hasn't been or
+        the secret it was signed with has since been rotated out.
+        """
+        prefix, token = self._load_auth_token_data(request)
+        if prefix != self.token_prefix:
+            return False
+
+        key = self._cache_key(token)
+        if (cached := access_token_cache.get(key)) is None:
+            return False
+
+        kid, secret, headers, auth_data = cached
+        if get_access_token_secret(kid) != secret:
+            access_token_cache.delete(key)
+            cache_counter.labels(cache=access_token_cache.name, event="secret_rotated").inc()
+            return False
+
+        self.jwt_payload = token
+        self.headers = headers
+        self.auth_data = dict(auth_data)
+        return True
+
 
 class ClientSecretAuthMixin:
     @staticmethod
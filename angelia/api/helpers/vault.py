@@ -1,21 +1,57 @@
 import json
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from enum import Enum
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, TypeVar, cast
 
 import azure
 import falcon
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
-
+from cryptography.exceptions import UnsupportedAlgorithm
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+from angelia.api.metrics import (
+    vault_last_refresh,
+    vault_miss_counter,
+    vault_refresh_counter,
+    vault_requests_counter,
+)
+from angelia.lib.cache import LRUCache
 from angelia.report import api_logger
 from angelia.settings import settings
 
 if TYPE_CHECKING:
     from azure.keyvault.secrets import KeyVaultSecret
+    from jwt.algorithms import AllowedPublicKeys
 
 loaded = False
 _local_vault_store: dict[str, dict] = {}
+# public keys parsed from the PEM of each B2B token key secret, with the PEM they were parsed from
+_public_keys: dict[str, tuple[str, "AllowedPublicKeys"]] = {}
+
+# secrets, or keys within them, recently found not to be in the vault so a reload isn't tried for each request
+unknown_secrets = LRUCache(name="vault_unknown", max_size=settings.VAULT_UNKNOWN_CACHE_MAX_SIZE)
+# secrets reloaded in the last VAULT_MIN_RELOAD_INTERVAL seconds, which aren't reloaded again until it has passed
+recent_reloads = LRUCache(name="vault_reloads", max_size=settings.VAULT_UNKNOWN_CACHE_MAX_SIZE)
+# one reload of each secret runs at a time, requests missing the same secret wait for it rather than reloading
+_reloads_in_flight: dict[str, threading.Event] = {}
+_reloads_lock = threading.Lock()
+# reloads of secrets not yet loaded, whose names come from unverified token headers, in the current interval
+_unknown_reloads_started = float("-inf")
+_unknown_reloads = 0
+
+SecretType = TypeVar("SecretType")
+
+# the vault client is created once per process so its access token and connections are reused between loads
+_azure_client: SecretClient | None = None
+_azure_client_pid: int | None = None
+_azure_client_lock = threading.Lock()
 
 
 AES_KEYS = settings.VAULT_CONFIG.AES_KEYS_VAULT_NAME
@@ -39,7 +75,7 @@ class AESKeyNames(str, Enum):
     LOCAL_AES_KEY = "LOCAL_AES_KEY"
 
 
-def get_azure_client() -> SecretClient:
+def create_azure_client() -> SecretClient:
     credential = DefaultAzureCredential(
         exclude_environment_credential=True,
         exclude_shared_token_cache_credential=True,
@@ -47,13 +83,60 @@ def get_azure_client() -> SecretClient:
         exclude_interactive_browser_credential=True,
     )
 
-    client = SecretClient(vault_url=settings.VAULT_CONFIG.VAULT_URL, credential=credential)
+    return SecretClient(vault_url=settings.VAULT_CONFIG.VAULT_URL, credential=credential)
 
-    return client
+
+def get_azure_client() -> SecretClient:
+    """
+    Returns the vault client for this process, creating it on first use. A client inherited from the parent process
+    after a fork is replaced rather than sharing its connections.
+    """
+    global _azure_client, _azure_client_pid  # noqa: PLW0603
+    pid = os.getpid()
+    if _azure_client is None or _azure_client_pid != pid:
+        with _azure_client_lock:
+            if _azure_client is None or _azure_client_pid != pid:
+                _azure_client = create_azure_client()
+                _azure_client_pid = pid
+    return _azure_client
+
+
+def _get_secret_values(client: SecretClient, secret_names: list[str]) -> Iterator[str]:
+    """Fetches the values of secret_names in order, several at a time when there is more than one"""
+    if len(secret_names) == 1:
+        yield cast(str, client.get_secret(secret_names[0]).value)
+        return
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(secret_names), settings.VAULT_LOAD_WORKERS), thread_name_prefix="vault-load"
+    ) as executor:
+        for secret in executor.map(client.get_secret, secret_names):
+            yield cast(str, secret.value)
 
 
 def set_local_vault_secret(secret_store: str, values: dict) -> None:
     _local_vault_store[secret_store] = deepcopy(values)
+    _public_keys.pop(secret_store, None)
+
+
+def get_public_key(secret_name: str, public_key_pem: str) -> "AllowedPublicKeys | str":
+    """
+    Returns the key object parsed from the PEM of a public key secret, parsing it only once for each time the secret
+    is loaded rather than in every token verification. A PEM which can't be parsed is returned as it is, to fail
+    verification.
+    """
+    cached = _public_keys.get(secret_name)
+    if cached is not None and cached[0] == public_key_pem:
+        return cached[1]
+
+    try:
+        public_key = cast("AllowedPublicKeys", load_pem_public_key(public_key_pem.encode()))
+    except (ValueError, TypeError, UnsupportedAlgorithm) as e:
+        api_logger.error(f"Could not parse public key in {secret_name} - {e!r}")
+        return public_key_pem
+
+    _public_keys[secret_name] = (public_key_pem, public_key)
+    return public_key
 
 
 def get_aes_key(key_type: str) -> str:
@@ -65,15 +148,87 @@ def get_aes_key(key_type: str) -> str:
         raise VaultError(err_msg) from None
 
 
-def get_current_token_secret() -> tuple[str, str]:
+def _allow_unknown_reload() -> bool:
+    """
+    Counts a reload of a secret not yet loaded against the VAULT_MAX_UNKNOWN_RELOADS allowed each
+    VAULT_MIN_RELOAD_INTERVAL seconds, returning False when none are left. Must be called holding _reloads_lock.
+    """
+    global _unknown_reloads_started, _unknown_reloads  # noqa: PLW0603
+    now = time.monotonic()
+    if now - _unknown_reloads_started >= settings.VAULT_MIN_RELOAD_INTERVAL:
+        _unknown_reloads_started = now
+        _unknown_reloads = 0
+
+    if _unknown_reloads >= settings.VAULT_MAX_UNKNOWN_RELOADS:
+        return False
+    _unknown_reloads += 1
+    return True
+
+
+def _reload_secret(secret_name: str) -> bool:
+    """
+    Loads secret_name from the vault again, unless it was loaded less than VAULT_MIN_RELOAD_INTERVAL seconds ago or,
+    for a secret not yet loaded, too many of them have been reloaded in that time. If another thread is already
+    reloading it this waits for that reload instead. Returns False if it was neither reloaded nor waited for.
+    """
+    with _reloads_lock:
+        reloaded = _reloads_in_flight.get(secret_name)
+        if reloaded is None:
+            if recent_reloads.get(secret_name):
+                vault_miss_counter.labels(outcome="rate_limited").inc()
+                return False
+            if secret_name not in _local_vault_store and not _allow_unknown_reload():
+                vault_miss_counter.labels(outcome="throttled").inc()
+                return False
+
+            recent_reloads.set(secret_name, True, settings.VAULT_MIN_RELOAD_INTERVAL)
+            _reloads_in_flight[secret_name] = threading.Event()
+
+    if reloaded is not None:
+        vault_miss_counter.labels(outcome="coalesced").inc()
+        reloaded.wait()
+        return True
+
     try:
-        current_key = _local_vault_store[ACCESS_SECRETS]["current_key"]
-    except KeyError:
-        load_secrets(ACCESS_SECRETS, allow_reload=True)
-        try:
-            current_key = _local_vault_store[ACCESS_SECRETS]["current_key"]
-        except KeyError:
-            raise falcon.HTTPInternalServerError from None
+        vault_miss_counter.labels(outcome="reloaded").inc()
+        load_secrets_from_vault([secret_name], was_loaded=False, allow_reload=True)
+    finally:
+        with _reloads_lock:
+            _reloads_in_flight.pop(secret_name).set()
+    return True
+
+
+def _get_or_reload(
+    secret_name: str, lookup: Callable[[], SecretType | None], missing: str | None = None
+) -> SecretType | None:
+    """
+    Returns the value found by lookup in the loaded secrets. If it isn't found secret_name is reloaded from the vault
+    in case it is new or has been rotated, and lookup tried again. Values still not found after a reload are
+    remembered for VAULT_UNKNOWN_TTL seconds, during which they are not reloaded for.
+
+    :param missing: key within the secret looked up, to remember as unknown rather than the whole secret
+    """
+    if (value := lookup()) is not None:
+        return value
+
+    unknown_key = f"{secret_name}:{missing}" if missing else secret_name
+    if unknown_secrets.get(unknown_key):
+        vault_miss_counter.labels(outcome="unknown").inc()
+        return None
+
+    # a reload which was rate limited or throttled says nothing about whether the value exists
+    reloaded = _reload_secret(secret_name)
+    if (value := lookup()) is None and reloaded:
+        unknown_secrets.set(unknown_key, True, settings.VAULT_UNKNOWN_TTL)
+    return value
+
+
+def get_current_token_secret() -> tuple[str, str]:
+    current_key = _get_or_reload(
+        ACCESS_SECRETS, lambda: _local_vault_store.get(ACCESS_SECRETS, {}).get("current_key"), "current_key"
+    )
+    if current_key is None:
+        raise falcon.HTTPInternalServerError
     return current_key, get_access_token_secret(current_key)
 
 
@@ -89,30 +244,13 @@ def get_access_token_secret(key: str) -> str:
         # which can be hacked from the token
         raise falcon.HTTPUnauthorized(title="illegal KID", code="INVALID_TOKEN")
 
-    try:
-        return _local_vault_store[ACCESS_SECRETS][key]
-    except KeyError:
-        load_secrets(ACCESS_SECRETS, allow_reload=True)
-        try:
-            return _local_vault_store[ACCESS_SECRETS][key]
-        except KeyError:
-            return ""
+    secret = _get_or_reload(ACCESS_SECRETS, lambda: _local_vault_store.get(ACCESS_SECRETS, {}).get(key), key)
+    return secret or ""
 
 
 def get_or_load_secret(secret_name: str) -> dict:
-    tries = 2
-    secrets_record = {}
-    while tries:
-        secrets_record = _local_vault_store.get(secret_name, {})
-        if secrets_record:
-            tries = 0
-        elif tries > 1:
-            # if cannot be found then try to load it as it might be a new vault entry
-            load_secrets_from_vault([secret_name], was_loaded=False, allow_reload=True)
-            tries -= 1
-        else:
-            return {}
-    return secrets_record
+    # if cannot be found then try to load it as it might be a new vault entry
+    return _get_or_reload(secret_name, lambda: _local_vault_store.get(secret_name) or None) or {}
 
 
 def dynamic_get_b2b_token_secret(kid: str) -> dict:
@@ -143,19 +281,19 @@ def dynamic_get_b2b_token_secret(kid: str) -> dict:
         return {}
 
     b2b_token_keys_by_kid = f"{B2B_TOKEN_KEYS}{kid}"
-    tries = 2
-    while tries:
-        if signing_secret_data := _local_vault_store.get(b2b_token_keys_by_kid):
-            return {"key": signing_secret_data["public_key"], "channel": channel, "b2b_secrets": b2b_secrets}
-
-        key_loaded = load_secrets_from_vault([b2b_token_keys_by_kid], was_loaded=False, allow_reload=True)
-        if not key_loaded and get_external_secrets_url:
-            pass
-            # @todo add url read logic to get a secret and kid post fix (not full kid) from a b2b public key service
-            # must ensure the correct key prefix is used if they
-            # or we might just make a kid for the channel using a made up post fix and in the POST send a kid
-            # and get back a new public secret.  This needs to be worked out with B@B cleints
-        tries -= 1
+    if signing_secret_data := get_or_load_secret(b2b_token_keys_by_kid):
+        return {
+            "key": get_public_key(b2b_token_keys_by_kid, signing_secret_data["public_key"]),
+            "channel": channel,
+            "b2b_secrets": b2b_secrets,
+        }
+
+    if get_external_secrets_url:
+        pass
+        # @todo add url read logic to get a secret and kid post fix (not full kid) from a b2b public key service
+        # must ensure the correct key prefix is used if they
+        # or we might just make a kid for the channel using a made up post fix and in the POST send a kid
+        # and get back a new public secret.  This needs to be worked out with B@B cleints
     return {}
 
 
@@ -206,18 +344,118 @@ def load_secrets_from_vault(to_load: list, was_loaded: bool, allow_reload: bool)
     else:
         client = get_azure_client()
 
+        api_logger.info(f"Loading {', '.join(to_load)} from vault at {settings.VAULT_CONFIG.VAULT_URL}")
         try:
-            for secret_name in to_load:
-                api_logger.info(f"Loading {secret_name} from vault at {settings.VAULT_CONFIG.VAULT_URL}")
-                _local_vault_store[secret_name] = json.loads(cast(str, client.get_secret(secret_name).value))
+            for secret_name, value in zip(to_load, _get_secret_values(client, to_load), strict=True):
+                _local_vault_store[secret_name] = json.loads(value)
+                _public_keys.pop(secret_name, None)
+                vault_requests_counter.labels(result="loaded").inc()
 
             was_loaded = True
         except azure.core.exceptions.ResourceNotFoundError:
+            vault_requests_counter.labels(result="not_found").inc()
             was_loaded = False
 
     return was_loaded
 
 
+def refresh_loaded_secrets() -> int:
+    """
+    Loads every secret already in _local_vault_store from the vault again, so rotated secrets and keys are picked up
+    without a request first having to miss them. Each secret is replaced in one assignment so lookups see either the
+    old or new value. Secrets deleted from the vault are dropped, other than the AES keys and access secrets which
+    every request needs. Returns the number of secrets which could not be refreshed.
+    """
+    secret_names = list(_local_vault_store)
+    if settings.VAULT_CONFIG.LOCAL_SECRETS:
+        with open(settings.VAULT_CONFIG.LOCAL_SECRETS_PATH) as fp:
+            loaded_secrets = json.load(fp)
+        for secret_name in secret_names:
+            if secret_name in loaded_secrets:
+                set_local_vault_secret(secret_name, loaded_secrets[secret_name])
+        vault_last_refresh.set_to_current_time()
+        return 0
+
+    client = get_azure_client()
+    failures = 0
+    for secret_name in secret_names:
+        try:
+            _local_vault_store[secret_name] = json.loads(cast(str, client.get_secret(secret_name).value))
+        except azure.core.exceptions.ResourceNotFoundError:
+            if secret_name in (AES_KEYS, ACCESS_SECRETS):
+                api_logger.error(f"{secret_name} not found in vault when refreshing, keeping the loaded secret")
+                failures += 1
+            else:
+                api_logger.info(f"{secret_name} no longer in vault, removing it")
+                _local_vault_store.pop(secret_name, None)
+            vault_refresh_counter.labels(result="not_found").inc()
+        except (azure.core.exceptions.AzureError, ValueError) as e:
+            api_logger.warning(f"Could not refresh {secret_name} from vault - {e!r}")
+            vault_refresh_counter.labels(result="failed").inc()
+            failures += 1
+        else:
+            _public_keys.pop(secret_name, None)
+            vault_refresh_counter.labels(result="refreshed").inc()
+
+    # keys added to refreshed secrets, eg a new access secret kid, shouldn't wait out the unknown ttl
+    unknown_secrets.clear()
+    if not failures:
+        vault_last_refresh.set_to_current_time()
+    return failures
+
+
+class SecretRefresher:
+    """
+    Background thread refreshing the loaded vault secrets every interval seconds, varied by up to jitter of the
+    interval either way so the workers on a host don't all call the vault at once.
+    """
+
+    def __init__(self, interval: float, jitter: float, refresh: Callable[[], int] = refresh_loaded_secrets) -> None:
+        self.interval = interval
+        self.jitter = jitter
+        self.refresh = refresh
+
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def next_wait(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self) -> None:
+        """Starts the refresher thread in this process if it isn't already running"""
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+
+            # a thread started before a fork doesn't exist in the child
+            self._pid = os.getpid()
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="vault-secret-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            return
+
+        self._stopping.set()
+        self._thread.join(self.interval)
+        self._thread = None
+
+    def _run(self) -> None:
+        stopping = self._stopping
+        while not stopping.wait(self.next_wait()):
+            try:
+                self.refresh()
+            except Exception:
+                api_logger.exception("Failed to refresh vault secrets")
+                vault_refresh_counter.labels(result="failed").inc()
+
+
+secret_refresher = SecretRefresher(interval=settings.VAULT_REFRESH_INTERVAL, jitter=settings.VAULT_REFRESH_JITTER)
+
+
 def save_secret_to_vault(name: str, value: str) -> "KeyVaultSecret":
     client = get_azure_client()
     return client.set_secret(name, value, enabled=True)
@@ -1,11 +1,17 @@
+import atexit
+import os
 from contextlib import suppress
 from typing import TYPE_CHECKING
 
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
 
 if TYPE_CHECKING:
     from falcon import Request
 
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    # removes the live gauges of a worker when it exits, otherwise they are still summed with those of running workers
+    atexit.register(lambda: multiprocess.mark_process_dead(os.getpid()))
+
 # Define metrics to capture here
 labels = ["endpoint", "method", "channel", "response_status"]
 
@@ -19,6 +25,80 @@ users_counter = Counter("user_requests", "Total user requests.", labels)
 wallet_counter = Counter("wallet_requests", "Total wallet requests.", labels)
 encrypt_counter = Counter("encryption_requests", "Encryption requests", encrypt_labels)
 create_trusted = Counter("create_trusted", "Total create_trusted requests.", [*labels, "scheme", "error_slug"])
+cache_counter = Counter("cache_requests", "Cache hits, misses and evictions.", ["cache", "event"])
+
+# Background publishing to Hermes, see angelia.messaging.publisher
+publish_queue_depth = Gauge(
+    "hermes_publish_queue_depth", "Messages waiting to be published to Hermes.", multiprocess_mode="livesum"
+)
+publish_latency = Histogram("hermes_publish_latency_seconds", "Time taken to publish a message to Hermes.")
+publish_dropped_counter = Counter(
+    "hermes_publish_dropped", "Messages to Hermes dropped or spilled to disk.", ["reason"]
+)
+
+# Spool of messages to Hermes written while the broker is unavailable, see angelia.messaging.spool
+spool_size_bytes = Gauge("hermes_spool_size_bytes", "Size of the spool awaiting replay.", multiprocess_mode="livemax")
+spool_oldest_message_age = Gauge(
+    "hermes_spool_oldest_message_age_seconds", "Age of the oldest spooled message.", multiprocess_mode="livemax"
+)
+spooled_counter = Counter("hermes_spooled", "Messages to Hermes written to the spool.")
+spool_replayed_counter = Counter("hermes_spool_replayed", "Spooled messages published to Hermes.")
+
+# Database routing, see angelia.hermes.db
+db_session_routing_counter = Counter(
+    "db_session_routing", "Request sessions opened on each database and why.", ["database", "reason"]
+)
+db_query_duration = Histogram("db_query_duration_seconds", "Time taken by database queries.", ["database"])
+db_replica_lag = Gauge("db_replica_lag_seconds", "Last measured read replica lag.", multiprocess_mode="livemax")
+db_pool_connections = Gauge(
+    "db_pool_connections", "Open connections in the pool.", ["database"], multiprocess_mode="livesum"
+)
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections checked out of the pool.", ["database"], multiprocess_mode="livesum"
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Connections open beyond the pool size.", ["database"], multiprocess_mode="livesum"
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waited to check out a connection from the pool.", ["database"]
+)
+db_pool_connection_age = Histogram(
+    "db_pool_connection_age_seconds",
+    "Age of connections when checked out of the pool.",
+    ["database"],
+    buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200, 14400, float("inf")),
+)
+db_pool_invalidated_counter = Counter("db_pool_invalidated", "Pool connections invalidated.", ["database"])
+
+# Secrets loaded from the vault on the request path, see angelia.api.helpers.vault
+vault_requests_counter = Counter("vault_requests", "Secrets requested from the vault.", ["result"])
+vault_miss_counter = Counter(
+    "vault_misses", "Lookups of secrets not loaded in process and what was done about them.", ["outcome"]
+)
+vault_refresh_counter = Counter("vault_refreshes", "Secrets refreshed from the vault in the background.", ["result"])
+vault_last_refresh = Gauge(
+    "vault_last_refresh_timestamp_seconds",
+    "Time all loaded secrets were last refreshed from the vault without failures.",
+    multiprocess_mode="livemin",
+)
+
+# Queries run for each request, see angelia.api.middleware.QueryAccountingMiddleware
+query_labels = ["route", "method"]
+db_request_queries = Histogram(
+    "db_request_queries",
+    "Database queries run for a request.",
+    query_labels,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, float("inf")),
+)
+db_request_query_time = Histogram(
+    "db_request_query_seconds", "Total time taken by the database queries run for a request.", query_labels
+)
+db_request_slowest_query = Histogram(
+    "db_request_slowest_query_seconds", "Time taken by the slowest database query run for a request.", query_labels
+)
+db_query_budget_exceeded_counter = Counter(
+    "db_query_budget_exceeded", "Requests which ran more queries than their route's budget.", query_labels
+)
 
 
 class Metric:
@@ -1,6 +1,8 @@
+import hashlib
 import time
 from contextlib import suppress
 from enum import Enum
+from http import HTTPStatus
 from typing import TYPE_CHECKING, cast
 
 import falcon
@@ -12,10 +14,18 @@ from angelia.api.helpers.metrics import (
     starter_timer,
     stream_metrics,
 )
+from angelia.api.metrics import (
+    db_query_budget_exceeded_counter,
+    db_request_queries,
+    db_request_query_time,
+    db_request_slowest_query,
+)
 from angelia.api.shared_data import SharedData
 from angelia.hermes.db import DB
+from angelia.hermes.query_accounting import RequestQueries
 from angelia.messaging.sender import send_message_to_hermes
-from angelia.report import ctx
+from angelia.report import ctx, sql_logger
+from angelia.settings import settings
 
 if TYPE_CHECKING:
     from angelia.resources.base_resource import Base
@@ -82,7 +92,11 @@ class SharedDataMiddleware:
 
 class DatabaseSessionManager:
     """Middleware class to Manage sessions
-    Falcon looks for existence of these methods"""
+    Falcon looks for existence of these methods
+
+    The session is only created when it is first used, so requests which don't query, such as those failing
+    authentication, don't take a connection. Resources with uses_db set to False aren't given one at all.
+    GET requests are given a session on the read replica unless their resource sets use_read_replica to False"""
 
     def process_resource(
         self,
@@ -91,7 +105,15 @@ class DatabaseSessionManager:
         resource: "type[Base]",
         params: dict,
     ) -> None:
-        DB().open()
+        if not getattr(resource, "uses_db", True):
+            return
+
+        if req.method != HttpMethods.GET:
+            DB().open_write()
+        elif not getattr(resource, "use_read_replica", True):
+            DB().open_write(reason="read_your_writes")
+        else:
+            DB().open_read()
 
     def process_response(
         self,
@@ -100,13 +122,7 @@ class DatabaseSessionManager:
         resource: "type[Base]",
         req_succeeded: bool,
     ) -> None:
-        if db_session := DB().session:
-            try:
-                if req.method != HttpMethods.GET and not req_succeeded:
-                    db_session.rollback()
-                db_session.close()
-            except AttributeError:
-                return
+        DB().close(rollback=req.method != HttpMethods.GET and not req_succeeded)
 
 
 class MetricMiddleware:
@@ -138,6 +154,52 @@ class MetricMiddleware:
         stream_metrics(metric_as_bytes)
 
 
+class QueryAccountingMiddleware:
+    """
+    Records the number of database queries run for each request, their total time and the slowest, by route
+    template. Requests going over the query budget of their route log the statements they ran most often, to catch
+    N+1 queries, and with SERVER_TIMING the figures are added to a Server-Timing header.
+    """
+
+    def process_request(self, req: falcon.Request, resp: falcon.Response) -> None:
+        RequestQueries.start()
+
+    def process_response(
+        self,
+        req: falcon.Request,
+        resp: falcon.Response,
+        resource: "type[Base]",
+        req_succeeded: bool,
+    ) -> None:
+        queries = RequestQueries.finish()
+        if queries is None or req.uri_template is None:
+            return
+
+        labels = {"route": req.uri_template, "method": req.method}
+        db_request_queries.labels(**labels).observe(queries.count)
+        db_request_query_time.labels(**labels).observe(queries.total_time)
+        db_request_slowest_query.labels(**labels).observe(queries.slowest_time)
+
+        budget = settings.QUERY_BUDGETS.get(req.uri_template, settings.QUERY_BUDGET)
+        if budget and queries.count > budget:
+            db_query_budget_exceeded_counter.labels(**labels).inc()
+            sql_logger.bind(
+                route=req.uri_template,
+                method=req.method,
+                query_count=queries.count,
+                query_budget=budget,
+                query_time=queries.total_time,
+                statements=[{"fingerprint": statement, "count": count} for statement, count in queries.most_common()],
+            ).warning(f"{req.method} {req.uri_template} ran {queries.count} queries, over its budget of {budget}")
+
+        if settings.SERVER_TIMING:
+            resp.append_header(
+                "Server-Timing",
+                f'db;dur={queries.total_time * 1000:.1f};desc="{queries.count} queries", '
+                f"db-slowest;dur={queries.slowest_time * 1000:.1f}",
+            )
+
+
 class FailureEventMiddleware:
     def process_request(self, req: falcon.Request, resp: falcon.Response) -> None:
         req.context.events_context = {}
@@ -187,3 +249,65 @@ class FailureEventMiddleware:
 
             if hermes_message:
                 send_message_to_hermes("add_trusted_failed", hermes_message)
+
+
+class ConditionalRequestMiddleware:
+    """
+    Adds a strong ETag to successful GET responses from resources with conditional_get set and answers requests
+    whose If-None-Match matches it with 304 Not Modified.
+
+    Where the resource gives a version token for the request the ETag is made from that before the responder is
+    called, so a match skips the responder entirely. Tokens are only trusted for CONDITIONAL_GET_VERSION_TTL
+    seconds. Otherwise the ETag is a hash of the serialized response which saves sending the body but not
+    building it.
+    """
+
+    @staticmethod
+    def _matches(req: falcon.Request, etag: str) -> bool:
+        return any(tag in ("*", etag) for tag in req.if_none_match or ())
+
+    def process_resource(
+        self,
+        req: falcon.Request,
+        resp: falcon.Response,
+        resource: "Base",
+        params: dict,
+    ) -> None:
+        if req.method != HttpMethods.GET or not getattr(resource, "conditional_get", False):
+            return
+
+        version_token = resource.get_version_token(req)
+        if version_token is None:
+            return
+
+        time_bucket = int(time.time() // settings.CONDITIONAL_GET_VERSION_TTL)
+        req.context.etag = hashlib.sha256(f"{req.relative_uri}:{time_bucket}:{version_token}".encode()).hexdigest()
+        if self._matches(req, req.context.etag):
+            resp.status = falcon.HTTP_NOT_MODIFIED
+            resp.etag = req.context.etag
+            resource.on_not_modified(req, resp)
+            resp.complete = True
+
+    def process_response(
+        self,
+        req: falcon.Request,
+        resp: falcon.Response,
+        resource: "Base",
+        req_succeeded: bool,
+    ) -> None:
+        if (
+            req.method != HttpMethods.GET
+            or not req_succeeded
+            or not getattr(resource, "conditional_get", False)
+            or falcon.http_status_to_code(resp.status) != HTTPStatus.OK
+        ):
+            return
+
+        if (etag := req.context.get("etag")) is None:
+            if (body := resp.render_body()) is None:
+                return
+            etag = hashlib.sha256(body).hexdigest()
+
+        resp.etag = etag
+        if self._matches(req, etag):
+            resp.status = falcon.HTTP_NOT_MODIFIED
@@ -128,28 +128,36 @@ def _validate_req_schema(req_schema: Schema | None, req: falcon.Request) -> None
             raise falcon.HTTPInternalServerError(title="Request data failed validation") from None
 
 
+def serialize_response(resp_schema: "PydanticModelType", media: dict | list) -> dict | list:
+    """
+    Returns media passed through the pydantic response schema, as done by @validate(resp_schema=...). For use by
+    responders which need the serialized response eg to cache it.
+    """
+    try:
+        if isinstance(media, dict):
+            return resp_schema(**media).dict()
+        if isinstance(media, list):
+            return [resp_schema(**item).dict() for item in media]
+
+        err_msg = "Response must be a dict or list object to be validated by the response schema"
+        api_logger.debug(f"{err_msg} - response: {media}")
+        raise pydantic.ValidationError(err_msg, model=resp_schema)
+    except pydantic.ValidationError:
+        api_logger.exception("Error validating response data")
+        raise falcon.HTTPInternalServerError(
+            title="Response data failed validation"
+            # Do not return 'e.message' in the response to
+            # prevent info about possible internal response
+            # formatting bugs from leaking out to users.
+        ) from None
+    except TypeError:
+        api_logger.exception("Invalid response schema - schema must be a subclass of pydantic.BaseModel")
+        raise falcon.HTTPInternalServerError(title="Response data failed validation") from None
+
+
 def _validate_resp_schema(resp_schema: "PydanticModelType | None", resp: falcon.Response) -> None:
     if resp_schema is not None:
-        try:
-            if isinstance(resp.media, dict):
-                resp.media = resp_schema(**resp.media).dict()
-            elif isinstance(resp.media, list):
-                resp.media = [resp_schema(**media).dict() for media in resp.media]
-            else:
-                err_msg = "Response must be a dict or list object to be validated by the response schema"
-                api_logger.debug(f"{err_msg} - response: {resp.media}")
-                raise pydantic.ValidationError(err_msg, model=resp_schema)
-        except pydantic.ValidationError:
-            api_logger.exception("Error validating response data")
-            raise falcon.HTTPInternalServerError(
-                title="Response data failed validation"
-                # Do not return 'e.message' in the response to
-                # prevent info about possible internal response
-                # formatting bugs from leaking out to users.
-            ) from None
-        except TypeError:
-            api_logger.exception("Invalid response schema - schema must be a subclass of pydantic.BaseModel")
-            raise falcon.HTTPInternalServerError(title="Response data failed validation") from None
+        resp.media = serialize_response(resp_schema, resp.media)
 
 
 def _validate(
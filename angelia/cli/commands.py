@@ -108,7 +108,7 @@ def write_example_env() -> None:
 LOG_LEVEL=DEBUG
 LOCAL_SECRETS=True
 POSTGRES_READ_DSN=postgresql://postgres@127.0.0.1:5432/hermes
-POSTGRES_WRITE_DSN=postgresql://postgres@127.0.0.1:5432/hermes
+POSTGRES_DSN=postgresql://postgres@127.0.0.1:5432/hermes
 RABBIT_PASSWORD=guest
 RABBIT_USER=guest
 RABBIT_HOST=127.0.0.1
@@ -123,6 +123,43 @@ VAULT_URL=https://bink-uksouth-dev-com.vault.azure.net/
     Path(".env").write_text(data)
 
 
+@manage.command()
+@click.argument("path", default="schema_snapshot.pickle", type=click.Path(dir_okay=False))
+def dump_schema_snapshot(path: str) -> None:
+    """
+    Reflect the Hermes tables used by the models and save them to a snapshot file at PATH.
+    Setting SCHEMA_SNAPSHOT_PATH to this file lets workers load the models without reflecting them at startup.
+    The snapshot must be created again whenever the Hermes schema or the SQLAlchemy version changes.
+    """
+    # reflect from the database rather than load the snapshot being replaced
+    settings.SCHEMA_SNAPSHOT_PATH = ""
+    from angelia.hermes import models  # noqa: F401
+    from angelia.hermes.db import DB
+    from angelia.hermes.schema_snapshot import dump_snapshot
+
+    dump_snapshot(DB().metadata, path)
+    click.echo(f"Saved schema snapshot of {len(DB().metadata.tables)} tables to '{path}'")
+
+
+@manage.command()
+@click.argument("channel_ids", nargs=-1)
+def invalidate_plan_catalogue_cache(channel_ids: tuple[str, ...]) -> None:
+    """
+    Drop the cached loyalty plan catalogues of the channels CHANNEL_IDS, or of every channel if none are given, so
+    changes made to plans in Hermes are seen before PLAN_CATALOGUE_CACHE_TTL passes.
+    Only has an effect with a PLAN_CATALOGUE_CACHE_BACKEND shared between processes.
+    """
+    from angelia.handlers.helpers import plan_catalogue_cache
+    from angelia.lib.cache import LRUCache
+
+    if isinstance(plan_catalogue_cache.get_plan_catalogue_cache(), LRUCache):
+        click.echo("The plan catalogue cache is held in each worker's memory, it can only expire by its TTL.")
+        sys.exit(1)
+
+    plan_catalogue_cache.invalidate_plan_catalogue_cache(channel_ids or None)
+    click.echo(f"Invalidated cached loyalty plan catalogue for {', '.join(channel_ids) or 'all channels'}")
+
+
 @manage.command()
 @click.option("--priv", default="rsa", help="path to save RSA private key", type=click.Path())
 @click.option("--pub", default="rsa.pub", help="path to save RSA public key", type=click.Path())
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import contextlib
+import time
 from datetime import datetime
 from typing import TYPE_CHECKING
 from urllib.parse import urljoin
@@ -22,16 +23,19 @@ from angelia.hermes.models import (
     SchemeChannelAssociation,
     SchemeImage,
 )
+from angelia.lib.cache import LRUCache
 from angelia.lib.images import ImageStatus, ImageTypes
 from angelia.settings import settings
 
 if TYPE_CHECKING:
-    from sqlalchemy.sql.selectable import Select
+    from collections.abc import Iterable
 
+    from sqlalchemy.sql.selectable import CompoundSelect, Select
 
-def query_scheme_account_images(user_id: int, loyalty_card_index: dict, show_type: ImageTypes | None = None) -> Select:
-    account_list = list(loyalty_card_index.keys())
 
+def query_scheme_account_images(
+    user_id: int, account_ids: Iterable[int] | Select, show_type: ImageTypes | None = None
+) -> Select:
     select_query = (
         select(
             SchemeAccountImage.id,
@@ -55,7 +59,7 @@ def query_scheme_account_images(user_id: int, loyalty_card_index: dict, show_typ
             and_(
                 SchemeAccountUserAssociation.scheme_account_id == SchemeAccountImageAssociation.schemeaccount_id,
                 SchemeAccountUserAssociation.user_id == user_id,
-                SchemeAccountUserAssociation.scheme_account_id.in_(account_list),
+                SchemeAccountUserAssociation.scheme_account_id.in_(account_ids),
             ),
         )
         .where(
@@ -75,10 +79,9 @@ def query_scheme_account_images(user_id: int, loyalty_card_index: dict, show_typ
     return select_query
 
 
-def query_scheme_images(channel_id: str, loyalty_card_index: dict, show_type: ImageTypes | None = None) -> Select:
-    # get Unique list of card_ids
-    plan_list = list(set(loyalty_card_index.values()))
-
+def query_scheme_images(
+    channel_id: str, plan_ids: Iterable[int] | Select, show_type: ImageTypes | None = None
+) -> Select:
     select_query = (
         select(
             SchemeImage.id,
@@ -95,7 +98,7 @@ def query_scheme_images(channel_id: str, loyalty_card_index: dict, show_type: Im
         .join(SchemeChannelAssociation, SchemeChannelAssociation.scheme_id == SchemeImage.scheme_id)
         .join(Channel, and_(Channel.id == SchemeChannelAssociation.bundle_id, Channel.bundle_id == channel_id))
         .where(
-            SchemeImage.scheme_id.in_(plan_list),
+            SchemeImage.scheme_id.in_(plan_ids),
             SchemeImage.start_date <= datetime.now(),
             SchemeImage.status != ImageStatus.DRAFT,
             SchemeImage.image_type_code != ImageTypes.ALT_HERO,
@@ -111,9 +114,9 @@ def query_scheme_images(channel_id: str, loyalty_card_index: dict, show_type: Im
     return select_query
 
 
-def query_card_account_images(user_id: int, pay_card_index: dict, show_type: ImageTypes | None = None) -> Select:
-    account_list = list(pay_card_index.keys())
-
+def query_card_account_images(
+    user_id: int, account_ids: Iterable[int] | Select, show_type: ImageTypes | None = None
+) -> Select:
     select_query = (
         select(
             PaymentCardAccountImage.id,
@@ -138,7 +141,7 @@ def query_card_account_images(user_id: int, pay_card_index: dict, show_type: Ima
                 PaymentAccountUserAssociation.payment_card_account_id
                 == PaymentCardAccountImageAssociation.paymentcardaccount_id,
                 PaymentAccountUserAssociation.user_id == user_id,
-                PaymentAccountUserAssociation.payment_card_account_id.in_(account_list),
+                PaymentAccountUserAssociation.payment_card_account_id.in_(account_ids),
             ),
         )
         .where(
@@ -154,10 +157,7 @@ def query_card_account_images(user_id: int, pay_card_index: dict, show_type: Ima
     return select_query
 
 
-def query_payment_card_images(pay_card_index: dict, show_type: ImageTypes | None = None) -> Select:
-    # get Unique list of card_ids
-    plan_list = list(set(pay_card_index.values()))
-
+def query_payment_card_images(plan_ids: Iterable[int] | Select, show_type: ImageTypes | None = None) -> Select:
     select_query = select(
         PaymentCardImage.id,
         PaymentCardImage.image_type_code.label("type"),
@@ -170,7 +170,7 @@ def query_payment_card_images(pay_card_index: dict, show_type: ImageTypes | None
         None,
         literal("payment").label("table_type"),
     ).where(
-        PaymentCardImage.payment_card_id.in_(plan_list),
+        PaymentCardImage.payment_card_id.in_(plan_ids),
         PaymentCardImage.start_date <= datetime.now(),
         PaymentCardImage.status != ImageStatus.DRAFT,
         PaymentCardImage.image_type_code != ImageTypes.ALT_HERO,
@@ -192,7 +192,7 @@ def query_all_images(  # noqa: PLR0913
     show_type: ImageTypes | None = None,
     included_payment: bool = True,
     included_scheme: bool = True,
-) -> dict:
+) -> ImageIndex:
     """
     If included_payment and  included_scheme are true 4 image tables are searched and combined into
     Loyalty_card_index and pay_card_index restricts finding images related to listed accounts and plans and by the
@@ -219,29 +219,264 @@ def query_all_images(  # noqa: PLR0913
     :param user_id: User table id
     :param db_session: Database session
     :param show_type: Either None for all types or an image type to restrict to one type
-    :return: dictionary of the types of images required
+    :return: index of the images required
     """
 
-    select_list = []
+    if not settings.PLAN_IMAGE_CACHE_ENABLED:
+        u = select_all_images(
+            user_id=user_id,
+            channel_id=channel_id,
+            loyalty_account_ids=list(loyalty_card_index.keys()) if included_scheme else None,
+            loyalty_plan_ids=list(set(loyalty_card_index.values())) if included_scheme else None,
+            payment_account_ids=list(pay_card_index.keys()) if included_payment else None,
+            payment_plan_ids=list(set(pay_card_index.values())) if included_payment else None,
+            show_type=show_type,
+        )
+        return process_images_query(db_session.execute(u).all())
+
+    # Only the account images are queried, plan images are the same for every user so come from the plan image
+    # cache. The rows are combined in the same order as the 4 table union.
+    account_images = []
     if included_payment:
+        account_images.append(query_card_account_images(user_id, list(pay_card_index.keys()), show_type))
+    if included_scheme:
+        account_images.append(query_scheme_account_images(user_id, list(loyalty_card_index.keys()), show_type))
+
+    account_rows: dict[str, list] = {"payment": [], "scheme": []}
+    for row in db_session.execute(union_all(*account_images)).all():
+        account_rows[row.table_type].append(row)
+
+    payment_plan_rows, scheme_plan_rows = get_plan_images(
+        db_session=db_session,
+        channel_id=channel_id,
+        loyalty_plan_ids=set(loyalty_card_index.values()) if included_scheme else set(),
+        payment_plan_ids=set(pay_card_index.values()) if included_payment else set(),
+        show_type=show_type,
+    )
+
+    return process_images_query(
+        [*account_rows["payment"], *payment_plan_rows, *account_rows["scheme"], *scheme_plan_rows]
+    )
+
+
+def select_all_images(  # noqa: PLR0913
+    user_id: int,
+    channel_id: str,
+    loyalty_account_ids: Iterable[int] | Select | None,
+    loyalty_plan_ids: Iterable[int] | Select | None,
+    payment_account_ids: Iterable[int] | Select | None,
+    payment_plan_ids: Iterable[int] | Select | None,
+    show_type: ImageTypes | None = None,
+) -> CompoundSelect:
+    """
+    Union of the image tables used by query_all_images. The ids may be lists or a select of the ids so that the
+    union can be embedded in a larger statement; payment or scheme images are skipped if their ids are None.
+    """
+    select_list = []
+    if payment_account_ids is not None and payment_plan_ids is not None:
         select_list += [
-            query_card_account_images(user_id, pay_card_index, show_type),
-            query_payment_card_images(pay_card_index, show_type),
+            query_card_account_images(user_id, payment_account_ids, show_type),
+            query_payment_card_images(payment_plan_ids, show_type),
         ]
 
-    if included_scheme:
+    if loyalty_account_ids is not None and loyalty_plan_ids is not None:
         select_list += [
-            query_scheme_account_images(user_id, loyalty_card_index, show_type),
-            query_scheme_images(channel_id, loyalty_card_index, show_type),
+            query_scheme_account_images(user_id, loyalty_account_ids, show_type),
+            query_scheme_images(channel_id, loyalty_plan_ids, show_type),
         ]
 
-    u = union_all(*select_list)
-    results = db_session.execute(u).all()
+    return union_all(*select_list)
+
+
+plan_image_cache = LRUCache(name="plan_images", max_size=settings.PLAN_IMAGE_CACHE_MAX_SIZE)
+
+
+def _plan_image_key(table_type: str, channel_id: str, plan_id: int) -> str:
+    # payment card images are not restricted by channel
+    return f"plan_images:{table_type}:{channel_id if table_type == 'scheme' else ''}:{plan_id}"
+
+
+def get_plan_images(
+    db_session: Session,
+    channel_id: str,
+    loyalty_plan_ids: set[int],
+    payment_plan_ids: set[int],
+    show_type: ImageTypes | None = None,
+) -> tuple[list[dict], list[dict]]:
+    """
+    Returns the current payment card and scheme image rows for the plans, in the same form as the rows from
+    query_payment_card_images and query_scheme_images, loading any plans not in plan_image_cache.
+    """
+    images: dict[tuple[str, int], tuple[dict, ...]] = {}
+    missing: dict[str, set[int]] = {"payment": set(), "scheme": set()}
+    for table_type, plan_ids in (("payment", payment_plan_ids), ("scheme", loyalty_plan_ids)):
+        for plan_id in plan_ids:
+            if (plan_images := plan_image_cache.get(_plan_image_key(table_type, channel_id, plan_id))) is None:
+                missing[table_type].add(plan_id)
+            else:
+                images[(table_type, plan_id)] = plan_images
+
+    if missing["payment"] or missing["scheme"]:
+        images.update(_load_plan_images(db_session, channel_id, missing["scheme"], missing["payment"]))
+
+    def plan_rows(table_type: str, plan_ids: set[int], show_types: tuple) -> list[dict]:
+        rows = [row for plan_id in plan_ids for row in images[(table_type, plan_id)]]
+        if show_type is not None:
+            rows = [row for row in rows if row["type"] in show_types]
+        return sorted(rows, key=lambda row: row["id"])
+
+    return (
+        plan_rows("payment", payment_plan_ids, (show_type,)),
+        plan_rows("scheme", loyalty_plan_ids, (show_type, ImageTypes.TIER)),
+    )
+
+
+def _load_plan_images(
+    db_session: Session, channel_id: str, loyalty_plan_ids: set[int], payment_plan_ids: set[int]
+) -> dict[tuple[str, int], tuple[dict, ...]]:
+    """
+    Queries every published image of the plans which has not yet ended and caches the ones that have started.
+    Each plan is cached until the next start or end date of its images, or PLAN_IMAGE_CACHE_TTL seconds to pick up
+    artwork published in the meantime, whichever is sooner.
+    """
+    scheme_images = (
+        select(
+            SchemeImage.id,
+            SchemeImage.image_type_code.label("type"),
+            SchemeImage.image.label("url"),
+            SchemeImage.call_to_action.label("cta_url"),
+            SchemeImage.description,
+            SchemeImage.encoding,
+            SchemeImage.reward_tier,
+            SchemeImage.scheme_id.label("plan_id"),
+            SchemeImage.start_date,
+            SchemeImage.end_date,
+            literal("scheme").label("table_type"),
+        )
+        .join(SchemeChannelAssociation, SchemeChannelAssociation.scheme_id == SchemeImage.scheme_id)
+        .join(Channel, and_(Channel.id == SchemeChannelAssociation.bundle_id, Channel.bundle_id == channel_id))
+        .where(
+            SchemeImage.scheme_id.in_(loyalty_plan_ids),
+            SchemeImage.status != ImageStatus.DRAFT,
+            SchemeImage.image_type_code != ImageTypes.ALT_HERO,
+            or_(SchemeImage.end_date.is_(None), SchemeImage.end_date >= datetime.now()),
+        )
+    )
+    payment_card_images = select(
+        PaymentCardImage.id,
+        PaymentCardImage.image_type_code.label("type"),
+        PaymentCardImage.image.label("url"),
+        literal(None).label("cta_url"),
+        PaymentCardImage.description,
+        PaymentCardImage.encoding,
+        PaymentCardImage.reward_tier,
+        PaymentCardImage.payment_card_id.label("plan_id"),
+        PaymentCardImage.start_date,
+        PaymentCardImage.end_date,
+        literal("payment").label("table_type"),
+    ).where(
+        PaymentCardImage.payment_card_id.in_(payment_plan_ids),
+        PaymentCardImage.status != ImageStatus.DRAFT,
+        PaymentCardImage.image_type_code != ImageTypes.ALT_HERO,
+        or_(PaymentCardImage.end_date.is_(None), PaymentCardImage.end_date >= datetime.now()),
+    )
+
+    now = time.time()
+    images: dict[tuple[str, int], list[dict]] = {("scheme", plan_id): [] for plan_id in loyalty_plan_ids}
+    images.update({("payment", plan_id): [] for plan_id in payment_plan_ids})
+    expires_at = dict.fromkeys(images, now + settings.PLAN_IMAGE_CACHE_TTL)
+    for row in db_session.execute(union_all(scheme_images, payment_card_images).order_by("id")).all():
+        key = (row.table_type, row.plan_id)
+        start = row.start_date.timestamp()
+        end = row.end_date.timestamp() if row.end_date is not None else None
+        if start > now:
+            expires_at[key] = min(expires_at[key], start)
+            continue
+
+        if end is not None:
+            expires_at[key] = min(expires_at[key], end)
+        images[key].append(
+            {
+                "id": row.id,
+                "type": row.type,
+                "url": row.url,
+                "cta_url": row.cta_url,
+                "description": row.description,
+                "encoding": row.encoding,
+                "reward_tier": row.reward_tier,
+                "plan_id": row.plan_id,
+                "account_id": None,
+                "table_type": row.table_type,
+            }
+        )
+
+    plan_images = {key: tuple(rows) for key, rows in images.items()}
+    for (table_type, plan_id), rows in plan_images.items():
+        plan_image_cache.set(
+            _plan_image_key(table_type, channel_id, plan_id), rows, expires_at[table_type, plan_id] - now
+        )
+
+    return plan_images
 
-    return process_images_query(results)
 
+class ImageRecord:
+    """
+    Read only image row. reward_tier is only used to pick tier images so is not included in as_dict, which gives
+    a new output dict on each call so the record can be shared by every card using the image.
+    """
 
-def process_images_query(query: list) -> dict:
+    __slots__ = ("id", "type", "url", "cta_url", "description", "encoding", "reward_tier")
+
+    def __init__(  # noqa: PLR0913
+        self,
+        id: int,  # noqa: A002
+        type: int,  # noqa: A002
+        url: str,
+        cta_url: str | None,
+        description: str | None,
+        encoding: str | None,
+        reward_tier: int | None,
+    ) -> None:
+        self.id = id
+        self.type = type
+        self.url = url
+        self.cta_url = cta_url
+        self.description = description
+        self.encoding = encoding
+        self.reward_tier = reward_tier
+
+    def as_dict(self, image_type: int | None = None) -> dict:
+        return {
+            "id": self.id,
+            "type": self.type if image_type is None else image_type,
+            "url": self.url,
+            "cta_url": self.cta_url,
+            "description": self.description,
+            "encoding": self.encoding,
+        }
+
+
+class ImageIndex:
+    """
+    Images found by query_all_images keyed by (table_type, image_type, "account" or "plan", account or plan id).
+    image_types holds the image types found for each table type in the order they were first seen.
+    """
+
+    __slots__ = ("images", "image_types")
+
+    def __init__(
+        self,
+        images: dict[tuple[str, int, str, int], tuple[ImageRecord, ...]] | None = None,
+        image_types: dict[str, tuple[int, ...]] | None = None,
+    ) -> None:
+        self.images = images or {}
+        self.image_types = image_types or {}
+
+    def get(self, table_type: str, image_type: int, owner: str, owner_id: int) -> tuple[ImageRecord, ...]:
+        return self.images.get((table_type, image_type, owner, owner_id), ())
+
+
+def process_images_query(query: list) -> ImageIndex:
     """
     Since all images are queried in one go we need a data structure which can be used to find images
     when processing the relevant API output fields.
@@ -249,37 +484,33 @@ def process_images_query(query: list) -> dict:
     accounts are increased by 10,000,000 to avoid collision with the plan ids
 
     :param query:   image query result union to 4 image tables queried
-    :return: dict structure for easy look up
+    :return: index of the images for look up
     """
-    images_data: dict[str, dict] = {}
+    images: dict[tuple[str, int, str, int], list[ImageRecord]] = {}
+    image_types: dict[str, dict[int, None]] = {}
     for image in query:
         image_dict = dict(image)
-        image_type = image_dict.get("type")
+        image_type = image_dict["type"]
         # pop fields not required in images output
         account_id = image_dict.pop("account_id", None)
         plan_id = image_dict.pop("plan_id", None)
         table_type = image_dict.pop("table_type", "unknown")
 
-        if image_dict:
-            if not image_dict.get("encoding"):
-                with contextlib.suppress(IndexError, AttributeError):
-                    image_dict["encoding"] = image_dict["url"].split(".")[-1].replace("/", "")
-
-            if not images_data.get(table_type):
-                images_data[table_type] = {}
-            if not images_data[table_type].get(image_type):
-                images_data[table_type][image_type] = {"account": {}, "plan": {}}
-            if account_id is None:
-                if not images_data[table_type][image_type]["plan"].get(plan_id):
-                    images_data[table_type][image_type]["plan"][plan_id] = []
-                images_data[table_type][image_type]["plan"][plan_id].append(image_dict)
-            else:
-                if not images_data[table_type][image_type]["account"].get(account_id):
-                    images_data[table_type][image_type]["account"][account_id] = []
-                image_dict["id"] += 10000000
+        if not image_dict.get("encoding"):
+            with contextlib.suppress(IndexError, AttributeError):
+                image_dict["encoding"] = image_dict["url"].split(".")[-1].replace("/", "")
 
-                images_data[table_type][image_type]["account"][account_id].append(image_dict)
+        if account_id is None:
+            key = (table_type, image_type, "plan", plan_id)
+        else:
+            key = (table_type, image_type, "account", account_id)
+            image_dict["id"] += 10000000
 
-            image_dict["url"] = urljoin(f"{settings.CUSTOM_DOMAIN}/", image_dict.get("url"))
+        image_dict["url"] = urljoin(f"{settings.CUSTOM_DOMAIN}/", image_dict.get("url"))
+        images.setdefault(key, []).append(ImageRecord(**image_dict))
+        image_types.setdefault(table_type, {})[image_type] = None
 
-    return images_data
+    return ImageIndex(
+        images={key: tuple(records) for key, records in images.items()},
+        image_types={table_type: tuple(types) for table_type, types in image_types.items()},
+    )
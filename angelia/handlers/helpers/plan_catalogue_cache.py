@@ -0,0 +1,125 @@
+import threading
+from collections.abc import Callable, Iterable
+from enum import Enum
+from itertools import product
+from typing import Any
+
+from angelia.lib.cache import CacheBackend, load_cache_backend
+from angelia.report import api_logger
+from angelia.settings import settings
+
+_plan_catalogue_cache: CacheBackend | None = None
+_plan_catalogue_cache_lock = threading.Lock()
+
+
+class PlanCatalogueType(str, Enum):
+    ALL = "all"
+    ALL_BY_POPULARITY = "all_by_popularity"
+    OVERVIEW = "overview"
+    ALL_JSON = "all_json"
+    ALL_BY_POPULARITY_JSON = "all_by_popularity_json"
+    OVERVIEW_JSON = "overview_json"
+
+
+# loyalty plan id and the plan's json either side of its is_in_wallet value
+PlanJsonFragment = tuple[int, str, str]
+
+
+def get_plan_catalogue_cache() -> CacheBackend:
+    global _plan_catalogue_cache  # noqa: PLW0603
+    if _plan_catalogue_cache is None:
+        with _plan_catalogue_cache_lock:
+            if _plan_catalogue_cache is None:
+                _plan_catalogue_cache = load_cache_backend(
+                    settings.PLAN_CATALOGUE_CACHE_BACKEND,
+                    name="plan_catalogue",
+                    max_size=settings.PLAN_CATALOGUE_CACHE_MAX_SIZE,
+                )
+    return _plan_catalogue_cache
+
+
+def _catalogue_key(channel_id: str, is_tester: bool, show_suspended: bool, catalogue_type: PlanCatalogueType) -> str:
+    return f"plan_catalogue:{channel_id}:{int(is_tester)}:{int(show_suspended)}:{catalogue_type.value}"
+
+
+def get_cached_plan_catalogue(
+    channel_id: str,
+    is_tester: bool,
+    show_suspended: bool,
+    catalogue_type: PlanCatalogueType,
+    build_catalogue: Callable[[], list],
+) -> list:
+    """
+    Returns the formatted plans visible to the channel from the cache, calling build_catalogue to make and store
+    them on a miss. The catalogue is the same for every user of the channel apart from is_in_wallet, callers must
+    set that per user using with_is_in_wallet, or join_json_fragments for the _JSON catalogue types, and must not
+    modify the returned plans.
+    """
+    if not settings.PLAN_CATALOGUE_CACHE_ENABLED:
+        return build_catalogue()
+
+    cache = get_plan_catalogue_cache()
+    key = _catalogue_key(channel_id, is_tester, show_suspended, catalogue_type)
+    if (cached := cache.get(key)) is not None:
+        return cached
+
+    catalogue = build_catalogue()
+    cache.set(key, catalogue, settings.PLAN_CATALOGUE_CACHE_TTL)
+    return catalogue
+
+
+def with_is_in_wallet(catalogue: Iterable[dict], plan_ids_in_wallet: set[int]) -> list[dict]:
+    """Shallow copies of the cached plans with is_in_wallet set for the user, nested values are shared"""
+    return [{**plan, "is_in_wallet": plan["loyalty_plan_id"] in plan_ids_in_wallet} for plan in catalogue]
+
+
+def to_json_fragments(plans: Iterable[dict], dumps: Callable[[Any], str]) -> list[PlanJsonFragment]:
+    """
+    Serializes each plan once with dumps, split either side of its is_in_wallet value so the response for a user
+    can be put together by join_json_fragments without serializing the plans again. Key order is kept.
+    """
+    # dumps({"is_in_wallet": False}) less its closing brace, whatever separators dumps uses
+    is_in_wallet_prefix_len = len(dumps({"is_in_wallet": False})) - 1
+    fragments = []
+    for plan in plans:
+        keys = list(plan)
+        split = keys.index("is_in_wallet")
+        head = dumps({**{key: plan[key] for key in keys[:split]}, "is_in_wallet": False})
+        tail = dumps({"is_in_wallet": False, **{key: plan[key] for key in keys[split + 1 :]}})
+        fragments.append((plan["loyalty_plan_id"], head[: -len("false}")], tail[is_in_wallet_prefix_len:]))
+
+    return fragments
+
+
+def join_json_fragments(
+    fragments: Iterable[PlanJsonFragment], plan_ids_in_wallet: set[int], dumps: Callable[[Any], str]
+) -> bytes:
+    """The json list of the plans made by to_json_fragments with is_in_wallet set for the user"""
+    separator = dumps([0, 0])[2:-2]
+    return (
+        "["
+        + separator.join(
+            f"{head}{'true' if plan_id in plan_ids_in_wallet else 'false'}{tail}" for plan_id, head, tail in fragments
+        )
+        + "]"
+    ).encode()
+
+
+def invalidate_plan_catalogue_cache(channel_ids: Iterable[str] | None = None) -> None:
+    """
+    Drops the cached catalogues of the given channels, or of every channel if channel_ids is None. With the in process
+    backend only this process's catalogues are dropped.
+    """
+    if not settings.PLAN_CATALOGUE_CACHE_ENABLED:
+        return
+
+    cache = get_plan_catalogue_cache()
+    if channel_ids is None:
+        cache.clear()
+        api_logger.debug("Invalidated cached loyalty plan catalogue for all channels")
+        return
+
+    for channel_id in channel_ids:
+        for is_tester, show_suspended, catalogue_type in product((True, False), (True, False), PlanCatalogueType):
+            cache.delete(_catalogue_key(channel_id, is_tester, show_suspended, catalogue_type))
+        api_logger.debug(f"Invalidated cached loyalty plan catalogue for channel {channel_id}")
@@ -1,12 +1,13 @@
 import operator
 import os
 from collections import defaultdict
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum, IntEnum
+from itertools import chain
 from operator import attrgetter
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Any, cast
 
 import falcon
 from sqlalchemy.engine import Row
@@ -15,6 +16,13 @@ from sqlalchemy.sql.expression import and_, or_, select
 
 from angelia.api.exceptions import ResourceNotFoundError
 from angelia.handlers.base import BaseHandler
+from angelia.handlers.helpers.plan_catalogue_cache import (
+    PlanCatalogueType,
+    get_cached_plan_catalogue,
+    join_json_fragments,
+    to_json_fragments,
+    with_is_in_wallet,
+)
 from angelia.hermes.models import (
     Channel,
     ClientApplication,
@@ -39,6 +47,9 @@ from angelia.settings import settings
 if TYPE_CHECKING:
     from sqlalchemy.sql.selectable import Select
 
+# plan id with one of its documents, images, tiers or contents, see select_scheme_info_queries
+SchemeInfoRow = tuple[int, SchemeDocument | None, SchemeImage | None, SchemeDetail | None, SchemeContent | None]
+
 
 class LoyaltyPlanJourney(str, Enum):
     ADD = "ADD"
@@ -68,6 +79,19 @@ class CredentialClass(str, Enum):
     REGISTER_FIELD = "register_field"
 
 
+# Iterating an Enum is slow, these are iterated for every credential, document and consent of every plan
+CREDENTIAL_CLASSES = tuple(CredentialClass)
+DOCUMENT_CLASSES = tuple(DocumentClass)
+
+# To convert from Credential classes to Document classes
+CREDENTIAL_TO_DOCUMENT_CLASS = {
+    CredentialClass.AUTH_FIELD: DocumentClass.AUTHORISE,
+    CredentialClass.ADD_FIELD: DocumentClass.ADD,
+    CredentialClass.REGISTER_FIELD: DocumentClass.REGISTER,
+    CredentialClass.JOIN_FIELD: DocumentClass.ENROL,
+}
+
+
 # SchemeBundleAssociation statuses
 class LoyaltyPlanChannelStatus(IntEnum):
     ACTIVE = 0
@@ -290,7 +314,7 @@ class BaseLoyaltyPlanHandler:
     def _sort_info_by_plan(
         self,
         plans_and_credentials: list[Row[Scheme, SchemeCredentialQuestion]],
-        plan_info: list[Row[Scheme, SchemeDocument, SchemeImage, SchemeDetail, SchemeContent]],
+        plan_info: list[SchemeInfoRow],
         consents: list[Row[ThirdPartyConsentLink]],
         plan_ids_in_wallet: list[Row[int]],
     ) -> dict:
@@ -421,32 +445,41 @@ class BaseLoyaltyPlanHandler:
 
         return query
 
-    @property
-    def select_scheme_info_query(self) -> "Select":
+    @staticmethod
+    def select_scheme_info_queries(scheme_ids: Iterable[int]) -> tuple["Select", ...]:
+        """
+        The plans' documents, images, tiers and contents. Each is queried separately, with the id of its plan, so
+        every row is returned once rather than once for each combination of the plan's other related rows.
+        """
+        now = datetime.now()
         return (
-            select(
-                Scheme.id,
-                SchemeDocument,
-                SchemeImage,
-                SchemeDetail,
-                SchemeContent,
-            )
-            .join(SchemeDocument, SchemeDocument.scheme_id == Scheme.id, isouter=True)
-            .join(
-                SchemeImage,
-                and_(
-                    SchemeImage.scheme_id == Scheme.id,
-                    SchemeImage.start_date <= datetime.now(),
-                    SchemeImage.status != ImageStatus.DRAFT,
-                    SchemeImage.image_type_code != ImageTypes.ALT_HERO,
-                    or_(SchemeImage.end_date.is_(None), SchemeImage.end_date >= datetime.now()),
-                ),
-                isouter=True,
-            )
-            .join(SchemeDetail, SchemeDetail.scheme_id_id == Scheme.id, isouter=True)
-            .join(SchemeContent, SchemeContent.scheme_id == Scheme.id, isouter=True)
+            select(SchemeDocument.scheme_id, SchemeDocument).where(SchemeDocument.scheme_id.in_(scheme_ids)),
+            select(SchemeImage.scheme_id, SchemeImage).where(
+                SchemeImage.scheme_id.in_(scheme_ids),
+                SchemeImage.start_date <= now,
+                SchemeImage.status != ImageStatus.DRAFT,
+                SchemeImage.image_type_code != ImageTypes.ALT_HERO,
+                or_(SchemeImage.end_date.is_(None), SchemeImage.end_date >= now),
+            ),
+            select(SchemeDetail.scheme_id_id, SchemeDetail).where(SchemeDetail.scheme_id_id.in_(scheme_ids)),
+            select(SchemeContent.scheme_id, SchemeContent).where(SchemeContent.scheme_id.in_(scheme_ids)),
         )
 
+    @staticmethod
+    def _scheme_info_rows(results: Iterable[list[Row]]) -> list[SchemeInfoRow]:
+        """
+        Puts the results of select_scheme_info_queries in the (plan id, document, image, tier, content) row layout
+        read by _categorise_plan_info, with only the related row from its query set in each row.
+        """
+        rows: list[SchemeInfoRow] = []
+        for index, result in enumerate(results, start=1):
+            for scheme_id, related in result:
+                row: list = [scheme_id, None, None, None, None]
+                row[index] = related
+                rows.append(cast(SchemeInfoRow, tuple(row)))
+
+        return rows
+
     @property
     def select_consents_query(self) -> "Select":
         return (
@@ -563,7 +596,7 @@ class LoyaltyPlanHandler(BaseHandler, BaseLoyaltyPlanHandler):
         self,
     ) -> tuple[
         list[Row[Scheme, SchemeCredentialQuestion]],
-        list[Row[SchemeDocument, SchemeImage, ThirdPartyConsentLink, SchemeDetail, SchemeContent]],
+        list[SchemeInfoRow],
         list[Row[ThirdPartyConsentLink]],
         list[Row[int]],
     ]:
@@ -579,8 +612,9 @@ class LoyaltyPlanHandler(BaseHandler, BaseLoyaltyPlanHandler):
             raise ResourceNotFoundError(title="Could not find this Loyalty Plan") from None
 
         try:
-            scheme_info_query = self.select_scheme_info_query.where(Scheme.id == scheme_id)
-            scheme_info = self.db_session.execute(scheme_info_query).all()
+            scheme_info = self._scheme_info_rows(
+                self.db_session.execute(query).all() for query in self.select_scheme_info_queries([scheme_id])
+            )
             consent_query = self.select_consents_query.where(
                 ThirdPartyConsentLink.scheme_id == scheme_id, Channel.bundle_id == self.channel_id
             )
@@ -682,11 +716,7 @@ class LoyaltyPlanHandler(BaseHandler, BaseLoyaltyPlanHandler):
 
         if consents and getattr(consents[0], "consent", False):
             # If consents = list[ThirdPartyConsentLink]
-            for cred_class in CredentialClass:
-                self.consents[cred_class] = []
-                for consent in consents:
-                    if getattr(consent, cred_class):
-                        self.consents[cred_class].append(consent.consent)
+            self.consents = self._group_consent_links_by_class(cast(list[ThirdPartyConsentLink], consents))
         else:
             # If consents = list[Row[Consent, ThirdPartyConsentLink]]
             for cred_class in CredentialClass:
@@ -696,37 +726,77 @@ class LoyaltyPlanHandler(BaseHandler, BaseLoyaltyPlanHandler):
                         self.consents[cred_class].append(consent.Consent)
 
     def _categorise_creds_by_class(self, all_credentials: list) -> dict:
-        # Finds manual and scan questions:
-        for cred in all_credentials:
+        manual_question, scan_question = self._find_manual_and_scan_questions(all_credentials)
+        self.manual_question = manual_question or self.manual_question
+        self.scan_question = scan_question or self.scan_question
+
+        self.loyalty_plan_credentials = self._group_creds_by_class(
+            all_credentials, self.manual_question, self.scan_question
+        )
+        return self.loyalty_plan_credentials
+
+    def _categorise_documents_to_class(self, all_documents: list) -> dict:
+        self.documents = self._group_documents_by_class(all_documents)
+        return self.documents
+
+    @staticmethod
+    def _find_manual_and_scan_questions(
+        credentials: Iterable[SchemeCredentialQuestion],
+    ) -> tuple[SchemeCredentialQuestion | None, SchemeCredentialQuestion | None]:
+        manual_question = scan_question = None
+        for cred in credentials:
             if cred.manual_question:
-                self.manual_question = cred
+                manual_question = cred
             if cred.scan_question:
-                self.scan_question = cred
+                scan_question = cred
+
+        return manual_question, scan_question
 
+    @staticmethod
+    def _group_creds_by_class(
+        credentials: Iterable[SchemeCredentialQuestion],
+        manual_question: SchemeCredentialQuestion | None,
+        scan_question: SchemeCredentialQuestion | None,
+    ) -> dict[CredentialClass, list[SchemeCredentialQuestion]]:
         # - if the scheme has a scan question and a manual question, do not include the manual question - (this
         # will be subordinated to the scan question later)
-        if self.manual_question and self.scan_question:
-            all_credentials.remove(self.manual_question)
+        skipped_question = manual_question if manual_question and scan_question else None
 
-        # Categorises credentials by class
-        self.loyalty_plan_credentials = {}
-        for cred_class in CredentialClass:
-            self.loyalty_plan_credentials[cred_class] = []
-            for item in all_credentials:
-                if getattr(item, cred_class):
-                    self.loyalty_plan_credentials[cred_class].append(item)
+        grouped_creds: dict[CredentialClass, list[SchemeCredentialQuestion]] = {
+            cred_class: [] for cred_class in CREDENTIAL_CLASSES
+        }
+        for cred in credentials:
+            if cred is skipped_question:
+                continue
+            for cred_class in CREDENTIAL_CLASSES:
+                if getattr(cred, cred_class):
+                    grouped_creds[cred_class].append(cred)
 
-        return self.loyalty_plan_credentials
+        return grouped_creds
 
-    def _categorise_documents_to_class(self, all_documents: list) -> dict:
-        # Categorises docs by class
-        self.documents = {}
-        for doc_class in DocumentClass:
-            self.documents[doc_class] = []
-            for document in all_documents:
-                if document and doc_class in document.display:
-                    self.documents[doc_class].append(document)
-        return self.documents
+    @staticmethod
+    def _group_documents_by_class(documents: Iterable[SchemeDocument | None]) -> dict[DocumentClass, list]:
+        grouped_documents: dict[DocumentClass, list] = {doc_class: [] for doc_class in DOCUMENT_CLASSES}
+        for document in documents:
+            if not document:
+                continue
+            for doc_class in DOCUMENT_CLASSES:
+                if doc_class in document.display:
+                    grouped_documents[doc_class].append(document)
+
+        return grouped_documents
+
+    @staticmethod
+    def _group_consent_links_by_class(
+        consent_links: Iterable[ThirdPartyConsentLink],
+    ) -> dict[CredentialClass, list[Consent]]:
+        grouped_consents: dict[CredentialClass, list[Consent]] = {cred_class: [] for cred_class in CREDENTIAL_CLASSES}
+        for consent_link in consent_links:
+            for cred_class in CREDENTIAL_CLASSES:
+                if getattr(consent_link, cred_class):
+                    grouped_consents[cred_class].append(consent_link.consent)
+
+        return grouped_consents
 
     def _fetch_consents(self) -> list[Row[Consent, ThirdPartyConsentLink]]:
         query = (
@@ -745,11 +815,29 @@ class LoyaltyPlanHandler(BaseHandler, BaseLoyaltyPlanHandler):
             raise falcon.HTTPInternalServerError from None
 
     def _format_journey_fields(self) -> dict:
+        return self._journey_fields_to_dict(
+            self.loyalty_plan_credentials, self.documents, self.consents, self.manual_question, self.scan_question
+        )
+
+    @classmethod
+    def _journey_fields_to_dict(  # noqa: PLR0913
+        cls,
+        credentials: dict[CredentialClass, list[SchemeCredentialQuestion]],
+        documents: dict[DocumentClass, list[SchemeDocument]],
+        consents: dict[CredentialClass, list[Consent]],
+        manual_question: SchemeCredentialQuestion | None,
+        scan_question: SchemeCredentialQuestion | None,
+    ) -> dict:
         return {
-            "join_fields": self._get_all_fields(CredentialClass.JOIN_FIELD),
-            "register_ghost_card_fields": self._get_all_fields(CredentialClass.REGISTER_FIELD),
-            "add_fields": self._get_all_fields(CredentialClass.ADD_FIELD),
-            "authorise_fields": self._get_all_fields(CredentialClass.AUTH_FIELD),
+            field_name: cls._get_all_fields(
+                field_class, credentials, documents, consents, manual_question, scan_question
+            )
+            for field_name, field_class in (
+                ("join_fields", CredentialClass.JOIN_FIELD),
+                ("register_ghost_card_fields", CredentialClass.REGISTER_FIELD),
+                ("add_fields", CredentialClass.ADD_FIELD),
+                ("authorise_fields", CredentialClass.AUTH_FIELD),
+            )
         }
 
     @staticmethod
@@ -797,54 +885,96 @@ class LoyaltyPlanHandler(BaseHandler, BaseLoyaltyPlanHandler):
 
         return cred_detail
 
-    def _credentials_to_dict(self, credentials: list[SchemeCredentialQuestion]) -> list[dict]:
+    @classmethod
+    def _credentials_to_dict(
+        cls,
+        credentials: list[SchemeCredentialQuestion],
+        manual_question: SchemeCredentialQuestion | None,
+        scan_question: SchemeCredentialQuestion | None,
+    ) -> list[dict]:
         creds_list = []
         for cred in credentials:
-            cred_detail = self._credential_to_dict(cred)
+            cred_detail = cls._credential_to_dict(cred)
 
             # Subordinates the manual question to scan question and equates their order
-            if cred == self.scan_question and self.manual_question:
-                cred_detail["alternative"] = self._credential_to_dict(self.manual_question)
-                cred_detail["alternative"]["order"] = self.scan_question.order
+            if scan_question and cred == scan_question and manual_question:
+                cred_detail["alternative"] = cls._credential_to_dict(manual_question)
+                cred_detail["alternative"]["order"] = scan_question.order
 
             creds_list.append(cred_detail)
 
         return creds_list
 
-    def _get_all_fields(self, field_class: CredentialClass) -> dict:
+    @classmethod
+    def _get_all_fields(  # noqa: PLR0913
+        cls,
+        field_class: CredentialClass,
+        credentials: dict[CredentialClass, list[SchemeCredentialQuestion]],
+        documents: dict[DocumentClass, list[SchemeDocument]],
+        consents: dict[CredentialClass, list[Consent]],
+        manual_question: SchemeCredentialQuestion | None,
+        scan_question: SchemeCredentialQuestion | None,
+    ) -> dict:
         field_class_response = {}
 
-        # To convert from Credential classes to Document classes
-        cred_to_doc_key = {
-            CredentialClass.AUTH_FIELD: DocumentClass.AUTHORISE,
-            CredentialClass.ADD_FIELD: DocumentClass.ADD,
-            CredentialClass.REGISTER_FIELD: DocumentClass.REGISTER,
-            CredentialClass.JOIN_FIELD: DocumentClass.ENROL,
-        }
-
-        if self.loyalty_plan_credentials[field_class]:
-            field_class_response["credentials"] = self._credentials_to_dict(self.loyalty_plan_credentials[field_class])
-        if self.documents[cred_to_doc_key[field_class]]:
-            field_class_response["plan_documents"] = self._documents_to_dict(
-                self.documents[cred_to_doc_key[field_class]]
+        if credentials[field_class]:
+            field_class_response["credentials"] = cls._credentials_to_dict(
+                credentials[field_class], manual_question, scan_question
             )
-        if self.consents[field_class]:
-            field_class_response["consents"] = self._consents_to_dict(self.consents[field_class])
-        # add consents
+        if field_documents := documents[CREDENTIAL_TO_DOCUMENT_CLASS[field_class]]:
+            field_class_response["plan_documents"] = cls._documents_to_dict(field_documents)
+        if consents[field_class]:
+            field_class_response["consents"] = cls._consents_to_dict(consents[field_class])
 
         return field_class_response
 
 
 @dataclass
 class LoyaltyPlansHandler(BaseHandler, BaseLoyaltyPlanHandler):
+    def _fetch_plan_ids_in_wallet(self) -> list[Row[int]]:
+        try:
+            in_wallet_query = self.select_plan_ids_in_wallet_query.where(
+                SchemeAccountUserAssociation.user_id == self.user_id
+            )
+            return self.db_session.execute(in_wallet_query).all()
+        except DatabaseError:
+            api_logger.exception(
+                "Unable to fetch loyalty plan ids of loyalty accounts already in the user's wallet "
+                f"(user_id={self.user_id})"
+            )
+            raise falcon.HTTPInternalServerError from None
+
     def _fetch_all_plan_information(
         self,
     ) -> tuple[
         list[Row[Scheme, SchemeCredentialQuestion]],
-        list[Row[SchemeDocument, SchemeImage, ThirdPartyConsentLink, SchemeDetail, SchemeContent]],
+        list[SchemeInfoRow],
         list[Row[ThirdPartyConsentLink]],
         list[Row[int]],
         dict[int, int],
+    ]:
+        (
+            schemes_and_questions,
+            scheme_info,
+            consents,
+            scheme_id_channel_popularity_map,
+        ) = self._fetch_plan_catalogue_information()
+
+        return (
+            schemes_and_questions,
+            scheme_info,
+            consents,
+            self._fetch_plan_ids_in_wallet(),
+            scheme_id_channel_popularity_map,
+        )
+
+    def _fetch_plan_catalogue_information(
+        self,
+    ) -> tuple[
+        list[Row[Scheme, SchemeCredentialQuestion]],
+        list[SchemeInfoRow],
+        list[Row[ThirdPartyConsentLink]],
+        dict[int, int],
     ]:
         try:
             schemes_query = self.select_plan_query.where(
@@ -865,8 +995,9 @@ class LoyaltyPlansHandler(BaseHandler, BaseLoyaltyPlanHandler):
             raise falcon.HTTPInternalServerError from None
 
         try:
-            scheme_info_query = self.select_scheme_info_query.where(Scheme.id.in_(scheme_ids))
-            scheme_info = self.db_session.execute(scheme_info_query).all()
+            scheme_info = self._scheme_info_rows(
+                self.db_session.execute(query).all() for query in self.select_scheme_info_queries(scheme_ids)
+            )
             consent_query = self.select_consents_query.where(
                 ThirdPartyConsentLink.scheme_id.in_(scheme_ids), Channel.bundle_id == self.channel_id
             )
@@ -877,29 +1008,15 @@ class LoyaltyPlansHandler(BaseHandler, BaseLoyaltyPlanHandler):
             api_logger.exception("Unable to fetch loyalty plan records from database")
             raise falcon.HTTPInternalServerError from None
 
-        try:
-            in_wallet_query = self.select_plan_ids_in_wallet_query.where(
-                SchemeAccountUserAssociation.user_id == self.user_id
-            )
-            plan_ids_in_wallet = self.db_session.execute(in_wallet_query).all()
-        except DatabaseError:
-            api_logger.exception(
-                "Unable to fetch loyalty plan ids of loyalty accounts already in the user's wallet "
-                f"(user_id={self.user_id})"
-            )
-            raise falcon.HTTPInternalServerError from None
-
-        return (
-            schemes_and_questions,
-            scheme_info,
-            consents,
-            plan_ids_in_wallet,
-            scheme_id_channel_popularity_map,
-        )
+        return schemes_and_questions, scheme_info, consents, scheme_id_channel_popularity_map
 
     def _fetch_all_plan_information_overview(
         self,
     ) -> tuple[list[Row[Scheme, SchemeImage]], list[Row[int]], dict[int, int]]:
+        schemes_and_images, scheme_id_channel_popularity_map = self._fetch_plan_catalogue_information_overview()
+        return schemes_and_images, self._fetch_plan_ids_in_wallet(), scheme_id_channel_popularity_map
+
+    def _fetch_plan_catalogue_information_overview(self) -> tuple[list[Row[Scheme, SchemeImage]], dict[int, int]]:
         schemes_query = self.select_plan_and_images_query.where(Channel.bundle_id == self.channel_id)
 
         try:
@@ -912,19 +1029,7 @@ class LoyaltyPlansHandler(BaseHandler, BaseLoyaltyPlanHandler):
             api_logger.exception("Unable to fetch loyalty plan records from database")
             raise falcon.HTTPInternalServerError from None
 
-        try:
-            in_wallet_query = self.select_plan_ids_in_wallet_query.where(
-                SchemeAccountUserAssociation.user_id == self.user_id
-            )
-            plan_ids_in_wallet = self.db_session.execute(in_wallet_query).all()
-        except DatabaseError:
-            api_logger.exception(
-                "Unable to fetch loyalty plan ids of loyalty accounts already in the user's wallet "
-                f"(user_id={self.user_id})"
-            )
-            raise falcon.HTTPInternalServerError from None
-
-        return schemes_and_images, plan_ids_in_wallet, scheme_id_channel_popularity_map
+        return schemes_and_images, scheme_id_channel_popularity_map
 
     def _overview_sort_info_by_plan(
         self,
@@ -948,43 +1053,105 @@ class LoyaltyPlansHandler(BaseHandler, BaseLoyaltyPlanHandler):
         return sorted_plan_information
 
     def get_all_plans(self, order_by_popularity: bool = False) -> list:
+        catalogue = get_cached_plan_catalogue(
+            self.channel_id,
+            self.is_tester,
+            self._show_suspended,
+            PlanCatalogueType.ALL_BY_POPULARITY if order_by_popularity else PlanCatalogueType.ALL,
+            lambda: self._build_plan_catalogue(order_by_popularity),
+        )
+        return with_is_in_wallet(catalogue, {row[0] for row in self._fetch_plan_ids_in_wallet()})
+
+    def get_all_plans_overview(self) -> list:
+        catalogue = get_cached_plan_catalogue(
+            self.channel_id,
+            self.is_tester,
+            self._show_suspended,
+            PlanCatalogueType.OVERVIEW,
+            self._build_plan_catalogue_overview,
+        )
+        return with_is_in_wallet(catalogue, {row[0] for row in self._fetch_plan_ids_in_wallet()})
+
+    def get_all_plans_json(
+        self,
+        serialize_plans: Callable[[list[dict]], list[dict]],
+        dumps: Callable[[Any], str],
+        order_by_popularity: bool = False,
+    ) -> bytes:
+        """
+        get_all_plans as a json response body. Plans go through serialize_plans and dumps once when the catalogue
+        is built and are cached as json fragments, so a request only joins them with the user's is_in_wallet.
+        """
+        catalogue = get_cached_plan_catalogue(
+            self.channel_id,
+            self.is_tester,
+            self._show_suspended,
+            PlanCatalogueType.ALL_BY_POPULARITY_JSON if order_by_popularity else PlanCatalogueType.ALL_JSON,
+            lambda: to_json_fragments(serialize_plans(self._build_plan_catalogue(order_by_popularity)), dumps),
+        )
+        return join_json_fragments(catalogue, {row[0] for row in self._fetch_plan_ids_in_wallet()}, dumps)
+
+    def get_all_plans_overview_json(
+        self, serialize_plans: Callable[[list[dict]], list[dict]], dumps: Callable[[Any], str]
+    ) -> bytes:
+        """get_all_plans_overview as a json response body, see get_all_plans_json"""
+        catalogue = get_cached_plan_catalogue(
+            self.channel_id,
+            self.is_tester,
+            self._show_suspended,
+            PlanCatalogueType.OVERVIEW_JSON,
+            lambda: to_json_fragments(serialize_plans(self._build_plan_catalogue_overview()), dumps),
+        )
+        return join_json_fragments(catalogue, {row[0] for row in self._fetch_plan_ids_in_wallet()}, dumps)
+
+    @staticmethod
+    def _get_journey_fields_by_plan(sorted_plan_information: dict) -> dict[int, dict]:
+        """
+        Journey fields of every plan, as LoyaltyPlanHandler.get_journey_fields gives them, made in one pass over
+        each kind of row. Rows are sorted once for all plans, grouping them by plan afterwards keeps that order.
+        """
+        rows_by_plan: dict[str, dict[int, list]] = {}
+        for info_field, attr in (("credentials", "order"), ("documents", "order"), ("consents", "consent.order")):
+            rows_by_plan[info_field] = {plan_id: [] for plan_id in sorted_plan_information}
+            all_rows = chain.from_iterable(plan_info[info_field] for plan_info in sorted_plan_information.values())
+            for row in sorted(all_rows, key=attrgetter(attr)):
+                rows_by_plan[info_field][row.scheme_id].append(row)
+
+        journey_fields_by_plan = {}
+        for plan_id in sorted_plan_information:
+            creds = rows_by_plan["credentials"][plan_id]
+            manual_question, scan_question = LoyaltyPlanHandler._find_manual_and_scan_questions(creds)
+            journey_fields_by_plan[plan_id] = LoyaltyPlanHandler._journey_fields_to_dict(
+                LoyaltyPlanHandler._group_creds_by_class(creds, manual_question, scan_question),
+                LoyaltyPlanHandler._group_documents_by_class(rows_by_plan["documents"][plan_id]),
+                LoyaltyPlanHandler._group_consent_links_by_class(rows_by_plan["consents"][plan_id]),
+                manual_question,
+                scan_question,
+            )
+
+        return journey_fields_by_plan
+
+    def _build_plan_catalogue(self, order_by_popularity: bool) -> list[dict]:
+        """All plans visible to the channel formatted with is_in_wallet=False, see get_all_plans"""
         (
             schemes_and_questions,
             scheme_info,
             consents,
-            plan_ids_in_wallet,
             scheme_id_channel_popularity_map,
-        ) = self._fetch_all_plan_information()
-        sorted_plan_information = self._sort_info_by_plan(
-            schemes_and_questions, scheme_info, consents, plan_ids_in_wallet
-        )
+        ) = self._fetch_plan_catalogue_information()
+        sorted_plan_information = self._sort_info_by_plan(schemes_and_questions, scheme_info, consents, [])
 
         plans_by_popularity_map: dict[int, list[dict]] = defaultdict(list)
         unordered_plans: list[dict] = []
 
-        for plan_info in sorted_plan_information.values():
-            plan_info["credentials"] = self._sort_by_attr(plan_info["credentials"])
-            plan_info["consents"] = self._sort_by_attr(plan_info["consents"], attr="consent.order")
-            plan_info["documents"] = self._sort_by_attr(plan_info["documents"])
-
-            journey_fields = LoyaltyPlanHandler(
-                user_id=self.user_id,
-                channel_id=self.channel_id,
-                db_session=self.db_session,
-                loyalty_plan_id=plan_info["plan"].id,
-                is_tester=self.is_tester,
-            ).get_journey_fields(
-                plan=plan_info["plan"],
-                creds=plan_info["credentials"],
-                docs=plan_info["documents"],
-                consents=plan_info["consents"],
-            )
+        journey_fields_by_plan = self._get_journey_fields_by_plan(sorted_plan_information)
 
+        for plan_id, plan_info in sorted_plan_information.items():
             formatted_plan_data = self._format_plan_data(
                 plan_info["plan"],
                 plan_info["images"],
                 plan_info["tiers"],
-                journey_fields,
+                journey_fields_by_plan[plan_id],
                 plan_info["contents"],
                 plan_info["is_in_wallet"],
             )
@@ -1009,13 +1176,10 @@ class LoyaltyPlansHandler(BaseHandler, BaseLoyaltyPlanHandler):
 
         return plans_by_popularity + unordered_plans
 
-    def get_all_plans_overview(self) -> list:
-        (
-            schemes_and_images,
-            plan_ids_in_wallet,
-            scheme_id_channel_popularity_map,
-        ) = self._fetch_all_plan_information_overview()
-        sorted_plan_information = self._overview_sort_info_by_plan(schemes_and_images, plan_ids_in_wallet)
+    def _build_plan_catalogue_overview(self) -> list[dict]:
+        """Overview of the plans visible to the channel formatted with is_in_wallet=False, see get_all_plans_overview"""
+        schemes_and_images, scheme_id_channel_popularity_map = self._fetch_plan_catalogue_information_overview()
+        sorted_plan_information = self._overview_sort_info_by_plan(schemes_and_images, [])
 
         plans_by_popularity_map: dict[int, list[dict]] = defaultdict(list)
         unordered_plans: list[dict] = []
@@ -1,15 +1,15 @@
 import time
 from contextlib import suppress
-from copy import deepcopy
 from typing import TYPE_CHECKING, Any, cast
 
 import falcon
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.engine import Row
 
 from angelia.api.exceptions import ResourceNotFoundError
 from angelia.handlers.base import BaseHandler
-from angelia.handlers.helpers.images import query_all_images
+from angelia.handlers.helpers.images import ImageIndex, process_images_query, query_all_images, select_all_images
 from angelia.handlers.loyalty_plan import LoyaltyPlanChannelStatus
 from angelia.hermes.models import (
     Channel,
@@ -33,9 +33,11 @@ from angelia.lib.payment_card import PllLinkState, WalletPLLSlug
 from angelia.lib.vouchers import MAX_INACTIVE, VoucherState, voucher_state_names
 from angelia.messaging.sender import send_message_to_hermes
 from angelia.report import api_logger
+from angelia.settings import settings
 
 if TYPE_CHECKING:
-    from sqlalchemy.sql.selectable import Select
+    from sqlalchemy.sql.elements import ColumnElement
+    from sqlalchemy.sql.selectable import FromClause, Select
 
 
 def process_loyalty_currency_name(currency: str | None, prefix: str | None, suffix: str | None) -> str:
@@ -302,6 +304,15 @@ def is_reward_available(raw_vouchers: list, state: StatusName | str) -> bool:
     return reward
 
 
+def get_target_value(vouchers: list[dict]) -> str | None:
+    """Target value of the first in progress voucher, vouchers must already be processed by process_vouchers"""
+    for voucher in vouchers:
+        if voucher["state"] == voucher_state_names[VoucherState.IN_PROGRESS]:
+            return voucher["target_value"]
+
+    return None
+
+
 def dict_from_obj(values_obj: Any) -> dict[str, str]:
     values_dict = {}
     if values_obj:
@@ -346,55 +357,49 @@ def check_one(results: list, row_id: int, log_message_multiple: str) -> dict:
 
 
 def process_hero_image(  # noqa: PLR0913
-    available_images: dict, table_type: str, account_id: int, plan_id: int, tier: int | None, image_list: list
+    available_images: ImageIndex, table_type: str, account_id: int, plan_id: int, tier: int | None, image_list: list
 ) -> None:
     # Determine what image to return as the hero image.
     # If tier image is available return that as the hero image.
     # Scheme account images still takes precedent over scheme images.
-    account_tier_images = deepcopy(available_images[table_type][ImageTypes.TIER]["account"].get(account_id, []))
-    account_hero_images = deepcopy(available_images[table_type][ImageTypes.HERO]["account"].get(account_id, []))
-
-    plan_tier_images = deepcopy(available_images[table_type][ImageTypes.TIER]["plan"].get(plan_id, []))
-    plan_hero_images = deepcopy(available_images[table_type][ImageTypes.HERO]["plan"].get(plan_id, []))
+    if ImageTypes.HERO not in available_images.image_types.get(table_type, ()):
+        # tier images are only used in place of a hero image
+        return
 
-    reward_tier = False
+    account_tier_images = available_images.get(table_type, ImageTypes.TIER, "account", account_id)
+    account_hero_images = available_images.get(table_type, ImageTypes.HERO, "account", account_id)
 
-    for tier_image in account_tier_images or plan_tier_images:
-        if tier_image["reward_tier"] == tier and not account_hero_images:
-            tier_image["type"] = ImageTypes.HERO
-            tier_image.pop("reward_tier", None)
+    plan_tier_images = available_images.get(table_type, ImageTypes.TIER, "plan", plan_id)
+    plan_hero_images = available_images.get(table_type, ImageTypes.HERO, "plan", plan_id)
 
-            image_list.append(tier_image)
-            reward_tier = True
-            break
+    if not account_hero_images:
+        for tier_image in account_tier_images or plan_tier_images:
+            if tier_image.reward_tier == tier:
+                image_list.append(tier_image.as_dict(image_type=ImageTypes.HERO))
+                return
 
     # Return hero image if tier image is not found
-    if not reward_tier:
-        for hero_image in account_hero_images or plan_hero_images:
-            hero_image.pop("reward_tier", None)
-            image_list.append(hero_image)
+    image_list.extend(hero_image.as_dict() for hero_image in account_hero_images or plan_hero_images)
 
 
 def get_image_list(
-    available_images: dict, table_type: str, account_id: int, plan_id: int, tier: int | None = None
+    available_images: ImageIndex, table_type: str, account_id: int, plan_id: int, tier: int | None = None
 ) -> list:
-    image_list = []
-    with suppress(KeyError):
-        tier_image_available = ImageTypes.TIER in available_images[table_type]
-        for image_type in available_images[table_type]:
-            image = deepcopy(available_images[table_type][image_type]["account"].get(account_id, []))
-            if not image:
-                image = deepcopy(available_images[table_type][image_type]["plan"].get(plan_id, []))
-            if image:
-                if tier_image_available and image_type in (ImageTypes.TIER, ImageTypes.HERO):
-                    # Hero image and tier image handled by process_hero_image()
-                    continue
-                for each in image:
-                    each.pop("reward_tier", None)
-                    image_list.append(each)
-
-        if tier_image_available:
-            process_hero_image(available_images, table_type, account_id, plan_id, tier, image_list)
+    image_list: list[dict] = []
+    image_types = available_images.image_types.get(table_type, ())
+    tier_image_available = ImageTypes.TIER in image_types
+    for image_type in image_types:
+        if tier_image_available and image_type in (ImageTypes.TIER, ImageTypes.HERO):
+            # Hero image and tier image handled by process_hero_image()
+            continue
+
+        images = available_images.get(table_type, image_type, "account", account_id) or available_images.get(
+            table_type, image_type, "plan", plan_id
+        )
+        image_list.extend(image.as_dict() for image in images)
+
+    if tier_image_available:
+        process_hero_image(available_images, table_type, account_id, plan_id, tier, image_list)
 
     return image_list
 
@@ -407,7 +412,7 @@ class WalletHandler(BaseHandler):
     pll_for_payment_accounts: dict = None  # type: ignore [assignment]
     pll_active_accounts: int = None  # type: ignore [assignment]
     pll_fully_linked: bool = None  # type: ignore [assignment]
-    all_images: dict = None  # type: ignore [assignment]
+    all_images: ImageIndex = None  # type: ignore [assignment]
 
     @property
     def _scheme_account_query(self) -> "Select":
@@ -427,7 +432,9 @@ class WalletHandler(BaseHandler):
                 Scheme.text_colour,
                 Scheme.name.label("scheme_name"),
                 SchemeDocument.url.label("voucher_url"),
-                SchemeOverrideError,
+                SchemeOverrideError.id.label("override_error_id"),
+                SchemeOverrideError.error_slug.label("override_error_slug"),
+                SchemeOverrideError.message.label("override_error_message"),
             )
             .join(SchemeAccountUserAssociation, SchemeAccountUserAssociation.scheme_account_id == SchemeAccount.id)
             .join(Scheme)
@@ -482,6 +489,58 @@ class WalletHandler(BaseHandler):
         self._query_db(full=False)
         return {"joins": self.joins, "loyalty_cards": self.loyalty_cards, "payment_accounts": self.payment_accounts}
 
+    def get_wallet_version_token(self) -> str:
+        """
+        Cheap token over the rows in the user's wallet, used for conditional GETs. It changes whenever a loyalty
+        card, payment account or PLL link is added to or removed from the wallet, or when one of those rows is
+        updated. Plan and image changes are not covered so the caller should bound how long a token is trusted.
+        """
+
+        def rows_digest(row: "ColumnElement", order_by: "ColumnElement") -> "ColumnElement":
+            return func.md5(func.string_agg(row, aggregate_order_by(literal(","), order_by)))
+
+        scheme_accounts = (
+            select(
+                rows_digest(
+                    func.concat(
+                        SchemeAccountUserAssociation.id,
+                        ":",
+                        SchemeAccountUserAssociation.link_status,
+                        ":",
+                        SchemeAccount.updated,
+                    ),
+                    SchemeAccountUserAssociation.id,
+                )
+            )
+            .join(SchemeAccount, SchemeAccount.id == SchemeAccountUserAssociation.scheme_account_id)
+            .where(SchemeAccountUserAssociation.user_id == self.user_id)
+            .scalar_subquery()
+        )
+        payment_accounts = (
+            select(
+                rows_digest(
+                    func.concat(PaymentAccountUserAssociation.id, ":", PaymentAccount.updated),
+                    PaymentAccountUserAssociation.id,
+                )
+            )
+            .join(PaymentAccount, PaymentAccount.id == PaymentAccountUserAssociation.payment_card_account_id)
+            .where(PaymentAccountUserAssociation.user_id == self.user_id)
+            .scalar_subquery()
+        )
+        pll_links = (
+            select(
+                rows_digest(
+                    func.concat(PLLUserAssociation.id, ":", PLLUserAssociation.updated),
+                    PLLUserAssociation.id,
+                )
+            )
+            .where(PLLUserAssociation.user_id == self.user_id)
+            .scalar_subquery()
+        )
+
+        digests = self.db_session.execute(select(scheme_accounts, payment_accounts, pll_links)).one()
+        return ":".join([str(self.user_id), self.channel_id, *(digest or "" for digest in digests)])
+
     def get_payment_account_channel_links(self) -> dict:
         """
         Get the payment accounts linked to each loyalty_card and the channels linked to each user
@@ -520,7 +579,7 @@ class WalletHandler(BaseHandler):
         self.joins = []
         self.loyalty_cards = []
         self.payment_accounts = []
-        self.all_images = {}
+        self.all_images = ImageIndex()
 
         # query & process pll first
         pll_result = self.query_all_pll(schemeaccount_id=loyalty_card_id)
@@ -579,7 +638,7 @@ class WalletHandler(BaseHandler):
 
     def get_loyalty_card_balance_response(self, loyalty_card_id: int) -> dict:
         query_dict = check_one(
-            self.query_scheme_account(loyalty_card_id, SchemeAccount.balances),
+            self.query_scheme_account(loyalty_card_id, SchemeAccount.balances, SchemeAccount.vouchers),
             loyalty_card_id,
             "Loyalty Card Balance Wallet Error:",
         )
@@ -587,8 +646,9 @@ class WalletHandler(BaseHandler):
         match LoyaltyCardStatus.get_status_dict(query_dict["link_status"]).get("api2_state"), query_dict["authorised"]:
             case (StatusName.AUTHORISED, _) | (StatusName.DEPENDANT, True):
                 balance = get_balance_dict(query_dict.get("balances", []))
-                target_value = self.get_target_value(loyalty_card_id)
-                balance["target_value"] = target_value
+                # vouchers are fetched with the balance so the target value does not need another query
+                vouchers = process_vouchers(query_dict.get("vouchers", []), "")
+                balance["target_value"] = get_target_value(vouchers)
                 balance.pop("reward_tier", None)
             case _:
                 balance = get_balance_dict(None)
@@ -624,51 +684,88 @@ class WalletHandler(BaseHandler):
         self.loyalty_cards = []
         self.payment_accounts = []
 
-        self.all_images = {}
+        self.all_images = ImageIndex()
+        image_types = None if full else ImageTypes.HERO  # Defaults to all image types
 
-        # First get pll lists from a query and use rotate the results to prepare payment and loyalty pll responses
-        # Note we could have done this with one complex query on payment but it would have returned more rows and
-        # is less readable.  Alternatively we could have used the links json in the Scheme accounts but that seems
-        # like a hack used for Ubiquity performance and may need to be removed in the future.
+        image_rows = None
+        if settings.WALLET_QUERY_ENGINE == "json":
+            pll_accounts, query_accounts, query_schemes, image_rows = self.query_wallet_json(image_types)
+        else:
+            # First get pll lists from a query and use rotate the results to prepare payment and loyalty pll
+            # responses. Note we could have done this with one complex query on payment but it would have returned
+            # more rows and is less readable.  Alternatively we could have used the links json in the Scheme
+            # accounts but that seems like a hack used for Ubiquity performance and may need to be removed in the
+            # future.
+            pll_accounts = self.query_all_pll()
+            query_accounts = self.query_payment_accounts()
+            query_schemes = self.query_scheme_accounts()
 
-        pll_accounts = self.query_all_pll()
         self.process_pll(pll_accounts)
 
-        image_types = None if full else ImageTypes.HERO  # Defaults to all image types
         # Build the payment account part excluding images which will be confined to accounts and plan ids present.
-        query_accounts = self.query_payment_accounts()
         pay_card_index, pay_accounts = self.process_payment_card_response(query_accounts, full)
 
         # Do same for the loyalty account and join parts
-        query_schemes = self.query_scheme_accounts()
-
         (
             loyalty_card_index,
             loyalty_cards,
             join_cards,
         ) = self.process_loyalty_cards_response(query_schemes, full, query_accounts)
 
-        # Find images from all 4 image tables in one query but restricted to items listed in api
-        self.all_images = query_all_images(
-            db_session=self.db_session,
-            user_id=self.user_id,
-            channel_id=self.channel_id,
-            loyalty_card_index=loyalty_card_index,
-            pay_card_index=pay_card_index,
-            show_type=image_types,
-        )
+        if image_rows is None:
+            # Find images from all 4 image tables in one query but restricted to items listed in api
+            self.all_images = query_all_images(
+                db_session=self.db_session,
+                user_id=self.user_id,
+                channel_id=self.channel_id,
+                loyalty_card_index=loyalty_card_index,
+                pay_card_index=pay_card_index,
+                show_type=image_types,
+            )
+        else:
+            self.all_images = process_images_query(image_rows)
 
         # now add the images into relevant sections of the api output
         self.add_card_images_to_response(pay_accounts, pay_card_index)
         self.add_scheme_images_to_response(loyalty_cards, join_cards, loyalty_card_index)
 
-    def query_all_pll(self, schemeaccount_id: int | None = None) -> list[dict]:
+    def query_wallet_json(self, image_types: ImageTypes | None) -> tuple[list, list, list, list]:
         """
-        Constructs the payment account and Scheme account pll lists from one query
-        to injected into Loyalty and Payment account response dicts
+        Fetches the pll, payment account, loyalty card and image rows used to build the wallet in one round trip.
 
-        stores lists of pll responses indexed by scheme and payment account id
+        Each of the queries used by the orm engine is aggregated by Postgres into a json array of row objects, the
+        images being restricted to the accounts and plans in the other queries rather than to an index built in
+        Python. The rows are then processed in the same way as the orm engine rows.
         """
+        payment_accounts = self._payment_account_query.cte("payment_accounts")
+        scheme_accounts = self._scheme_account_query.cte("scheme_accounts")
+        images = select_all_images(
+            user_id=self.user_id,
+            channel_id=self.channel_id,
+            loyalty_account_ids=select(scheme_accounts.c.id),
+            loyalty_plan_ids=select(scheme_accounts.c.scheme_id),
+            payment_account_ids=select(payment_accounts.c.id),
+            payment_plan_ids=select(payment_accounts.c.plan_id),
+            show_type=image_types,
+        ).subquery("images")
+
+        def json_rows(rows: "FromClause") -> "ColumnElement":
+            return (
+                select(func.coalesce(func.json_agg(rows.table_valued()), literal_column("'[]'::json")))
+                .select_from(rows)
+                .scalar_subquery()
+            )
+
+        query = select(
+            json_rows(self._pll_query().subquery("pll")),
+            json_rows(payment_accounts),
+            json_rows(scheme_accounts),
+            json_rows(images),
+        )
+        pll_accounts, query_accounts, query_schemes, image_rows = self.db_session.execute(query).one()
+        return pll_accounts, query_accounts, query_schemes, image_rows
+
+    def _pll_query(self, schemeaccount_id: int | None = None) -> "Select":
         query = (
             select(
                 PaymentAccount.id.label("payment_account_id"),
@@ -697,7 +794,16 @@ class WalletHandler(BaseHandler):
         if schemeaccount_id:
             query = query.where(SchemeAccount.id == schemeaccount_id)
 
-        accounts = self.db_session.execute(query).all()
+        return query
+
+    def query_all_pll(self, schemeaccount_id: int | None = None) -> list[dict]:
+        """
+        Constructs the payment account and Scheme account pll lists from one query
+        to injected into Loyalty and Payment account response dicts
+
+        stores lists of pll responses indexed by scheme and payment account id
+        """
+        accounts = self.db_session.execute(self._pll_query(schemeaccount_id)).all()
         return accounts
 
     def process_pll(self, accounts: list) -> None:
@@ -740,9 +846,9 @@ class WalletHandler(BaseHandler):
         self.pll_active_accounts = len([pll for pll in plls if pll["status"]["state"] == "active"])
         self.pll_fully_linked = 0 < self.pll_active_accounts == total_accounts > 0
 
-    def query_payment_accounts(self) -> list:
-        self.payment_accounts = []
-        query = (
+    @property
+    def _payment_account_query(self) -> "Select":
+        return (
             select(
                 PaymentAccount.id,
                 PaymentCard.name.label("provider"),
@@ -764,7 +870,9 @@ class WalletHandler(BaseHandler):
             .where(User.id == self.user_id, PaymentAccount.is_deleted.is_(False))
         )
 
-        accounts_query = self.db_session.execute(query).all()
+    def query_payment_accounts(self) -> list:
+        self.payment_accounts = []
+        accounts_query = self.db_session.execute(self._payment_account_query).all()
         return accounts_query
 
     def process_payment_card_response(self, accounts_query: list, full: bool = True) -> tuple[dict, list]:
@@ -838,10 +946,9 @@ class WalletHandler(BaseHandler):
 
         entry["status"] = {"state": state}
 
-        if data_row["SchemeOverrideError"]:
-            override_status = data_row["SchemeOverrideError"]
-            entry["status"]["slug"] = override_status.error_slug
-            entry["status"]["description"] = override_status.message
+        if data_row["override_error_id"] is not None:
+            entry["status"]["slug"] = data_row["override_error_slug"]
+            entry["status"]["description"] = data_row["override_error_message"]
         else:
             entry["status"]["slug"] = status_dict.get("api2_slug")
             entry["status"]["description"] = status_dict.get("api2_description")
@@ -859,17 +966,18 @@ class WalletHandler(BaseHandler):
 
         if state == StatusName.AUTHORISED:
             # Process additional fields for Loyalty cards section
-            # balance object now has target_value (from voucher if available)
+            # balance object now has target_value (from voucher if available). The vouchers are already in the
+            # scheme account row so they are formatted once here and reused for the full wallet voucher list.
+            vouchers = process_vouchers(data_row["vouchers"], voucher_url)
             balance = get_balance_dict(data_row["balances"])
-            target_value = self.get_target_value(entry["id"])
-            balance["target_value"] = target_value
+            balance["target_value"] = get_target_value(vouchers)
             entry["balance"] = balance
 
         if full:
             entry["pll_links"] = self.pll_for_scheme_accounts.get(data_row["id"])
             if state == StatusName.AUTHORISED:
                 entry["transactions"] = process_transactions(data_row["transactions"])
-                entry["vouchers"] = process_vouchers(data_row["vouchers"], voucher_url)
+                entry["vouchers"] = vouchers
 
         plls = self.pll_for_scheme_accounts.get(data_row["id"], [])
         self.is_pll_fully_linked(plls, accounts)
@@ -969,22 +1077,6 @@ class WalletHandler(BaseHandler):
             account["images"] = get_image_list(self.all_images, "scheme", account["id"], plan_id)
             self.joins.append(account)
 
-    def get_target_value(self, loyalty_card_id: int) -> str | None:
-        # get vouchers so we can get a target_value
-        query_dict_vouch = check_one(
-            self.query_scheme_account(loyalty_card_id, SchemeAccount.vouchers),
-            loyalty_card_id,
-            "Loyalty Card Voucher Wallet Error:",
-        )
-        vouchers = process_vouchers(query_dict_vouch.get("vouchers", []), "")
-        target_value = None
-        for v in vouchers:
-            if v["state"] == voucher_state_names[VoucherState.IN_PROGRESS]:
-                target_value = v["target_value"]
-                break  # look no further
-
-        return target_value
-
     def send_to_hermes_view_wallet_event(self) -> None:
         hermes_message = {
             "user_id": self.user_id,
@@ -1,23 +1,49 @@
+import functools
+import threading
 import time
-from typing import TYPE_CHECKING, Any, Self
+from typing import TYPE_CHECKING, Any, Self, cast
 
 import kombu
 import kombu.exceptions
 from amqp import AMQPError
-from sqlalchemy import MetaData, create_engine, event, orm
+from sqlalchemy import MetaData, create_engine, event, inspect, orm, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
-
-from angelia.hermes.utils import EventType, HistoryData
+from sqlalchemy.pool import QueuePool
+
+from angelia.api.metrics import (
+    db_pool_checked_out,
+    db_pool_checkout_wait,
+    db_pool_connection_age,
+    db_pool_connections,
+    db_pool_invalidated_counter,
+    db_pool_overflow,
+    db_query_duration,
+    db_replica_lag,
+    db_session_routing_counter,
+)
+from angelia.hermes.query_accounting import RequestQueries
+from angelia.hermes.schema_snapshot import SnapshotError, load_snapshot, validate_snapshot_in_background
+from angelia.hermes.utils import EventType, HistoryBatch, HistoryData
 from angelia.lib.singletons import Singleton
-from angelia.messaging.sender import mapper_history, send_message_to_hermes
+from angelia.lib.wallet_cache import get_wallet_user_ids, invalidate_wallet_cache
+from angelia.messaging.sender import (
+    get_history_extractor,
+    mapper_history,
+    send_message_to_hermes,
+    spool_message_to_hermes,
+)
 from angelia.report import history_logger, sql_logger
 from angelia.settings import settings
 
 if TYPE_CHECKING:
-    from sqlalchemy.engine import Connection
+    from collections.abc import Callable
+
+    from sqlalchemy.engine import Connection, Engine
     from sqlalchemy.engine import cursor as sqla_cursor
     from sqlalchemy.orm import DeclarativeMeta, Session
+    from sqlalchemy.pool import _ConnectionRecord
 
     from angelia.hermes.models import ModelBase
 
@@ -30,8 +56,8 @@ class DB(metaclass=Singleton):
     To use the singleton import the DB class then:
 
     DB().open_write() or DB().open_read()  at start of request ie in middleware
-    DB().session   to get the session in database layer
-    DB().session.close() to close the session at the end of request in middleware
+    DB().session   to get the session in database layer, it is created when first used
+    DB().close() to close the session, if it was used, at the end of request in middleware
 
     For non api code use in with statement:
 
@@ -46,21 +72,31 @@ class DB(metaclass=Singleton):
         # test_engine is used only for tests to copy the hermes schema to the hermes_test db
         if settings.TESTING:
             self.test_engine = create_engine(settings.POSTGRES_DSN, connect_args=settings.POSTGRES_CONNECT_ARGS)
-            self.engine = create_engine(f"{settings.POSTGRES_DSN}_test", connect_args=settings.POSTGRES_CONNECT_ARGS)
-            self.metadata = MetaData(bind=self.test_engine)
+            self.engine = self.create_engine(f"{settings.POSTGRES_DSN}_test", "primary")
+            self.metadata = self.load_metadata(self.test_engine)
         else:
-            self.engine = create_engine(settings.POSTGRES_DSN, connect_args=settings.POSTGRES_CONNECT_ARGS)
-            self.metadata = MetaData(bind=self.engine)
+            self.engine = self.create_engine(settings.POSTGRES_DSN, "primary")
+            self.metadata = self.load_metadata(self.engine)
 
         self.Base: DeclarativeMeta = declarative_base()
 
         self.Session = scoped_session(sessionmaker(bind=self.engine, future=True))
-        self.session: Session | None = None
+        # the session and pending changes are held per thread so threaded workers can serve concurrent requests
+        self._request_state = RequestState()
+
+        # sessions for GET requests use the read replica if there is one, and otherwise are the same as Session
+        self.read_engine = self.engine
+        self.ReadSession = self.Session
+        self.replica_lag: ReplicaLagMonitor | None = None
+        if settings.POSTGRES_READ_DSN and not settings.TESTING:
+            self.read_engine = self.create_engine(settings.POSTGRES_READ_DSN, "replica")
+            self.ReadSession = scoped_session(sessionmaker(bind=self.read_engine, future=True))
+            self.replica_lag = ReplicaLagMonitor(
+                self.read_engine, settings.POSTGRES_READ_MAX_LAG, settings.POSTGRES_READ_LAG_CHECK_INTERVAL
+            )
 
         self._init_session_event_listeners()
 
-        self.history_sessions: list[HistorySession] = []
-
         if settings.QUERY_LOGGING:
             # Adds event hooks to before and after query executions to log queries and execution times.
             @event.listens_for(self.engine, "before_cursor_execute")
@@ -95,24 +131,190 @@ class DB(metaclass=Singleton):
     def __exit__(self, exc_type: type[Exception], exc_val: Exception, exc_tb: Any) -> None:
         self.close()
 
-    def open(self) -> Self:
+    @property
+    def session(self) -> "Session | None":
+        """
+        The session opened by open_write or open_read in this thread, which is only created when it is first used
+        """
+        state = self._request_state
+        if state.session is None and state.open_session is not None:
+            open_session, state.open_session = state.open_session, None
+            state.session = open_session()
+        return state.session
+
+    @property
+    def session_opened(self) -> bool:
+        """Whether the session has been created, checked without creating it"""
+        return self._request_state.session is not None
+
+    @property
+    def history_sessions(self) -> "list[HistorySession]":
+        """History events of this thread's transaction, sent to Hermes once it commits"""
+        return self._request_state.history_sessions
+
+    @property
+    def wallet_changes(self) -> set[int]:
+        """Users whose cached wallet must be dropped once this thread's transaction commits"""
+        return self._request_state.wallet_changes
+
+    def open(self, open_session: "Callable[[], Session] | None" = None) -> Self:
         """Returns self to allow with clause to work and to allow chaining eg db().open_read().session"""
-        self.session = self.Session()
+        self._request_state.session = None
+        self._request_state.open_session = open_session or self.Session
         return self
 
-    def close(self) -> None:
-        if self.session:
-            self.session.close()
+    def open_write(self, reason: str = "write") -> Self:
+        """Opens a session on the primary, counting reason as the routing decision once it is used"""
+
+        def open_session() -> "Session":
+            db_session_routing_counter.labels(database="primary", reason=reason).inc()
+            return self.Session()
+
+        return self.open(open_session)
+
+    def open_read(self) -> Self:
+        """
+        Opens a session on the read replica, or on the primary if there isn't one or it has fallen too far behind.
+        The replica lag is checked when the session is first used.
+        """
+        return self.open(self._open_read_session)
+
+    def _open_read_session(self) -> "Session":
+        if self.replica_lag is None:
+            return cast("Session", self.open_write(reason="no_replica").session)
+        if not self.replica_lag.within_max_lag():
+            return cast("Session", self.open_write(reason="replica_lag").session)
+
+        db_session_routing_counter.labels(database="replica", reason="read").inc()
+        return self.ReadSession()
+
+    def close(self, rollback: bool = False) -> None:
+        """Closes the session if it was used, rolling back its transaction first if rollback is set"""
+        state = self._request_state
+        if state.session is not None:
+            if rollback:
+                state.session.rollback()
+            state.session.close()
+        state.session = None
+        state.open_session = None
+
+    @staticmethod
+    def load_metadata(bind: "Engine") -> MetaData:
+        """
+        Returns the metadata the models are declared with. The tables are loaded from the schema snapshot if one is
+        set, otherwise each model reflects its table from the database when angelia.hermes.models is imported. A
+        table missing from the snapshot is still reflected.
+        """
+        if settings.SCHEMA_SNAPSHOT_PATH:
+            try:
+                metadata = load_snapshot(settings.SCHEMA_SNAPSHOT_PATH, bind)
+            except SnapshotError as e:
+                sql_logger.warning(f"Reflecting the schema from the database - {e}")
+            else:
+                if settings.SCHEMA_SNAPSHOT_VALIDATE:
+                    validate_snapshot_in_background(metadata, bind)
+                return metadata
+
+        return MetaData(bind=bind)
+
+    @classmethod
+    def create_engine(cls, dsn: str, database: str) -> "Engine":
+        """Creates an engine with the configured connection pool, recording query and pool metrics as database"""
+        engine = create_engine(
+            dsn,
+            connect_args=settings.POSTGRES_CONNECT_ARGS,
+            poolclass=instrumented_pool_class(database),
+            pool_size=settings.POSTGRES_POOL_SIZE,
+            max_overflow=settings.POSTGRES_POOL_MAX_OVERFLOW,
+            pool_timeout=settings.POSTGRES_POOL_TIMEOUT,
+            pool_recycle=settings.POSTGRES_POOL_RECYCLE,
+            pool_pre_ping=settings.POSTGRES_POOL_PRE_PING,
+        )
+        cls._init_query_metrics(engine, database)
+        cls._init_pool_metrics(engine, database)
+        return engine
+
+    @staticmethod
+    def _init_pool_metrics(engine: "Engine", database: str) -> None:
+        connections = db_pool_connections.labels(database=database)
+        checked_out = db_pool_checked_out.labels(database=database)
+        overflow = db_pool_overflow.labels(database=database)
+        connection_age = db_pool_connection_age.labels(database=database)
+        invalidated = db_pool_invalidated_counter.labels(database=database)
+
+        def set_overflow() -> None:
+            overflow.set(max(engine.pool.overflow(), 0))
+
+        @event.listens_for(engine, "connect")
+        def connect(dbapi_connection: Any, connection_record: "_ConnectionRecord") -> None:
+            connection_record.info["connected_at"] = time.monotonic()
+            connections.inc()
+
+        @event.listens_for(engine, "checkout")
+        def checkout(dbapi_connection: Any, connection_record: "_ConnectionRecord", connection_proxy: Any) -> None:
+            checked_out.inc()
+            set_overflow()
+            if connected_at := connection_record.info.get("connected_at"):
+                connection_age.observe(time.monotonic() - connected_at)
+
+        @event.listens_for(engine, "checkin")
+        def checkin(dbapi_connection: Any, connection_record: "_ConnectionRecord") -> None:
+            checked_out.dec()
+            set_overflow()
+
+        @event.listens_for(engine, "invalidate")
+        def invalidate(dbapi_connection: Any, connection_record: "_ConnectionRecord", exception: Any) -> None:
+            invalidated.inc()
+
+        @event.listens_for(engine, "close")
+        def close(dbapi_connection: Any, connection_record: "_ConnectionRecord") -> None:
+            connections.dec()
+
+        @event.listens_for(engine, "detach")
+        def detach(dbapi_connection: Any, connection_record: "_ConnectionRecord") -> None:
+            connections.dec()
+
+    @staticmethod
+    def _init_query_metrics(engine: "Engine", database: str) -> None:
+        query_duration = db_query_duration.labels(database=database)
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(  # noqa: PLR0913
+            conn: "Connection",
+            cursor: "sqla_cursor",
+            statement: str,
+            parameters: list,
+            context: dict,
+            executemany: bool,
+        ) -> None:
+            conn.info["query_metric_start"] = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(  # noqa: PLR0913
+            conn: "Connection",
+            cursor: "sqla_cursor",
+            statement: str,
+            parameters: list,
+            context: dict,
+            executemany: bool,
+        ) -> None:
+            duration = time.perf_counter() - conn.info.pop("query_metric_start")
+            query_duration.observe(duration)
+            if request_queries := RequestQueries.current():
+                request_queries.record(statement, duration)
 
     def _init_session_event_listeners(self) -> None:
         event.listen(self.Session, "after_commit", self.after_commit_listener)
+        event.listen(self.Session, "after_rollback", self.after_rollback_listener)
 
     def init_mapper_event_listeners(self, watched_classes: list) -> None:
         """
         Initialises event listeners for after update, insert, and deletes of given list of mappers
         These listeners execute before the transaction is committed to the database.
+        The history extractor of each mapper is built here rather than by the first flush of its model.
         """
         for w_class in watched_classes:
+            get_history_extractor(inspect(w_class))
             event.listen(w_class, "after_update", self.history_after_update_listener)
             event.listen(w_class, "after_insert", self.history_after_insert_listener)
             event.listen(w_class, "after_delete", self.history_after_delete_listener)
@@ -123,6 +325,7 @@ class DB(metaclass=Singleton):
         connection: "Connection",  # noqa: ARG002
         target: "TargetType",
     ) -> None:
+        self.wallet_changes.update(get_wallet_user_ids(target))
         if event_data := mapper_history(target, EventType.CREATE, mapped):
             self.history_sessions.append(HistorySession(data=event_data))
 
@@ -132,6 +335,7 @@ class DB(metaclass=Singleton):
         connection: "Connection",  # noqa: ARG002
         target: "TargetType",
     ) -> None:
+        self.wallet_changes.update(get_wallet_user_ids(target))
         if event_data := mapper_history(target, EventType.DELETE, mapped):
             self.history_sessions.append(HistorySession(data=event_data))
 
@@ -141,20 +345,99 @@ class DB(metaclass=Singleton):
         connection: "Connection",  # noqa: ARG002
         target: "TargetType",
     ) -> None:
+        self.wallet_changes.update(get_wallet_user_ids(target))
         if event_data := mapper_history(target, EventType.UPDATE, mapped):
             self.history_sessions.append(HistorySession(data=event_data))
 
     def after_commit_listener(self, session: "Session") -> None:  # noqa: ARG002
-        while self.history_sessions:
-            # pop from the front so the events are sent in order of transaction, though this isn't
-            # 100% necessary since they have timestamps and will requeue after failures anyway
-            history_session = self.history_sessions.pop(0)
-            message_sent = history_session.try_dispatch()
+        if self.wallet_changes:
+            invalidate_wallet_cache(self.wallet_changes)
+            self.wallet_changes.clear()
+
+        history_sessions, self._request_state.history_sessions = self.history_sessions, []
+        if settings.HISTORY_BATCH_ENABLED and history_sessions:
+            # sessions are only made with a batch here so those added by the mapper listeners all hold HistoryData
+            events = cast("list[HistoryData]", [session.data for session in history_sessions])
+            history_sessions = [HistorySession(HistoryBatch(events=events))]
+
+        # the events are sent in order of transaction, though this isn't 100% necessary since they have timestamps
+        for history_session in history_sessions:
+            if not history_session.try_dispatch():
+                # the changes are already committed so the message is spooled rather than retried here, which
+                # would hold up the request for as long as the broker is unavailable
+                history_session.spool()
+
+    def after_rollback_listener(self, session: "Session") -> None:  # noqa: ARG002
+        self.wallet_changes.clear()
 
-            if not message_sent:
-                # Message was not sent so requeue.
-                self.history_sessions.append(history_session)
-                history_logger.debug(f"History session failed to send. Re-queuing - {history_session}")
+
+class RequestState(threading.local):
+    """The session and pending changes of the request being handled by the current thread"""
+
+    def __init__(self) -> None:
+        self.session: Session | None = None
+        self.open_session: Callable[[], Session] | None = None
+        self.history_sessions: list[HistorySession] = []
+        self.wallet_changes: set[int] = set()
+
+
+@functools.cache
+def instrumented_pool_class(database: str) -> type[QueuePool]:
+    """A QueuePool recording how long each checkout waits for a connection as database"""
+    checkout_wait = db_pool_checkout_wait.labels(database=database)
+
+    class InstrumentedQueuePool(QueuePool):
+        def _do_get(self) -> "_ConnectionRecord":
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                checkout_wait.observe(time.perf_counter() - start)
+
+    return InstrumentedQueuePool
+
+
+class ReplicaLagMonitor:
+    """
+    Tracks how far the read replica is behind the primary. The lag is measured at most once every check_interval
+    seconds in each process, by whichever request finds it out of date, while other requests use the last
+    measurement. The replica is treated as too far behind until it has been measured or if it can't be reached.
+    """
+
+    LAG_QUERY = text(
+        "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+    )
+
+    def __init__(self, engine: "Engine", max_lag: float, check_interval: float) -> None:
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._lag: float | None = None
+
+    def within_max_lag(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._lag = self.measure()
+            finally:
+                self._checked_at = now
+                self._lock.release()
+
+        return self._lag is not None and self._lag <= self.max_lag
+
+    def measure(self) -> float | None:
+        try:
+            with self.engine.connect() as connection:
+                lag = float(connection.execute(self.LAG_QUERY).scalar_one())
+        except SQLAlchemyError as e:
+            sql_logger.warning(f"Failed to measure read replica lag - {e!r}")
+            return None
+
+        db_replica_lag.set(lag)
+        return lag
 
 
 class HistorySession:
@@ -165,15 +448,20 @@ class HistorySession:
     message_sent: bool = False
 
     class DataError(Exception):
-        """Raised when initialising the class without a valid object of type HistoryData"""
+        """Raised when initialising the class without a valid object of type HistoryData or HistoryBatch"""
 
-    def __init__(self, data: HistoryData) -> None:
-        if not data or not isinstance(data, HistoryData):
-            raise self.DataError("Cannot instantiate a HistorySession without valid HistoryData")
+    def __init__(self, data: HistoryData | HistoryBatch) -> None:
+        if not data or not isinstance(data, HistoryData | HistoryBatch):
+            raise self.DataError("Cannot instantiate a HistorySession without valid HistoryData or HistoryBatch")
 
         self.data = data
 
     def __repr__(self) -> str:
+        if isinstance(self.data, HistoryBatch):
+            return (
+                f"HistorySession(events={len(self.data.events)}, tables={sorted({e.table for e in self.data.events})})"
+            )
+
         return (
             f"HistorySession(user_id={self.data.user_id}, table={self.data.table}, "
             f"event_type={self.data.event_type.value})"
@@ -191,7 +479,8 @@ class HistorySession:
             event_name = payload.pop("event_name")
             while retry_count:
                 try:
-                    send_message_to_hermes(event_name, payload)
+                    # failures are spooled by the caller once the retries have run out
+                    send_message_to_hermes(event_name, payload, spool_failed=False)
                     self.message_sent = True
                     break
                 except (kombu.exceptions.KombuError, AMQPError) as e:
@@ -205,3 +494,18 @@ class HistorySession:
                         )
 
         return self.message_sent
+
+    def spool(self) -> None:
+        """Writes the message to the spool to be sent once the broker is available"""
+        payload = self.data.to_dict()
+        event_name = payload.pop("event_name")
+        if not settings.SPOOL_ENABLED:
+            history_logger.error(f"History session failed to send, spool disabled. Event lost - {self}")
+            return
+
+        try:
+            spool_message_to_hermes(event_name, payload)
+        except OSError as e:
+            history_logger.error(f"History session failed to send or spool. Event lost - {self}; {e!r}")
+        else:
+            history_logger.debug(f"History session failed to send. Spooled - {self}")
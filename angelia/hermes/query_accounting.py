@@ -0,0 +1,59 @@
+import functools
+import re
+import threading
+from collections import Counter
+
+_current = threading.local()
+
+_PARAMETER = re.compile(r"%\(\w+\)s|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Reduces a statement to its shape, so the same query with different parameters or IN list lengths match"""
+    statement = _PARAMETER.sub("?", statement)
+    statement = _PARAMETER_LIST.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class RequestQueries:
+    """The number and duration of the queries run for the request being handled by this thread"""
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: str | None = None
+        self.statements: list[str] = []
+
+    @classmethod
+    def start(cls) -> "RequestQueries":
+        """Starts accounting for the queries run by this thread, until finish is called"""
+        _current.queries = queries = cls()
+        return queries
+
+    @staticmethod
+    def current() -> "RequestQueries | None":
+        return getattr(_current, "queries", None)
+
+    @staticmethod
+    def finish() -> "RequestQueries | None":
+        queries = getattr(_current, "queries", None)
+        _current.queries = None
+        return queries
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.statements.append(statement)
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    def most_common(self, limit: int = 10) -> list[tuple[str, int]]:
+        """The fingerprints of the statements run most often, with how many times each was run"""
+        return Counter(fingerprint(statement) for statement in self.statements).most_common(limit)
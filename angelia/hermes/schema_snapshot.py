@@ -0,0 +1,113 @@
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import sqlalchemy
+from sqlalchemy import MetaData, inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+from angelia.report import api_logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+# Version of the snapshot file layout, to be raised on any change to it
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(Exception):
+    """Raised when a schema snapshot can't be loaded"""
+
+
+def dump_snapshot(metadata: MetaData, path: str) -> None:
+    """Saves the tables in metadata to a snapshot file, replacing any existing file in one step"""
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "sqlalchemy_version": sqlalchemy.__version__,
+        "created_at": time.time(),
+        "metadata": metadata,
+    }
+    snapshot_path = Path(path)
+    temp_path = snapshot_path.with_name(f".{snapshot_path.name}.tmp")
+    temp_path.write_bytes(pickle.dumps(snapshot))
+    temp_path.rename(snapshot_path)
+
+
+def load_snapshot(path: str, bind: "Engine") -> MetaData:
+    """
+    Loads the metadata saved by dump_snapshot, bound to bind. The file is unpickled so must only come from a trusted
+    source, it is created by the dump-schema-snapshot command when the image is built.
+    """
+    try:
+        snapshot = pickle.loads(Path(path).read_bytes())
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        raise SnapshotError(f"Could not read schema snapshot {path} - {e!r}") from e
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Schema snapshot {path} is not version {SNAPSHOT_VERSION}")
+    if snapshot["sqlalchemy_version"] != sqlalchemy.__version__:
+        raise SnapshotError(
+            f"Schema snapshot {path} was created with SQLAlchemy {snapshot['sqlalchemy_version']}, "
+            f"not {sqlalchemy.__version__}"
+        )
+
+    metadata: MetaData = snapshot["metadata"]
+    metadata.bind = bind
+    return metadata
+
+
+def schema_differences(metadata: MetaData, engine: "Engine") -> list[str]:
+    """Compares the columns of the tables in metadata with those in the database, returning the differences found"""
+    inspector = inspect(engine)
+    dialect = engine.dialect
+    differences = []
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name, schema=table.schema):
+            differences.append(f"{table.fullname}: table not found")
+            continue
+
+        live_columns = {column["name"]: column for column in inspector.get_columns(table.name, schema=table.schema)}
+        for name in live_columns.keys() - table.columns.keys():
+            differences.append(f"{table.fullname}.{name}: column not in snapshot")
+
+        for column in table.columns:
+            live_column = live_columns.get(column.name)
+            if live_column is None:
+                differences.append(f"{table.fullname}.{column.name}: column not found")
+                continue
+
+            snapshot_type = column.type.compile(dialect=dialect)
+            live_type = live_column["type"].compile(dialect=dialect)
+            if snapshot_type != live_type:
+                differences.append(f"{table.fullname}.{column.name}: type {snapshot_type} is now {live_type}")
+            if column.nullable != live_column["nullable"]:
+                differences.append(
+                    f"{table.fullname}.{column.name}: nullable {column.nullable} is now {live_column['nullable']}"
+                )
+
+    return differences
+
+
+def validate_snapshot(metadata: MetaData, engine: "Engine") -> None:
+    try:
+        differences = schema_differences(metadata, engine)
+    except SQLAlchemyError as e:
+        api_logger.warning(f"Could not validate schema snapshot against the database - {e!r}")
+        return
+
+    if differences:
+        api_logger.error(
+            "Schema snapshot does not match the database, it should be created again with dump-schema-snapshot: "
+            + "; ".join(differences)
+        )
+
+
+def validate_snapshot_in_background(metadata: MetaData, engine: "Engine") -> threading.Thread:
+    """Checks the snapshot against the database without holding up startup, logging an error if they differ"""
+    thread = threading.Thread(
+        target=validate_snapshot, args=(metadata, engine), name="schema-snapshot-validator", daemon=True
+    )
+    thread.start()
+    return thread
@@ -8,6 +8,10 @@ else:
     from pydantic.dataclasses import dataclass
 
 
+# Version of the mapped_history_batch message envelope, to be raised on any change to its layout
+HISTORY_BATCH_VERSION = 1
+
+
 class EventType(str, Enum):
     CREATE = "create"
     DELETE = "delete"
@@ -33,3 +37,20 @@ class HistoryData:
         event_type = dict_repr.pop("event_type").value
         dict_repr.update(event=event_type)
         return dict_repr
+
+
+# a standard library dataclass as the events have already been validated
+@dataclasses.dataclass
+class HistoryBatch:
+    """The history events of a transaction, sent to Hermes as a single message"""
+
+    events: list[HistoryData]
+
+    def to_dict(self) -> dict:
+        events = []
+        for event in self.events:
+            event_dict = event.to_dict()
+            event_dict.pop("event_name")
+            events.append(event_dict)
+
+        return {"event_name": "mapped_history_batch", "version": HISTORY_BATCH_VERSION, "events": events}
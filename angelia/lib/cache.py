@@ -0,0 +1,102 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from importlib import import_module
+from typing import Any
+
+from angelia.api.metrics import cache_counter
+
+
+class CacheBackend(ABC):
+    """
+    Key/value store used to cache values between requests.
+
+    Values are held until their ttl (in seconds) runs out or they are deleted. None is used to signal a miss so it
+    cannot be cached. Hits and misses are recorded in the cache_requests counter labelled with the cache name,
+    backends should record their own evictions.
+
+    A backend shared between processes (eg Redis) can be plugged in by sub-classing this and pointing the relevant
+    setting at its dotted path, see load_cache_backend. Shared backends must accept a (name, max_size) constructor
+    and only store json serialisable values.
+    """
+
+    def __init__(self, name: str, max_size: int) -> None:
+        self.name = name
+        self.max_size = max_size
+
+    def get(self, key: str) -> Any:
+        value = self._get(key)
+        cache_counter.labels(cache=self.name, event="miss" if value is None else "hit").inc()
+        return value
+
+    @abstractmethod
+    def _get(self, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class LRUCache(CacheBackend):
+    """
+    In process, size bounded, least recently used cache. Safe to share between threads but each gunicorn worker
+    has its own copy so deletes are only seen by the process that made them.
+    """
+
+    def __init__(self, name: str, max_size: int) -> None:
+        super().__init__(name, max_size)
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return None
+
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                cache_counter.labels(cache=self.name, event="eviction").inc()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def load_cache_backend(backend_path: str, name: str, max_size: int) -> CacheBackend:
+    """Instantiates the CacheBackend subclass at the dotted path backend_path eg 'angelia.lib.cache.LRUCache'"""
+    module_path, _, class_name = backend_path.rpartition(".")
+    backend_class = getattr(import_module(module_path), class_name)
+    if not issubclass(backend_class, CacheBackend):
+        raise TypeError(f"{backend_path} is not a CacheBackend")
+
+    return backend_class(name=name, max_size=max_size)
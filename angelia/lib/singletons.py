@@ -73,15 +73,18 @@ class PerThreadSingleton(type, Generic[ThSinClsType]):
 
 class Singleton(type, Generic[SinClsType]):
     """
-    This is a basic singleton metaclass which works as expected if not threaded in Python or by Gunicorn/WSGI
-    If used threaded the first thread would set up the instance and other threads would get the same data.
-    This would persist across threads and requests.
-    NB.  We may need to add a lock for additional safety
+    This is a basic singleton metaclass, the first call creates the instance and every thread gets the same one.
+    It persists across threads and requests so any per request data it holds must be kept per thread.
+    Creation is locked so threads calling it at the same time can't each create an instance. The lock is reentrant
+    as a singleton's __init__ may call another.
     """
 
     instance: SinClsType | None = None
+    _lock = threading.RLock()
 
     def __call__(cls: SinClsType, *args: Any, **kwargs: Any) -> SinClsType:
         if cls.instance is None:
-            cls.instance = super().__call__(*args, **kwargs)
+            with Singleton._lock:
+                if cls.instance is None:
+                    cls.instance = super().__call__(*args, **kwargs)
         return cls.instance
@@ -0,0 +1,94 @@
+import threading
+from collections.abc import Callable, Iterable
+from enum import Enum
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from angelia.lib.cache import CacheBackend, load_cache_backend
+from angelia.report import api_logger, ctx
+from angelia.settings import settings
+
+if TYPE_CHECKING:
+    from angelia.hermes.models import ModelBase
+
+_wallet_cache: CacheBackend | None = None
+_wallet_cache_lock = threading.Lock()
+
+
+class WalletResponseType(str, Enum):
+    FULL = "full"
+    OVERVIEW = "overview"
+
+
+def get_wallet_cache() -> CacheBackend:
+    global _wallet_cache  # noqa: PLW0603
+    if _wallet_cache is None:
+        with _wallet_cache_lock:
+            if _wallet_cache is None:
+                _wallet_cache = load_cache_backend(
+                    settings.WALLET_CACHE_BACKEND, name="wallet", max_size=settings.WALLET_CACHE_MAX_SIZE
+                )
+    return _wallet_cache
+
+
+def _version_key(user_id: int) -> str:
+    return f"wallet:{user_id}:version"
+
+
+def _response_key(user_id: int, version: str, channel_id: str, response_type: WalletResponseType) -> str:
+    return f"wallet:{user_id}:{version}:{channel_id}:{response_type.value}"
+
+
+def get_cached_wallet_response(
+    user_id: int, channel_id: str, response_type: WalletResponseType, build_response: Callable[[], dict | list]
+) -> dict | list:
+    """
+    Returns the serialized wallet response for the user from the cache, calling build_response to make and store
+    it on a miss.
+
+    Every entry for a user is stored under that user's current version token and invalidate_wallet_cache drops the
+    token rather than each entry. The token is read before the response is built so a response built while the
+    wallet is being changed is stored under a token that has already been dropped and is never returned.
+    """
+    if not settings.WALLET_CACHE_ENABLED:
+        return build_response()
+
+    cache = get_wallet_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = uuid4().hex
+        cache.set(_version_key(user_id), version, settings.WALLET_CACHE_TTL)
+    elif (cached := cache.get(_response_key(user_id, version, channel_id, response_type))) is not None:
+        return cached
+
+    response = build_response()
+    cache.set(_response_key(user_id, version, channel_id, response_type), response, settings.WALLET_CACHE_TTL)
+    return response
+
+
+def invalidate_wallet_cache(user_ids: Iterable[int]) -> None:
+    if not settings.WALLET_CACHE_ENABLED:
+        return
+
+    cache = get_wallet_cache()
+    for user_id in user_ids:
+        cache.delete(_version_key(user_id))
+        api_logger.debug(f"Invalidated cached wallet for user {user_id}")
+
+
+def get_wallet_user_ids(target: "ModelBase") -> set[int]:
+    """
+    Users whose wallet may have changed along with the target row. Association rows carry the user they link to,
+    changes to shared rows such as a scheme account are attributed to the user making the request. Other users
+    sharing the account see the change once their cached wallet expires.
+    """
+    user_ids = set()
+    if (user_id := getattr(target, "user_id", None)) is not None:
+        user_ids.add(user_id)
+    elif target.__table__.name == "user" and target.id is not None:
+        user_ids.add(target.id)
+
+    if ctx.user_id is not None:
+        user_ids.add(ctx.user_id)
+
+    return user_ids
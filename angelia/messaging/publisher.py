@@ -0,0 +1,175 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from enum import Enum
+from typing import TYPE_CHECKING
+
+import kombu.exceptions
+from amqp import AMQPError
+
+from angelia.api.metrics import publish_dropped_counter, publish_latency, publish_queue_depth
+from angelia.report import send_logger
+
+if TYPE_CHECKING:
+    from angelia.messaging.spool import Spool
+
+# Errors which mean the broker could not be reached, the message is kept and publishing retried
+RETRYABLE_ERRORS = (kombu.exceptions.KombuError, AMQPError, OSError)
+
+
+class OverflowPolicy(str, Enum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    SPILL = "spill"
+
+
+class AsyncPublisher:
+    """
+    Publishes messages from a background thread so that callers only pay for adding them to a bounded in memory
+    queue. Messages are published in the order they were queued and kept at the front of the queue, with a pause
+    of retry_interval seconds between attempts, while the broker can't be reached.
+
+    The thread is started by the first put in each process so that it is not lost when gunicorn forks workers. On
+    exit the queue is given drain_timeout seconds to empty, anything left is written to the spool with the spill
+    policy and otherwise logged as lost.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        publish: Callable[[dict], None],
+        max_size: int,
+        overflow_policy: OverflowPolicy,
+        spool: "Spool | None",
+        block_timeout: float,
+        drain_timeout: float,
+        retry_interval: float = 1.0,
+    ) -> None:
+        if overflow_policy == OverflowPolicy.SPILL and spool is None:
+            raise ValueError("The spill overflow policy needs a spool")
+
+        self.publish = publish
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+        self.spool = spool
+        self.block_timeout = block_timeout
+        self.drain_timeout = drain_timeout
+        self.retry_interval = retry_interval
+
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+        self._init_state()
+
+    def _init_state(self) -> None:
+        self._queue: deque[dict] = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+
+            # after a fork only the thread calling fork survives so the queue and thread are started afresh
+            self._init_state()
+            self._thread = threading.Thread(target=self._run, name="hermes-publisher", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def put(self, message: dict) -> None:
+        self._ensure_started()
+        with self._condition:
+            if len(self._queue) >= self.max_size and not self._make_room(message):
+                return
+
+            self._queue.append(message)
+            publish_queue_depth.inc()
+            self._condition.notify_all()
+
+    def _make_room(self, message: dict) -> bool:
+        """Applies the overflow policy to a full queue, returns True if message should then be queued"""
+        match self.overflow_policy:
+            case OverflowPolicy.BLOCK:
+                if self._condition.wait_for(lambda: len(self._queue) < self.max_size, timeout=self.block_timeout):
+                    return True
+                publish_dropped_counter.labels(reason="queue_full").inc()
+                send_logger.error(f"Hermes publish queue full, dropped message: {message['headers']['X-http-path']}")
+            case OverflowPolicy.DROP_OLDEST:
+                dropped = self._queue.popleft()
+                publish_queue_depth.dec()
+                publish_dropped_counter.labels(reason="drop_oldest").inc()
+                send_logger.error(f"Hermes publish queue full, dropped message: {dropped['headers']['X-http-path']}")
+                return True
+            case OverflowPolicy.SPILL:
+                self._spill([message])
+
+        return False
+
+    def _spill(self, messages: list[dict]) -> None:
+        try:
+            self.spool.append(messages)  # type: ignore [union-attr]
+            publish_dropped_counter.labels(reason="spilled").inc(len(messages))
+        except (OSError, TypeError, ValueError) as e:
+            publish_dropped_counter.labels(reason="spill_failed").inc(len(messages))
+            send_logger.error(f"Failed to spill {len(messages)} Hermes messages to disk - {e!r}")
+
+    def _next_message(self) -> dict | None:
+        """Waits for a message, None once stopping with nothing left to publish"""
+        with self._condition:
+            while not self._queue:
+                if self._stopping:
+                    return None
+                self._condition.wait()
+
+            message = self._queue.popleft()
+            publish_queue_depth.dec()
+            self._condition.notify_all()
+            return message
+
+    def _run(self) -> None:
+        while (message := self._next_message()) is not None:
+            start = time.perf_counter()
+            try:
+                self.publish(message)
+            except RETRYABLE_ERRORS as e:
+                send_logger.warning(f"Failed to publish to Hermes, retrying in {self.retry_interval}s - {e!r}")
+                with self._condition:
+                    self._queue.appendleft(message)
+                    publish_queue_depth.inc()
+                    if self._condition.wait_for(lambda: self._stopping, timeout=self.retry_interval):
+                        # the broker is down so leave the remaining messages to stop rather than retrying
+                        return
+            except Exception:
+                publish_dropped_counter.labels(reason="error").inc()
+                send_logger.exception(f"Failed to publish to Hermes, dropped message: {message}")
+            else:
+                publish_latency.observe(time.perf_counter() - start)
+
+    def stop(self) -> None:
+        """Stops the thread after the queue is published or drain_timeout has passed"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+        self._thread.join(self.drain_timeout)
+        with self._condition:
+            if remaining := list(self._queue):
+                self._queue.clear()
+                publish_queue_depth.dec(len(remaining))
+                if self.overflow_policy == OverflowPolicy.SPILL:
+                    self._spill(remaining)
+                else:
+                    publish_dropped_counter.labels(reason="shutdown").inc(len(remaining))
+                    send_logger.error(f"Lost {len(remaining)} queued Hermes messages on shutdown")
+
+        self._pid = None
@@ -1,21 +1,38 @@
+import threading
+from collections.abc import Callable
 from datetime import datetime
 from time import time
 from typing import TYPE_CHECKING, Any
 from uuid import UUID
 
 import arrow
-from sqlalchemy.orm import ColumnProperty, RelationshipProperty, mapper
+from sqlalchemy import inspect
+from sqlalchemy.orm import ColumnProperty, RelationshipProperty
+from sqlalchemy.orm.interfaces import MANYTOONE
 
 from angelia.api.shared_data import SharedData
 from angelia.hermes.utils import EventType, HistoryData
 from angelia.messaging.message_broker import ProducerQueues, sending_service
+from angelia.messaging.publisher import RETRYABLE_ERRORS, AsyncPublisher, OverflowPolicy
+from angelia.messaging.spool import Spool
 from angelia.report import ctx, history_logger, send_logger
+from angelia.settings import settings
 
 if TYPE_CHECKING:
+    from sqlalchemy.orm import Mapper
+
     from angelia.hermes.models import ModelBase
 
     TargetType = type[ModelBase]
 
+_publisher: AsyncPublisher | None = None
+_spool: Spool | None = None
+# reentrant as the publisher is created with the spool
+_create_lock = threading.RLock()
+# the producer's connection and channel aren't thread safe, and are shared by request threads, the publisher thread and
+# the spool's replayer
+_publish_lock = threading.Lock()
+
 
 def sql_history(target_model: "TargetType", event_type: str, pk: int, change: str) -> None:
     """
@@ -43,32 +60,95 @@ def sql_history(target_model: "TargetType", event_type: str, pk: int, change: st
         history_logger.error(f"Trapped Exception Lost sql history report due to {e}")
 
 
-def process_mapper_attributes(target: "TargetType", attr: str, payload: dict, related: dict) -> None:
-    if isinstance(attr, ColumnProperty):
-        name = attr.key
-        value = getattr(target, name)
-        if value is None or isinstance(value, str | float | int | str | bool):
-            payload[name] = value
-        elif isinstance(value, UUID):
-            payload[name] = str(value)
-        elif isinstance(value, datetime):
-            payload[name] = value.strftime("%Y-%m-%dT%H:%M:%S.%f%z")
-    elif isinstance(attr, RelationshipProperty):
-        name = attr.key
-        value = getattr(target, name)
-        try:
-            if not isinstance(value, list):
-                # not a list if primary related
-                if value is None:
-                    related[name] = None
-                else:
-                    related[name] = value.id
-        except Exception as e:
-            # Best allow an exception as it would prevent the data being written
-            history_logger.error(f"Trapped Exception mapper history relationship id for {name} not found due to {e}")
-
-
-def mapper_history(target: "TargetType", event_type: EventType, mapped: mapper) -> HistoryData | None:
+# marks a column value which isn't sent in the history payload
+_SKIP = object()
+HISTORY_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+
+
+def convert_history_value(value: Any) -> Any:
+    if isinstance(value, str | float | int | bool):
+        return value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.strftime(HISTORY_DATETIME_FORMAT)
+    return _SKIP
+
+
+def history_value_converter(prop: ColumnProperty) -> Callable[[Any], Any] | None:
+    """Returns the conversion for the values of a column, None for those sent as they are"""
+    try:
+        python_type = prop.columns[0].type.python_type
+    except NotImplementedError:
+        return convert_history_value
+
+    if python_type in (str, float, int, bool):
+        return None
+    if python_type is UUID:
+        return str
+    if python_type is datetime:
+        return lambda value: value.strftime(HISTORY_DATETIME_FORMAT)
+    return convert_history_value
+
+
+class MapperHistoryExtractor:
+    """
+    Copies the history payload and related ids from a watched model, with the columns, their conversions and the
+    foreign keys of its relationships worked out once per mapper. Values are read from the instance's loaded state so
+    capturing history never issues a query: expired columns are left out, while those never set, eg nullable columns
+    not given a value on insert, are sent as None. A relationship to a single related object whose foreign key is on
+    the related table is left out unless that object is already loaded. Relationships to lists of objects, and those
+    whose foreign key isn't to the related table's id, aren't sent.
+    """
+
+    def __init__(self, mapped: "Mapper") -> None:
+        self.table = str(mapped.persist_selectable)
+        self.columns: list[tuple[str, Callable[[Any], Any] | None]] = []
+        self.foreign_keys: list[tuple[str, str]] = []
+        self.related_objects: list[str] = []
+
+        for prop in mapped.base_mapper.attrs:
+            if isinstance(prop, ColumnProperty):
+                self.columns.append((prop.key, history_value_converter(prop)))
+            elif isinstance(prop, RelationshipProperty) and not prop.uselist:
+                if prop.direction is not MANYTOONE:
+                    self.related_objects.append(prop.key)
+                elif len(prop.local_remote_pairs) == 1 and prop.local_remote_pairs[0][1].key == "id":
+                    local_column = prop.local_remote_pairs[0][0]
+                    self.foreign_keys.append((prop.key, mapped.get_property_by_column(local_column).key))
+
+    def extract(self, target: "TargetType") -> tuple[dict, dict]:
+        values = target.__dict__
+        # only expired attributes would be loaded by reading them, others missing from the state are unset
+        expired = inspect(target).expired_attributes
+        payload = {}
+        for key, convert in self.columns:
+            if key in values:
+                value = values[key]
+                if convert is not None and value is not None and (value := convert(value)) is _SKIP:
+                    continue
+                payload[key] = value
+            elif key not in expired:
+                payload[key] = None
+
+        related = {name: values.get(key) for name, key in self.foreign_keys if key not in expired}
+        for name in self.related_objects:
+            if name in values:
+                related[name] = None if values[name] is None else values[name].__dict__.get("id")
+
+        return payload, related
+
+
+_history_extractors: dict["Mapper", MapperHistoryExtractor] = {}
+
+
+def get_history_extractor(mapped: "Mapper") -> MapperHistoryExtractor:
+    if (extractor := _history_extractors.get(mapped)) is None:
+        extractor = _history_extractors[mapped] = MapperHistoryExtractor(mapped)
+    return extractor
+
+
+def mapper_history(target: "TargetType", event_type: EventType, mapped: "Mapper") -> HistoryData | None:
     """
     We now do not send the event_time.  Hermes adds this using
     send message added utc_adjusted payload parameter to account for server time variations
@@ -78,21 +158,18 @@ def mapper_history(target: "TargetType", event_type: EventType, mapped: mapper)
         sh = SharedData()  # type: ignore [call-arg]
         if sh is not None:
             auth_data = sh.request.context.auth_instance.auth_data
-            table = mapped.mapped_table
-            payload: dict = {}
-            related: dict = {}
+            extractor = get_history_extractor(mapped)
+            payload, related = extractor.extract(target)
             change = ""
             if event_type.value == "update":
                 change = "updated"
-            for attr in mapped.base_mapper.attrs:
-                process_mapper_attributes(target, attr, payload, related)
 
             hermes_history_data = HistoryData(
                 event_name="mapped_history",
                 user_id=auth_data.get("sub"),
                 channel_slug=auth_data.get("channel"),
                 event_type=event_type,
-                table=str(table),
+                table=extractor.table,
                 change=change,
                 payload=payload,
                 related=related,
@@ -106,11 +183,89 @@ def mapper_history(target: "TargetType", event_type: EventType, mapped: mapper)
     return None
 
 
-def send_message_to_hermes(path: str, payload: dict, add_headers: dict | None = None) -> None:
+def get_publisher() -> AsyncPublisher:
+    global _publisher  # noqa: PLW0603
+    if _publisher is None:
+        with _create_lock:
+            if _publisher is None:
+                overflow_policy = OverflowPolicy(settings.PUBLISH_OVERFLOW_POLICY)
+                # the spool's replayer is only started when something may be written to it
+                spool_used = settings.SPOOL_ENABLED or overflow_policy == OverflowPolicy.SPILL
+                _publisher = AsyncPublisher(
+                    publish_message,
+                    max_size=settings.PUBLISH_QUEUE_SIZE,
+                    overflow_policy=overflow_policy,
+                    spool=get_spool() if spool_used else None,
+                    block_timeout=settings.PUBLISH_BLOCK_TIMEOUT,
+                    drain_timeout=settings.PUBLISH_DRAIN_TIMEOUT,
+                )
+    return _publisher
+
+
+def get_spool() -> Spool:
+    """Returns the spool, starting its replayer in this process so messages left by exited workers are replayed"""
+    global _spool  # noqa: PLW0603
+    if _spool is None:
+        with _create_lock:
+            if _spool is None:
+                _spool = Spool(
+                    settings.SPOOL_DIR,
+                    publish_message,
+                    segment_max_bytes=settings.SPOOL_SEGMENT_MAX_BYTES,
+                    fsync_batch_size=settings.SPOOL_FSYNC_BATCH_SIZE,
+                    replay_interval=settings.SPOOL_REPLAY_INTERVAL,
+                )
+    _spool.start()
+    return _spool
+
+
+def publish_message(msg_data: dict) -> None:
+    with _publish_lock:
+        sending_service.queues[ProducerQueues.HERMES.name].send_message(**msg_data)
+
+
+def send_message_to_hermes(
+    path: str, payload: dict, add_headers: dict | None = None, spool_failed: bool = True
+) -> None:
+    """
+    Publishes a message to Hermes, or queues it when PUBLISH_ASYNC is set. With the spool enabled a message which
+    can't be published is spooled, unless spool_failed is False when the error is raised for the caller to retry.
+    """
+    msg_data = create_hermes_message_data(path, payload, add_headers)
+    if settings.PUBLISH_ASYNC:
+        get_publisher().put(msg_data)
+        send_logger.info(f"QUEUED: {path}")
+    elif settings.SPOOL_ENABLED:
+        spool = get_spool()
+        if spool.pending:
+            # published in order by the replayer, rather than overtaking the messages already spooled
+            spool.append([msg_data])
+            send_logger.info(f"SPOOLED: {path} - behind earlier spooled messages")
+            return
+
+        try:
+            publish_message(msg_data)
+        except RETRYABLE_ERRORS as e:
+            if not spool_failed:
+                raise
+            spool.append([msg_data])
+            send_logger.warning(f"SPOOLED: {path} - {e!r}")
+        else:
+            send_logger.info(f"SENT: {path}")
+    else:
+        publish_message(msg_data)
+        send_logger.info(f"SENT: {path}")
+
+
+def spool_message_to_hermes(path: str, payload: dict, add_headers: dict | None = None) -> None:
+    """Writes a message to the spool to be published by its replayer, for messages which failed to send"""
+    get_spool().append([create_hermes_message_data(path, payload, add_headers)])
+    send_logger.warning(f"SPOOLED: {path}")
+
+
+def create_hermes_message_data(path: str, payload: dict, add_headers: dict | None = None) -> dict[str, Any]:
     payload["utc_adjusted"] = arrow.utcnow().shift(microseconds=-100000).isoformat()
-    msg_data = create_message_data(payload, path, add_headers)
-    sending_service.queues[ProducerQueues.HERMES.name].send_message(**msg_data)
-    send_logger.info(f"SENT: {path}")
+    return create_message_data(payload, path, add_headers)
 
 
 def create_message_data(payload: Any, path: str | None = None, base_headers: dict | None = None) -> dict[str, Any]:
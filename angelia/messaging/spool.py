@@ -0,0 +1,266 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TextIO
+
+from angelia.api.metrics import (
+    publish_dropped_counter,
+    spool_oldest_message_age,
+    spool_replayed_counter,
+    spool_size_bytes,
+    spooled_counter,
+)
+from angelia.messaging.publisher import RETRYABLE_ERRORS
+from angelia.report import send_logger
+
+SEGMENT_SUFFIX = ".seg"
+OFFSET_SUFFIX = ".offset"
+REPLAY_LOCK_FILE = "replay.lock"
+
+
+class Spool:
+    """
+    Durable store for messages which could not be published to Hermes, replayed in the order they were spooled by a
+    background thread once the broker can be reached again.
+
+    Messages are appended as json lines to segment files in directory, named so they sort by creation time, which
+    may be shared by the workers on a host. Each process writes to its own segment and holds an exclusive flock on
+    it until it is rolled over, by size or by the replayer. Only one replayer on the host runs at a time and it
+    publishes every unlocked segment, which includes those left by processes that have exited, oldest first. The
+    position reached in a segment is saved when publishing fails so delivery is at least once, a message is only
+    sent again if a process dies while replaying it.
+
+    pending is set while messages spooled by this process, or found in the directory when it started, haven't all
+    been replayed, so that new messages can be spooled behind them rather than overtaking them.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        directory: str,
+        publish: Callable[[dict], None],
+        segment_max_bytes: int,
+        fsync_batch_size: int,
+        replay_interval: float,
+    ) -> None:
+        self.directory = Path(directory)
+        self.publish = publish
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_batch_size = fsync_batch_size
+        self.replay_interval = replay_interval
+
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._segment: TextIO | None = None
+        self._init_state()
+
+    def _init_state(self) -> None:
+        self._write_lock = threading.Lock()
+        self._segment = None
+        self._unsynced = 0
+        self._pending = False
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _check_pid(self) -> None:
+        if self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+
+            if self._segment is not None:
+                # inherited from the parent process, which carries on writing to it. Closing our copy leaves the
+                # parent's lock in place, keeping it open would stop the segment being replayed until we exit
+                self._segment.close()
+            self._init_state()
+            self._pid = os.getpid()
+
+    def start(self) -> None:
+        """Starts the replayer thread in this process if it isn't already running"""
+        self._check_pid()
+        if self._thread is not None:
+            return
+
+        with self._start_lock:
+            if self._thread is not None:
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._pending = bool(self.segments())
+            self._thread = threading.Thread(target=self._run, name="hermes-spool-replayer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Stops the replayer thread and closes the segment being written so it can be replayed by other workers"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+
+        self._stopping.set()
+        self._thread.join(self.replay_interval)
+        with self._write_lock:
+            self._close_segment()
+
+    @property
+    def pending(self) -> bool:
+        return self._pending
+
+    def append(self, messages: list[dict]) -> None:
+        self._check_pid()
+        spooled_at = time.time()
+        lines = "".join(json.dumps({"spooled_at": spooled_at, "message": message}) + "\n" for message in messages)
+
+        with self._write_lock:
+            segment = self._segment or self._open_segment()
+            segment.write(lines)
+            segment.flush()
+            self._pending = True
+            self._unsynced += len(messages)
+            if self._unsynced >= self.fsync_batch_size:
+                self._sync()
+            if segment.tell() >= self.segment_max_bytes:
+                self._close_segment()
+
+        spooled_counter.inc(len(messages))
+
+    def _open_segment(self) -> TextIO:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        # the segment is locked before it is given a name the replayer looks for, so it can't be claimed while empty
+        temp_path = self.directory / f".{name}.tmp"
+        segment = open(temp_path, "a", encoding="utf-8")  # noqa: SIM115
+        fcntl.flock(segment, fcntl.LOCK_EX)
+        temp_path.rename(self.directory / name)
+        self._segment = segment
+        return segment
+
+    def _sync(self) -> None:
+        if self._segment is not None and self._unsynced:
+            os.fsync(self._segment.fileno())
+            self._unsynced = 0
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            self._sync()
+            self._segment.close()
+            self._segment = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.replay_interval):
+            try:
+                self.replay()
+            except Exception:
+                send_logger.exception("Failed to replay spooled Hermes messages")
+
+    def replay(self) -> int:
+        """
+        Publishes the spooled messages oldest first, stopping at the first which can't be published.
+        Returns the number of messages published.
+        """
+        self._check_pid()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        published = 0
+        with self._replay_lock:
+            with self._write_lock:
+                # roll over the segment being written so its messages are replayed without waiting for it to fill
+                if self._segment is not None and self._segment.tell():
+                    self._close_segment()
+
+            with open(self.directory / REPLAY_LOCK_FILE, "a") as replay_lock:
+                try:
+                    fcntl.flock(replay_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # another worker is replaying
+                    return 0
+
+                for path in self.segments():
+                    count, finished = self._replay_segment(path)
+                    published += count
+                    if not finished:
+                        break
+                else:
+                    with self._write_lock:
+                        # unless more were spooled while replaying, into a segment it skipped as still locked
+                        if self._segment is None:
+                            self._pending = False
+
+            self._update_metrics()
+
+        return published
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def _replay_segment(self, path: Path) -> tuple[int, bool]:
+        """Publishes the messages in a segment, returns the number published and whether the segment was finished"""
+        offset_path = path.with_suffix(OFFSET_SUFFIX)
+        published = 0
+        try:
+            segment = open(path, "rb")  # noqa: SIM115
+        except FileNotFoundError:
+            return published, True
+
+        with segment:
+            try:
+                fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # still being written to
+                return published, True
+
+            offset = int(offset_path.read_text()) if offset_path.exists() else 0
+            segment.seek(offset)
+            for line in segment:
+                if self._stopping.is_set():
+                    offset_path.write_text(str(offset))
+                    return published, False
+
+                try:
+                    message = json.loads(line)["message"]
+                    self.publish(message)
+                except RETRYABLE_ERRORS as e:
+                    offset_path.write_text(str(offset))
+                    send_logger.warning(f"Failed to replay spooled Hermes messages, retrying later - {e!r}")
+                    return published, False
+                except (ValueError, KeyError):
+                    # a partly written line left by a worker which died while spooling
+                    publish_dropped_counter.labels(reason="spool_corrupt").inc()
+                    send_logger.error(f"Skipped unreadable line in spool segment {path.name}: {line!r}")
+                except Exception:
+                    publish_dropped_counter.labels(reason="error").inc()
+                    send_logger.exception(f"Failed to replay spooled Hermes message, dropped message: {line!r}")
+                else:
+                    published += 1
+                    spool_replayed_counter.inc()
+
+                offset += len(line)
+
+            path.unlink()
+            offset_path.unlink(missing_ok=True)
+
+        return published, True
+
+    def _update_metrics(self) -> None:
+        size = 0
+        oldest_spooled_at = None
+        for path in self.segments():
+            offset_path = path.with_suffix(OFFSET_SUFFIX)
+            try:
+                offset = int(offset_path.read_text()) if offset_path.exists() else 0
+                size += path.stat().st_size - offset
+                if oldest_spooled_at is None:
+                    with open(path, "rb") as segment:
+                        segment.seek(offset)
+                        if line := segment.readline():
+                            oldest_spooled_at = json.loads(line)["spooled_at"]
+            except (OSError, ValueError, KeyError):
+                continue
+
+        spool_size_bytes.set(size)
+        spool_oldest_message_age.set(time.time() - oldest_spooled_at if oldest_spooled_at else 0)
@@ -20,6 +20,13 @@ def method_err(req: falcon.Request) -> dict:
 
 class Base:
     auth_class: type[BaseAuth] = AccessToken
+    # GET responses carry an ETag and a matching If-None-Match is answered with a 304 by ConditionalRequestMiddleware
+    conditional_get: bool = False
+    # GET requests are given a session on the read replica, set False where they must see the user's own changes
+    # as soon as they are committed
+    use_read_replica: bool = True
+    # set False where the resource never queries the database, so DatabaseSessionManager doesn't open a session
+    uses_db: bool = True
 
     def __init__(self, app: "App", prefix: str, url: str, kwargs: dict, db: "DB") -> None:  # noqa: PLR0913
         app.add_route(f"{prefix}{url}", self, **kwargs)
@@ -36,6 +43,16 @@ class Base:
         """
         return self.db.session
 
+    def get_version_token(self, req: falcon.Request) -> str | None:  # noqa: ARG002
+        """
+        Override to return a token, cheaper to find than the response itself, which changes whenever the response to
+        the GET request would. Lets ConditionalRequestMiddleware answer a 304 without calling the responder.
+        """
+        return None
+
+    def on_not_modified(self, req: falcon.Request, resp: falcon.Response) -> None:
+        """Called in place of the responder when a 304 is returned from the version token"""
+
     def on_get(self, req: falcon.Request, resp: falcon.Response, **kwargs: Any) -> None:  # noqa: ARG002
         raise falcon.HTTPBadRequest(**method_err(req))
 
@@ -1,3 +1,4 @@
+from collections.abc import Callable
 from typing import Any, cast
 
 import falcon
@@ -10,12 +11,23 @@ from angelia.api.serializers import (
     LoyaltyPlanOverviewSerializer,
     LoyaltyPlanSerializer,
 )
-from angelia.api.validators import empty_schema, validate
+from angelia.api.validators import empty_schema, serialize_response, validate
 from angelia.handlers.loyalty_plan import LoyaltyPlanHandler, LoyaltyPlansHandler
 from angelia.resources.base_resource import Base
+from angelia.settings import settings
+
+
+def get_json_dumps(resp: falcon.Response) -> Callable[[Any], str]:
+    """Serializes as the app's JSON media handler would for resp.media"""
+    json_handler = resp.options.media_handlers[falcon.MEDIA_JSON]
+    return lambda obj: json_handler.serialize(obj, falcon.MEDIA_JSON).decode()
 
 
 class LoyaltyPlans(Base):
+    conditional_get = True
+    # is_in_wallet must reflect a loyalty card the user has just added
+    use_read_replica = False
+
     def get_handler(
         self, req: falcon.Request, loyalty_plan_id: int | None = None
     ) -> LoyaltyPlanHandler | LoyaltyPlansHandler:
@@ -39,12 +51,18 @@ class LoyaltyPlans(Base):
 
         return handler
 
-    @validate(req_schema=empty_schema, resp_schema=LoyaltyPlanSerializer)
+    @validate(req_schema=empty_schema)
     def on_get(self, req: falcon.Request, resp: falcon.Response, **kwargs: Any) -> None:  # noqa: ARG002
         handler = cast(LoyaltyPlansHandler, self.get_handler(req))
-        response = handler.get_all_plans(order_by_popularity=True)
+        if settings.PLAN_CATALOGUE_JSON_FRAGMENTS:
+            resp.data = handler.get_all_plans_json(
+                lambda plans: cast(list[dict], serialize_response(LoyaltyPlanSerializer, plans)),
+                get_json_dumps(resp),
+                order_by_popularity=True,
+            )
+        else:
+            resp.media = serialize_response(LoyaltyPlanSerializer, handler.get_all_plans(order_by_popularity=True))
 
-        resp.media = response
         resp.status = falcon.HTTP_200
 
         metric = Metric(request=req, status=resp.status)
@@ -61,12 +79,17 @@ class LoyaltyPlans(Base):
         metric = Metric(request=req, status=resp.status, resource_id=loyalty_plan_id, resource="loyalty_plan_id")
         metric.route_metric()
 
-    @validate(req_schema=empty_schema, resp_schema=LoyaltyPlanOverviewSerializer)
+    @validate(req_schema=empty_schema)
     def on_get_overview(self, req: falcon.Request, resp: falcon.Response, **kwargs: Any) -> None:  # noqa: ARG002
         handler = cast(LoyaltyPlansHandler, self.get_handler(req))
-        response = handler.get_all_plans_overview()
+        if settings.PLAN_CATALOGUE_JSON_FRAGMENTS:
+            resp.data = handler.get_all_plans_overview_json(
+                lambda plans: cast(list[dict], serialize_response(LoyaltyPlanOverviewSerializer, plans)),
+                get_json_dumps(resp),
+            )
+        else:
+            resp.media = serialize_response(LoyaltyPlanOverviewSerializer, handler.get_all_plans_overview())
 
-        resp.media = response
         resp.status = falcon.HTTP_200
 
         metric = Metric(request=req, status=resp.status)
@@ -10,6 +10,7 @@ from angelia.resources.base_resource import Base
 
 class Metrics(Base):
     auth_class = NoAuth
+    uses_db = False
 
     def on_get(self, req: falcon.Request, resp: falcon.Response, **kwargs: Any) -> None:  # noqa: ARG002
         registry = REGISTRY
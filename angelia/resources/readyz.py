@@ -12,6 +12,7 @@ from angelia.settings import settings
 
 class ReadyZ(Base):
     auth_class = NoAuth
+    uses_db = False
 
     def on_get(self, req: falcon.Request, resp: falcon.Response, **kwargs: Any) -> None:  # noqa: ARG002
         pg = self._check_postgres()
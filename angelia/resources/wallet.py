@@ -23,15 +23,17 @@ from angelia.api.serializers import (
     WalletOverViewSerializer,
     WalletSerializer,
 )
-from angelia.api.validators import create_trusted_schema, empty_schema, validate
+from angelia.api.validators import create_trusted_schema, empty_schema, serialize_response, validate
 from angelia.encryption import decrypt_payload
 from angelia.handlers.loyalty_card import TRUSTED_ADD, LoyaltyCardHandler
 from angelia.handlers.payment_account import PaymentAccountHandler
 from angelia.handlers.token import TokenGen
 from angelia.handlers.wallet import WalletHandler
+from angelia.lib.wallet_cache import WalletResponseType, get_cached_wallet_response
 from angelia.messaging.sender import send_message_to_hermes
 from angelia.report import ctx, log_request_data
 from angelia.resources.base_resource import Base
+from angelia.settings import settings
 
 if TYPE_CHECKING:
     from pydantic import BaseModel
@@ -48,23 +50,49 @@ def get_voucher_serializers() -> "list[type[BaseModel]]":
 
 
 class Wallet(Base):
+    conditional_get = True
+    use_read_replica = False
+    versioned_uri_templates = (f"{settings.URL_PREFIX}/wallet", f"{settings.URL_PREFIX}/wallet_overview")
+
     def get_wallet_handler(self, req: falcon.Request) -> WalletHandler:
         user_id = ctx.user_id = get_authenticated_user(req)
         channel = get_authenticated_channel(req)
         return WalletHandler(db_session=self.session, user_id=user_id, channel_id=channel)
 
-    @validate(req_schema=empty_schema, resp_schema=get_voucher_serializers()[0])
+    def get_version_token(self, req: falcon.Request) -> str | None:
+        if req.uri_template not in self.versioned_uri_templates:
+            return None
+
+        return self.get_wallet_handler(req).get_wallet_version_token()
+
+    def on_not_modified(self, req: falcon.Request, resp: falcon.Response) -> None:
+        handler = self.get_wallet_handler(req)
+        handler.send_to_hermes_view_wallet_event()
+        metric = Metric(request=req, status=resp.status)
+        metric.route_metric()
+
+    @validate(req_schema=empty_schema)
     def on_get(self, req: falcon.Request, resp: falcon.Response) -> None:
         handler = self.get_wallet_handler(req)
-        resp.media = handler.get_wallet_response()
+        resp.media = get_cached_wallet_response(
+            handler.user_id,
+            handler.channel_id,
+            WalletResponseType.FULL,
+            lambda: serialize_response(get_voucher_serializers()[0], handler.get_wallet_response()),
+        )
         handler.send_to_hermes_view_wallet_event()
         metric = Metric(request=req, status=resp.status)
         metric.route_metric()
 
-    @validate(req_schema=empty_schema, resp_schema=WalletOverViewSerializer)
+    @validate(req_schema=empty_schema)
     def on_get_overview(self, req: falcon.Request, resp: falcon.Response) -> None:
         handler = self.get_wallet_handler(req)
-        resp.media = handler.get_overview_wallet_response()
+        resp.media = get_cached_wallet_response(
+            handler.user_id,
+            handler.channel_id,
+            WalletResponseType.OVERVIEW,
+            lambda: serialize_response(WalletOverViewSerializer, handler.get_overview_wallet_response()),
+        )
         handler.send_to_hermes_view_wallet_event()
         metric = Metric(request=req, status=resp.status)
         metric.route_metric()
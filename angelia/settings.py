@@ -66,9 +66,33 @@ class Settings(BaseSettings):
 
     JSON_LOGGING: bool = True
     QUERY_LOGGING: bool = False
+    # A warning listing the statements run most often is logged for requests running more queries than the budget of
+    # their route template in QUERY_BUDGETS, or QUERY_BUDGET for other routes. A budget of 0 is unlimited.
+    # SERVER_TIMING adds the query count and time of each request to a Server-Timing response header.
+    QUERY_BUDGET: int = 0
+    QUERY_BUDGETS: dict[str, int] = {}
+    SERVER_TIMING: bool = False
 
     POSTGRES_DSN: str = "postgresql://postgres@127.0.0.1:5432/hermes"
     POSTGRES_CONNECT_ARGS: ClassVar[dict[str, str]] = {"application_name": "angelia"}
+    # Read replica for GET requests, which go to the primary if unset or while the replica is more than
+    # POSTGRES_READ_MAX_LAG seconds behind it. The lag is measured every POSTGRES_READ_LAG_CHECK_INTERVAL seconds.
+    POSTGRES_READ_DSN: str = ""
+    POSTGRES_READ_MAX_LAG: float = 5.0
+    POSTGRES_READ_LAG_CHECK_INTERVAL: float = 5.0
+    # Connection pool of each engine. Connections beyond POSTGRES_POOL_SIZE, up to POSTGRES_POOL_MAX_OVERFLOW more,
+    # are closed when checked in and a checkout waits up to POSTGRES_POOL_TIMEOUT seconds for one to be free.
+    # Connections older than POSTGRES_POOL_RECYCLE seconds are replaced, -1 keeps them, and POSTGRES_POOL_PRE_PING
+    # tests each connection as it is checked out.
+    POSTGRES_POOL_SIZE: int = 5
+    POSTGRES_POOL_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_TIMEOUT: float = 30.0
+    POSTGRES_POOL_RECYCLE: int = -1
+    POSTGRES_POOL_PRE_PING: bool = False
+    # Snapshot created by the dump-schema-snapshot command, which the models load their tables from instead of
+    # reflecting them at startup. With SCHEMA_SNAPSHOT_VALIDATE it is compared with the database in the background.
+    SCHEMA_SNAPSHOT_PATH: str = ""
+    SCHEMA_SNAPSHOT_VALIDATE: bool = True
 
     RABBIT_USER: str = ""  # eg 'guest'
     RABBIT_PASSWORD: str = ""
@@ -80,8 +104,104 @@ class Settings(BaseSettings):
     PUBLISH_MAX_RETRIES: int = 3
     PUBLISH_RETRY_BACKOFF_FACTOR: float = 0.25
 
+    # Publish to Hermes from a background thread in each worker, request threads only add the message to a queue
+    # of up to PUBLISH_QUEUE_SIZE messages. When the queue is full "block" waits up to PUBLISH_BLOCK_TIMEOUT seconds
+    # for space and then drops the message, "drop_oldest" drops the oldest queued message and "spill" writes the
+    # message to the spool, which needs SPOOL_DIR to be set.
+    PUBLISH_ASYNC: bool = False
+    PUBLISH_QUEUE_SIZE: int = 10000
+    PUBLISH_OVERFLOW_POLICY: Literal["block", "drop_oldest", "spill"] = "block"
+    PUBLISH_BLOCK_TIMEOUT: float = 1.0
+    # Seconds to wait for queued messages to be published when a worker shuts down
+    PUBLISH_DRAIN_TIMEOUT: float = 10.0
+
+    # Send the history events of each transaction to Hermes as a single versioned mapped_history_batch message
+    # rather than a mapped_history message per event. Requires a Hermes which understands the batch message.
+    HISTORY_BATCH_ENABLED: bool = False
+
+    # Messages which can't be published because the broker is unavailable are written to segment files in SPOOL_DIR
+    # and replayed in order by a background thread every SPOOL_REPLAY_INTERVAL seconds. Segments are fsynced once
+    # SPOOL_FSYNC_BATCH_SIZE messages have been written to them and when they are rolled over by the replayer.
+    # While a worker has spooled messages left to replay its new messages are spooled behind them rather than sent,
+    # order isn't kept between workers. SPOOL_DIR must be set to a volume which outlives the pod when enabled, segments
+    # written to the container's filesystem are lost with it.
+    SPOOL_ENABLED: bool = False
+    SPOOL_DIR: str = ""
+    SPOOL_SEGMENT_MAX_BYTES: int = 10 * 1024 * 1024
+    SPOOL_FSYNC_BATCH_SIZE: int = 1
+    SPOOL_REPLAY_INTERVAL: float = 5.0
+
+    @validator("SPOOL_DIR", pre=False)
+    @classmethod
+    def spool_dir_validator(cls, value: str, values: dict) -> str:
+        if (values.get("SPOOL_ENABLED") or values.get("PUBLISH_OVERFLOW_POLICY") == "spill") and not value:
+            raise ValueError("SPOOL_DIR must be set to a persistent directory when the spool is used")
+        return value
+
     URL_PREFIX: str = "/v2"
 
+    # "orm" queries the wallet parts separately, "json" fetches them in one statement using postgres json aggregation
+    WALLET_QUERY_ENGINE: Literal["orm", "json"] = "orm"
+
+    # Secrets and kids not found in the vault are remembered for VAULT_UNKNOWN_TTL seconds rather than reloaded for on
+    # each request, and each secret is reloaded at most once every VAULT_MIN_RELOAD_INTERVAL seconds. Secrets not yet
+    # loaded are named from unverified token headers, so at most VAULT_MAX_UNKNOWN_RELOADS of them are reloaded in
+    # each interval.
+    VAULT_UNKNOWN_TTL: float = 10.0
+    VAULT_UNKNOWN_CACHE_MAX_SIZE: int = 1000
+    VAULT_MIN_RELOAD_INTERVAL: float = 5.0
+    VAULT_MAX_UNKNOWN_RELOADS: int = 10
+    # Refresh the loaded secrets in a background thread in each worker every VAULT_REFRESH_INTERVAL seconds, varied by
+    # up to VAULT_REFRESH_JITTER of the interval, so rotated secrets are picked up before a request misses them.
+    VAULT_REFRESH_ENABLED: bool = False
+    VAULT_REFRESH_INTERVAL: float = 300.0
+    VAULT_REFRESH_JITTER: float = 0.1
+    # Secrets fetched at a time when several are loaded together, eg at startup
+    VAULT_LOAD_WORKERS: int = 4
+
+    # Access tokens verified by a worker are cached by it until they expire so requests reusing one skip decoding it
+    ACCESS_TOKEN_CACHE_ENABLED: bool = True
+    ACCESS_TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Wallet response cache. TTL is in seconds and bounds how long changes made by Hermes can go unseen. Requests
+    # invalidate the wallets they change, which the other workers only see through a shared backend, so one must be
+    # configured to enable the cache.
+    WALLET_CACHE_ENABLED: bool = False
+    WALLET_CACHE_TTL: int = 30
+    WALLET_CACHE_MAX_SIZE: int = 10000
+    WALLET_CACHE_BACKEND: str = "angelia.lib.cache.LRUCache"
+
+    @validator("WALLET_CACHE_BACKEND", pre=False)
+    @classmethod
+    def wallet_cache_backend_validator(cls, value: str, values: dict) -> str:
+        if values.get("WALLET_CACHE_ENABLED") and value == "angelia.lib.cache.LRUCache":
+            raise ValueError("WALLET_CACHE_BACKEND must be a backend shared between workers when WALLET_CACHE_ENABLED")
+        return value
+
+    # Cache of the plan level scheme and payment card images used by the wallet and loyalty card endpoints. Entries
+    # expire at the next image start or end date, or after the TTL (seconds) which bounds how long images published,
+    # edited or withdrawn in Hermes can go unseen. The cache is in process so nothing invalidates it on those changes.
+    PLAN_IMAGE_CACHE_ENABLED: bool = False
+    PLAN_IMAGE_CACHE_TTL: int = 600
+    PLAN_IMAGE_CACHE_MAX_SIZE: int = 5000
+
+    # Cache of the formatted loyalty plan catalogue per channel used by the loyalty_plans endpoints, the TTL
+    # (seconds) bounds how long plan, image and consent changes made by Hermes go unseen. Angelia doesn't change plans
+    # so nothing invalidates the in process cache, the TTL is its only expiry. With a shared backend the
+    # invalidate-plan-catalogue-cache command drops cached catalogues for every worker. Off until the staleness is
+    # accepted for an environment.
+    PLAN_CATALOGUE_CACHE_ENABLED: bool = False
+    PLAN_CATALOGUE_CACHE_TTL: int = 300
+    PLAN_CATALOGUE_CACHE_MAX_SIZE: int = 1000
+    PLAN_CATALOGUE_CACHE_BACKEND: str = "angelia.lib.cache.LRUCache"
+    # Serve the loyalty_plans catalogue from per plan json cached with it, skipping response validation and
+    # serialization on each request
+    PLAN_CATALOGUE_JSON_FRAGMENTS: bool = False
+
+    # Seconds an ETag made from a resource version token is honoured for, bounding how long changes not covered by
+    # the token (eg to plans or images) can be answered with 304 Not Modified.
+    CONDITIONAL_GET_VERSION_TTL: int = 300
+
     # Metrics
     METRICS_SIDECAR_DOMAIN: str = "localhost"
     METRICS_PORT: int = 4000
@@ -0,0 +1,154 @@
+import datetime
+import ipaddress
+import json
+import ssl
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from azure.core.credentials import AccessToken
+from azure.keyvault.secrets import SecretClient
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+HOST = "127.0.0.1"
+
+
+class FakeCredential:
+    def __init__(self) -> None:
+        self.token_requests = 0
+
+    def get_token(self, *_: str, **__: Any) -> AccessToken:
+        self.token_requests += 1
+        return AccessToken("fake-token", int(time.time()) + 3600)
+
+
+def write_self_signed_cert(directory: Path) -> tuple[Path, Path]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, HOST)])
+    now = datetime.datetime.now(datetime.UTC)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address(HOST))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = directory / "cert.pem"
+    key_path = directory / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    )
+    return cert_path, key_path
+
+
+class FakeKeyVault:
+    """
+    Key Vault stand-in serving secrets over https on localhost, answering requests without a bearer token with an
+    authentication challenge as the real service does. Use as a context manager and create clients with client().
+    """
+
+    def __init__(self, secrets: dict[str, dict], delay: float = 0.0) -> None:
+        self.secrets = secrets
+        self.delay = delay
+        self.challenges = 0
+        self.requests: list[str] = []
+        self.connections: set[int] = set()
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.cert_path, key_path = write_self_signed_cert(Path(self._temp_dir.name))
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_path, key_path)
+        self._server = ThreadingHTTPServer((HOST, 0), self._handler())
+        self._server.daemon_threads = True
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self.url = f"https://{HOST}:{self._server.server_port}"
+
+    def client(self, credential: FakeCredential) -> SecretClient:
+        return SecretClient(
+            vault_url=self.url,
+            credential=credential,
+            verify_challenge_resource=False,
+            connection_verify=str(self.cert_path),
+        )
+
+    def __enter__(self) -> "FakeKeyVault":
+        threading.Thread(target=self._server.serve_forever, name="fake-key-vault", daemon=True).start()
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._temp_dir.cleanup()
+
+    def _get_secret(self, handler: BaseHTTPRequestHandler) -> None:
+        if "Authorization" not in handler.headers:
+            with self._lock:
+                self.challenges += 1
+            handler.send_response(401)
+            handler.send_header(
+                "WWW-Authenticate",
+                'Bearer authorization="https://login.microsoftonline.com/tenant", resource="https://vault.azure.net"',
+            )
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        # paths are /secrets/<name>/<version>?api-version=...
+        secret_name = handler.path.split("?")[0].split("/")[2]
+        with self._lock:
+            self.requests.append(secret_name)
+            self.connections.add(handler.client_address[1])
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self._in_flight -= 1
+
+        if secret_name in self.secrets:
+            status = 200
+            body = {
+                "value": json.dumps(self.secrets[secret_name]),
+                "id": f"{self.url}/secrets/{secret_name}/1",
+                "attributes": {"enabled": True},
+            }
+        else:
+            status = 404
+            body = {"error": {"code": "SecretNotFound", "message": f"A secret with name {secret_name} was not found"}}
+
+        content = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        vault = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                vault._get_secret(self)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
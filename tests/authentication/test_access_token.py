@@ -2,8 +2,9 @@ import datetime
 from unittest.mock import patch
 
 import falcon
+import jwt
 
-from angelia.api.auth import AccessToken, get_authenticated_channel, get_authenticated_user
+from angelia.api.auth import AccessToken, access_token_cache, get_authenticated_channel, get_authenticated_user
 
 from .helpers.token_helpers import create_access_token, validate_mock_request
 
@@ -110,3 +111,46 @@ class TestAccessAuth:
                 assert e.status == falcon.HTTP_401
             except Exception as e:
                 raise AssertionError(f"Exception in code or test {e}") from None
+
+    def test_verified_token_cached(self) -> None:
+        with (
+            patch("angelia.api.auth.get_access_token_secret") as mock_get_secret,
+            patch("angelia.api.auth.jwt.decode", wraps=jwt.decode) as mock_decode,
+        ):
+            test_secret_key = "test_key-1"
+            mock_get_secret.return_value = self.secrets_dict.get(test_secret_key)
+            auth_token = create_access_token(test_secret_key, self.secrets_dict, self.sub, self.channel)
+            for _ in range(3):
+                mock_request = validate_mock_request(auth_token, AccessToken)
+                assert get_authenticated_user(mock_request) == self.sub
+                assert get_authenticated_channel(mock_request) == self.channel
+
+            assert mock_decode.call_count == 1
+            assert len(access_token_cache) == 1
+
+    def test_cached_token_verified_again_when_secret_rotated(self) -> None:
+        with patch("angelia.api.auth.get_access_token_secret") as mock_get_secret:
+            test_secret_key = "test_key-1"
+            mock_get_secret.return_value = self.secrets_dict.get(test_secret_key)
+            auth_token = create_access_token(test_secret_key, self.secrets_dict, self.sub, self.channel)
+            validate_mock_request(auth_token, AccessToken)
+
+            mock_get_secret.return_value = ""
+            try:
+                validate_mock_request(auth_token, AccessToken)
+                raise AssertionError("Cached token accepted after its secret was rotated out")
+            except falcon.HTTPUnauthorized as e:
+                assert e.title == "Access Token has unknown secret"
+            assert len(access_token_cache) == 0
+
+    def test_invalid_token_not_cached(self) -> None:
+        with patch("angelia.api.auth.get_access_token_secret") as mock_get_secret:
+            mock_get_secret.return_value = "my_secret_bad"
+            auth_token = create_access_token("test_key-1", self.secrets_dict, self.sub, self.channel)
+            for _ in range(2):
+                try:
+                    validate_mock_request(auth_token, AccessToken)
+                    raise AssertionError("Did not detect invalid secret")
+                except falcon.HTTPUnauthorized as e:
+                    assert e.code == "INVALID_TOKEN"
+            assert len(access_token_cache) == 0
@@ -1,3 +1,5 @@
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import azure.core.exceptions
@@ -7,7 +9,15 @@ import jwt
 from angelia.api.auth import ClientToken
 from angelia.api.custom_error_handlers import TokenHTTPError
 from angelia.api.helpers import vault
-from angelia.api.helpers.vault import load_secrets_from_vault
+from angelia.api.helpers.vault import (
+    SecretRefresher,
+    dynamic_get_b2b_token_secret,
+    get_access_token_secret,
+    load_secrets_from_vault,
+    refresh_loaded_secrets,
+    set_local_vault_secret,
+)
+from angelia.settings import settings
 
 from .helpers.keys import (
     private_key_eddsa,
@@ -99,3 +109,154 @@ class TestB2BAuth:
                     assert e.status == falcon.HTTP_BAD_REQUEST
                 except Exception as e:
                     raise AssertionError(f"Exception in code or test {e}") from None
+
+    def test_public_key_parsed_once_per_load(self) -> None:
+        set_local_vault_secret("api2-b2b-secrets-test", {"channel": self.channel})
+        set_local_vault_secret("api2-b2b-token-key-test-1", {"public_key": public_key_rsa})
+
+        first = dynamic_get_b2b_token_secret("test-1")
+        assert not isinstance(first["key"], str)
+        assert dynamic_get_b2b_token_secret("test-1")["key"] is first["key"]
+
+        auth_token = create_b2b_token(private_key_rsa, sub=self.external_id, kid="test-1", email=self.email)
+        mock_request = validate_mock_request(auth_token, ClientToken, media={"grant_type": "b2b", "scope": ["user"]})
+        assert mock_request.context.auth_instance.auth_data["channel"] == self.channel
+
+        # reloading the secret replaces the parsed key
+        set_local_vault_secret("api2-b2b-token-key-test-1", {"public_key": public_key_eddsa})
+        assert dynamic_get_b2b_token_secret("test-1")["key"] is not first["key"]
+        auth_token = create_b2b_token(
+            private_key_eddsa, algorithm="EdDSA", sub=self.external_id, kid="test-1", email=self.email
+        )
+        validate_mock_request(auth_token, ClientToken, media={"grant_type": "b2b", "scope": ["user"]})
+        vault._local_vault_store = {}
+
+    def test_unknown_kid_reloaded_once(self) -> None:
+        set_local_vault_secret("api2-b2b-secrets-test", {"channel": self.channel})
+        with patch("angelia.api.helpers.vault.load_secrets_from_vault") as mock_load:
+            assert dynamic_get_b2b_token_secret("test-unknown") == {}
+            assert dynamic_get_b2b_token_secret("test-unknown") == {}
+
+            mock_load.assert_called_once_with(["api2-b2b-token-key-test-unknown"], was_loaded=False, allow_reload=True)
+
+            # once no longer remembered as unknown the key may have been added to the vault
+            vault.unknown_secrets.clear()
+            vault.recent_reloads.clear()
+            mock_load.side_effect = lambda *_, **__: vault._local_vault_store.update(
+                {"api2-b2b-token-key-test-unknown": {"public_key": public_key_rsa}}
+            )
+            assert dynamic_get_b2b_token_secret("test-unknown")["channel"] == self.channel
+            assert mock_load.call_count == 2
+        vault._local_vault_store = {}
+
+    def test_unknown_kid_not_reloaded_within_interval(self) -> None:
+        set_local_vault_secret("api2-b2b-secrets-test", {"channel": self.channel})
+        with (
+            patch("angelia.api.helpers.vault.load_secrets_from_vault") as mock_load,
+            patch.object(settings, "VAULT_UNKNOWN_TTL", 0),
+        ):
+            assert dynamic_get_b2b_token_secret("test-unknown") == {}
+            assert dynamic_get_b2b_token_secret("test-unknown") == {}
+
+            mock_load.assert_called_once()
+        vault._local_vault_store = {}
+
+    def test_concurrent_unknown_kid_lookups_share_reload(self) -> None:
+        set_local_vault_secret("api2-b2b-secrets-test", {"channel": self.channel})
+        threads = 16
+        start = threading.Barrier(threads)
+
+        def slow_load(*_: object, **__: object) -> bool:
+            time.sleep(0.2)
+            vault._local_vault_store["api2-b2b-token-key-test-new"] = {"public_key": public_key_rsa}
+            return True
+
+        results: list[dict] = []
+
+        def lookup() -> None:
+            start.wait()
+            results.append(dynamic_get_b2b_token_secret("test-new"))
+
+        with patch("angelia.api.helpers.vault.load_secrets_from_vault", side_effect=slow_load) as mock_load:
+            workers = [threading.Thread(target=lookup) for _ in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+            mock_load.assert_called_once()
+        assert len(results) == threads
+        assert all(result["channel"] == self.channel for result in results)
+        vault._local_vault_store = {}
+
+    def test_unknown_kid_reloads_capped(self) -> None:
+        set_local_vault_secret("api2-b2b-secrets-test", {"channel": self.channel})
+        with (
+            patch("angelia.api.helpers.vault.load_secrets_from_vault") as mock_load,
+            patch.object(settings, "VAULT_MAX_UNKNOWN_RELOADS", 3),
+        ):
+            for i in range(10):
+                assert dynamic_get_b2b_token_secret(f"test-garbage{i}") == {}
+
+            assert mock_load.call_count == 3
+            # only the kids which were reloaded are remembered as unknown, the others are reloaded once allowed
+            assert len(vault.unknown_secrets) == 3
+            assert not vault.unknown_secrets.get("api2-b2b-token-key-test-garbage9")
+            # a new interval starts
+            vault._unknown_reloads_started = float("-inf")
+            assert dynamic_get_b2b_token_secret("test-garbage9") == {}
+            assert mock_load.call_count == 4
+        # nothing is kept for the reloads once they have finished
+        assert not vault._reloads_in_flight
+        assert len(vault.recent_reloads) == 4
+        vault._local_vault_store = {}
+
+    def test_refresh_loaded_secrets(self) -> None:
+        set_local_vault_secret(vault.ACCESS_SECRETS, {"current_key": "access-secret-1", "access-secret-1": "old"})
+        set_local_vault_secret("api2-b2b-token-key-test-1", {"public_key": public_key_rsa})
+        rotated = {
+            vault.ACCESS_SECRETS: '{"current_key": "access-secret-2", "access-secret-1": "old", '
+            '"access-secret-2": "new"}'
+        }
+
+        def get_secret(secret_name: str) -> MagicMock:
+            if secret_name not in rotated:
+                raise azure.core.exceptions.ResourceNotFoundError
+            return MagicMock(value=rotated[secret_name])
+
+        with (
+            patch("angelia.api.helpers.vault.get_azure_client") as mock_get_client,
+            patch.object(settings.VAULT_CONFIG, "LOCAL_SECRETS", False),
+        ):
+            mock_get_client.return_value.get_secret.side_effect = get_secret
+            assert refresh_loaded_secrets() == 0
+
+        with patch("angelia.api.helpers.vault.load_secrets_from_vault") as mock_load:
+            assert get_access_token_secret("access-secret-2") == "new"
+            # the b2b token key was deleted from the vault so is no longer accepted
+            assert "api2-b2b-token-key-test-1" not in vault._local_vault_store
+            mock_load.assert_not_called()
+        vault._local_vault_store = {}
+
+    def test_refresh_keeps_secrets_on_failure(self) -> None:
+        set_local_vault_secret(vault.ACCESS_SECRETS, {"access-secret-1": "old"})
+        with (
+            patch("angelia.api.helpers.vault.get_azure_client") as mock_get_client,
+            patch.object(settings.VAULT_CONFIG, "LOCAL_SECRETS", False),
+        ):
+            mock_get_client.return_value.get_secret.side_effect = azure.core.exceptions.ServiceRequestError("down")
+            assert refresh_loaded_secrets() == 1
+
+        assert vault._local_vault_store[vault.ACCESS_SECRETS] == {"access-secret-1": "old"}
+        vault._local_vault_store = {}
+
+    def test_secret_refresher_runs_with_jitter(self) -> None:
+        refreshed = threading.Event()
+        refresher = SecretRefresher(interval=0.01, jitter=0.5, refresh=lambda: refreshed.set() or 0)
+        assert all(0.005 <= refresher.next_wait() <= 0.015 for _ in range(100))
+
+        refresher.start()
+        try:
+            assert refreshed.wait(1)
+        finally:
+            refresher.stop()
@@ -0,0 +1,45 @@
+from collections.abc import Callable
+from unittest.mock import Mock
+
+import pytest
+
+from angelia.api.auth import ClientToken
+from angelia.api.helpers import vault
+from angelia.api.helpers.vault import set_local_vault_secret
+from tests.helpers.benchmark import record_timing
+
+from .helpers.keys import private_key_eddsa, private_key_rsa, public_key_eddsa, public_key_rsa
+from .helpers.token_helpers import create_b2b_token, setup_mock_request
+
+VALIDATIONS = 500
+
+
+def validator(mock_request: Mock, parse_pem: bool) -> Callable[[], None]:
+    def validate() -> None:
+        if parse_pem:
+            # a key not yet parsed since its secret was loaded, so the PEM is parsed in every validation
+            vault._public_keys.clear()
+        # the scope is popped from the media when it is checked
+        mock_request.media = {"grant_type": "b2b", "scope": ["user"]}
+        ClientToken().validate(mock_request)
+
+    return validate
+
+
+@pytest.mark.benchmark
+def test_b2b_token_validation_benchmark(record_property: Callable[[str, object], None]) -> None:
+    set_local_vault_secret("api2-b2b-secrets-bench", {"channel": "com.test.channel"})
+    for algorithm, private_key, public_key in (
+        ("RS512", private_key_rsa, public_key_rsa),
+        ("EdDSA", private_key_eddsa, public_key_eddsa),
+    ):
+        set_local_vault_secret("api2-b2b-token-key-bench-1", {"public_key": public_key})
+        auth_token = create_b2b_token(
+            private_key, algorithm=algorithm, sub="bench", kid="bench-1", email="bench@test.com", expire_in=600
+        )
+        mock_request = setup_mock_request(auth_token, ClientToken)
+
+        for name, parse_pem in (("parsing_pem", True), ("cached_key", False)):
+            record_timing(record_property, f"{algorithm}_{name}", validator(mock_request, parse_pem), runs=VALIDATIONS)
+
+    vault._local_vault_store = {}
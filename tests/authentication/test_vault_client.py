@@ -0,0 +1,63 @@
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+
+from angelia.api.helpers import vault
+from angelia.api.helpers.vault import get_azure_client, load_secrets_from_vault
+from angelia.settings import settings
+
+from .helpers.fake_key_vault import FakeCredential, FakeKeyVault
+
+SECRETS = {f"secret-{i}": {"value": i} for i in range(8)}
+
+
+@pytest.fixture
+def credential() -> FakeCredential:
+    return FakeCredential()
+
+
+@pytest.fixture
+def key_vault(credential: FakeCredential) -> Generator[FakeKeyVault, None, None]:
+    with (
+        FakeKeyVault(SECRETS, delay=0.05) as key_vault,
+        patch("angelia.api.helpers.vault.create_azure_client", side_effect=lambda: key_vault.client(credential)),
+        patch.object(settings.VAULT_CONFIG, "LOCAL_SECRETS", False),
+    ):
+        vault._azure_client = None
+        yield key_vault
+
+    vault._azure_client = None
+    vault._local_vault_store = {}
+
+
+def test_client_reused_between_loads(key_vault: FakeKeyVault, credential: FakeCredential) -> None:
+    for secret_name in SECRETS:
+        assert load_secrets_from_vault([secret_name], was_loaded=False, allow_reload=True)
+
+    assert {name: vault._local_vault_store[name] for name in SECRETS} == SECRETS
+    # one authentication challenge and token for the process rather than for each load
+    assert key_vault.challenges == 1
+    assert credential.token_requests == 1
+    assert len(key_vault.connections) == 1
+
+
+def test_client_created_again_after_fork(key_vault: FakeKeyVault) -> None:
+    client = get_azure_client()
+    assert get_azure_client() is client
+
+    with patch("angelia.api.helpers.vault.os.getpid", return_value=-1):
+        assert get_azure_client() is not client
+
+
+def test_secrets_loaded_concurrently(key_vault: FakeKeyVault) -> None:
+    assert load_secrets_from_vault(list(SECRETS), was_loaded=False, allow_reload=True)
+
+    assert {name: vault._local_vault_store[name] for name in SECRETS} == SECRETS
+    assert 1 < key_vault.max_in_flight <= settings.VAULT_LOAD_WORKERS
+
+
+def test_missing_secret_stops_load(key_vault: FakeKeyVault) -> None:
+    assert not load_secrets_from_vault(["secret-0", "missing", "secret-1"], was_loaded=False, allow_reload=True)
+
+    assert vault._local_vault_store == {"secret-0": SECRETS["secret-0"]}
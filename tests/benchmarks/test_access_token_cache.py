@@ -0,0 +1,40 @@
+from collections.abc import Callable
+from unittest.mock import MagicMock
+
+import pytest
+from falcon import testing
+from pytest_mock import MockerFixture
+
+from angelia.api.auth import AccessToken, access_token_cache
+from angelia.api.middleware import AuthenticationMiddleware
+from tests.authentication.helpers.token_helpers import create_access_token
+from tests.helpers.benchmark import record_setting_timings
+
+REQUESTS = 2000
+
+
+@pytest.mark.benchmark
+def test_access_token_cache_benchmark(mocker: MockerFixture, record_property: Callable[[str, object], None]) -> None:
+    secrets = {"test_key-1": "my_secret_1"}
+    mocker.patch("angelia.api.auth.get_access_token_secret").return_value = secrets["test_key-1"]
+    auth_token = create_access_token("test_key-1", secrets, sub=1, channel="com.bink.wallet", expire_in=600)
+    req = testing.create_req(path="/v2/wallet", headers={"Authorization": auth_token})
+    resp = MagicMock()
+    resource = MagicMock(auth_class=AccessToken)
+    middleware = AuthenticationMiddleware()
+
+    def authenticate() -> None:
+        middleware.process_resource(req, resp, resource, {})
+
+    authenticate()
+    assert req.context.auth_instance.auth_data["sub"] == "1"
+
+    # per request, each batch starts with the token not yet cached
+    record_setting_timings(
+        record_property,
+        "ACCESS_TOKEN_CACHE_ENABLED",
+        {"decoded": False, "cached": True},
+        authenticate,
+        runs=REQUESTS,
+        setup=access_token_cache.clear,
+    )
@@ -0,0 +1,64 @@
+import time
+import typing
+from collections.abc import Callable
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from angelia.api.shared_data import SharedData
+from angelia.settings import settings
+from tests.factories import ClientApplicationFactory, UserFactory
+from tests.helpers.benchmark import record_setting_timings
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+ROWS = (1, 50)
+# stands in for the time taken by the broker to confirm each publish
+BROKER_ROUND_TRIP = 0.001
+
+
+def add_users(db_session: "Session", rows: int) -> None:
+    client = ClientApplicationFactory()
+    for _ in range(rows):
+        UserFactory(client=client)
+    db_session.flush()
+
+
+def mock_producer(mocker: MockerFixture) -> MagicMock:
+    request = MagicMock()
+    request.context.auth_instance.auth_data = {"sub": 1, "channel": "com.bink.whatever"}
+    SharedData(request, MagicMock(), MagicMock(), MagicMock())
+    mock_sending_service = mocker.patch("angelia.messaging.sender.sending_service")
+    return mock_sending_service.queues["HERMES"]
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_history_batch_message_count(batched: bool, db_session: "Session", mocker: MockerFixture) -> None:
+    producer = mock_producer(mocker)
+    mocker.patch.object(settings, "HISTORY_BATCH_ENABLED", batched)
+
+    add_users(db_session, 3)
+    db_session.commit()
+
+    assert producer.send_message.call_count == (1 if batched else 3)
+
+
+@pytest.mark.benchmark
+def test_history_batch_benchmark(
+    db_session: "Session", mocker: MockerFixture, record_property: Callable[[str, object], None]
+) -> None:
+    producer = mock_producer(mocker)
+    producer.send_message.side_effect = lambda **_: time.sleep(BROKER_ROUND_TRIP)
+
+    for rows in ROWS:
+        # only the commit, which publishes the history, is timed
+        record_setting_timings(
+            record_property,
+            "HISTORY_BATCH_ENABLED",
+            {f"per_event_{rows}_rows_commit": False, f"batched_{rows}_rows_commit": True},
+            db_session.commit,
+            runs=1,
+            setup=lambda rows=rows: add_users(db_session, rows),
+        )
@@ -0,0 +1,116 @@
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from angelia.handlers.loyalty_plan import LoyaltyPlanHandler, LoyaltyPlansHandler
+from tests.helpers.benchmark import record_timing
+
+PLANS = 500
+CREDENTIALS = 6
+DOCUMENTS = 4
+CONSENTS = 4
+
+
+class Record:
+    """Stands in for a model instance, hashable by identity as they are"""
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.__dict__.update(kwargs)
+
+
+def make_credential(plan_id: int, order: int) -> Record:
+    return Record(
+        scheme_id=plan_id,
+        order=order,
+        label=f"label {order}",
+        validation=None,
+        validation_description=None,
+        description=None,
+        type=f"credential_{order}",
+        answer_type=order % 2,
+        is_optional=False,
+        choice=None,
+        manual_question=order == 0,
+        scan_question=order == 1,
+        add_field=order < 2,
+        auth_field=order >= 2,
+        enrol_field=order >= 3,
+        register_field=order >= 4,
+    )
+
+
+def make_document(plan_id: int, order: int) -> Record:
+    displays = (["ADD"], ["ENROL", "REGISTRATION"], ["AUTHORISE", "ADD"], ["ENROL"])
+    return Record(
+        scheme_id=plan_id,
+        order=order,
+        name=f"document {order}",
+        url=f"https://example.com/{plan_id}/{order}",
+        description=None,
+        checkbox=order % 2 == 0,
+        display=displays[order % len(displays)],
+    )
+
+
+def make_consent_link(plan_id: int, order: int) -> Record:
+    return Record(
+        scheme_id=plan_id,
+        consent=Record(order=order, slug=f"consent_{order}", required=True, text=f"consent {order}"),
+        add_field=order == 0,
+        auth_field=order == 1,
+        enrol_field=order >= 2,
+        register_field=order == 3,
+    )
+
+
+def make_sorted_plan_information(plans: int = PLANS) -> dict:
+    """sorted_plan_information as made by LoyaltyPlansHandler._sort_info_by_plan for a channel with plans plans"""
+    # orders are shuffled so the rows need sorting
+    return {
+        plan_id: {
+            "plan": Record(id=plan_id),
+            "credentials": {make_credential(plan_id, order) for order in reversed(range(CREDENTIALS))},
+            "documents": {make_document(plan_id, order) for order in reversed(range(DOCUMENTS))},
+            "consents": {make_consent_link(plan_id, order) for order in reversed(range(CONSENTS))},
+        }
+        for plan_id in range(1, plans + 1)
+    }
+
+
+def plan_endpoint_journey_fields(plan_id: int, plan_info: dict) -> dict:
+    """Journey fields of the plan as LoyaltyPlanHandler.get_plan makes them for the single plan endpoint"""
+    return LoyaltyPlanHandler(
+        user_id=1,
+        channel_id="com.test.channel",
+        db_session=None,  # type: ignore [arg-type]
+        loyalty_plan_id=plan_id,
+        is_tester=False,
+    ).get_journey_fields(
+        plan=plan_info["plan"],
+        creds=LoyaltyPlansHandler._sort_by_attr(plan_info["credentials"]),
+        docs=LoyaltyPlansHandler._sort_by_attr(plan_info["documents"]),
+        consents=LoyaltyPlansHandler._sort_by_attr(plan_info["consents"], attr="consent.order"),
+    )
+
+
+def test_catalogue_journey_fields_match_plan_endpoint() -> None:
+    sorted_plan_information = make_sorted_plan_information(plans=20)
+
+    journey_fields_by_plan = LoyaltyPlansHandler._get_journey_fields_by_plan(sorted_plan_information)
+
+    assert journey_fields_by_plan == {
+        plan_id: plan_endpoint_journey_fields(plan_id, plan_info)
+        for plan_id, plan_info in sorted_plan_information.items()
+    }
+
+
+@pytest.mark.benchmark
+def test_journey_fields_benchmark(record_property: Callable[[str, object], None]) -> None:
+    sorted_plan_information = make_sorted_plan_information()
+    record_timing(
+        record_property,
+        f"catalogue_{PLANS}_plans",
+        lambda: LoyaltyPlansHandler._get_journey_fields_by_plan(sorted_plan_information),
+        runs=10,
+    )
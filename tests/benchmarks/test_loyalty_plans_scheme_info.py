@@ -0,0 +1,101 @@
+import typing
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+import pytest
+
+from angelia.handlers.loyalty_plan import LoyaltyPlansHandler
+from angelia.lib.images import ImageStatus, ImageTypes
+from tests.factories import (
+    DocumentFactory,
+    LoyaltyPlanFactory,
+    SchemeContentFactory,
+    SchemeDetailFactory,
+    SchemeImageFactory,
+)
+from tests.helpers.benchmark import record_timing
+from tests.helpers.query_count import count_queries
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+PLANS = 20
+DOCUMENTS = 6
+IMAGES = 10
+TIERS = 4
+CONTENTS = 5
+
+
+def seed_plans(db_session: "Session", plans: int = PLANS) -> tuple[set[int], set[tuple[int, int, int]]]:
+    """
+    Creates the plans and their related rows, returning the plan ids and the (plan id, row index, related id) of
+    each related row expected in the scheme info rows
+    """
+    scheme_ids = set()
+    expected = set()
+    for _ in range(plans):
+        plan = LoyaltyPlanFactory()
+        related: list[tuple[int, typing.Any]] = []
+        for order in range(DOCUMENTS):
+            related.append((1, DocumentFactory(scheme=plan, order=order)))
+        for _ in range(IMAGES):
+            image = SchemeImageFactory(
+                scheme=plan,
+                image_type_code=ImageTypes.OFFER,
+                status=ImageStatus.PUBLISHED,
+                start_date=datetime.now() - timedelta(days=1),
+                end_date=None,
+            )
+            related.append((2, image))
+        # images which aren't shown
+        SchemeImageFactory(scheme=plan, image_type_code=ImageTypes.OFFER, status=ImageStatus.DRAFT)
+        SchemeImageFactory(
+            scheme=plan,
+            image_type_code=ImageTypes.OFFER,
+            status=ImageStatus.PUBLISHED,
+            start_date=datetime.now() - timedelta(days=2),
+            end_date=datetime.now() - timedelta(days=1),
+        )
+        for _ in range(TIERS):
+            related.append((3, SchemeDetailFactory(scheme=plan)))
+        for _ in range(CONTENTS):
+            related.append((4, SchemeContentFactory(scheme=plan)))
+        db_session.flush()
+        scheme_ids.add(plan.id)
+        expected.update((plan.id, index, row.id) for index, row in related)
+
+    return scheme_ids, expected
+
+
+def fetch_scheme_info(db_session: "Session", scheme_ids: set[int]) -> list:
+    return LoyaltyPlansHandler._scheme_info_rows(
+        db_session.execute(query).all() for query in LoyaltyPlansHandler.select_scheme_info_queries(scheme_ids)
+    )
+
+
+def related_rows(scheme_info: list) -> set:
+    return {
+        (row[0], index, related.id) for row in scheme_info for index, related in enumerate(row) if index and related
+    }
+
+
+def test_scheme_info_rows_hold_each_related_row_once(db_session: "Session") -> None:
+    plans = 2
+    scheme_ids, expected = seed_plans(db_session, plans)
+
+    with count_queries() as statements:
+        rows = fetch_scheme_info(db_session, scheme_ids)
+
+    assert related_rows(rows) == expected
+    assert len(rows) == plans * (DOCUMENTS + IMAGES + TIERS + CONTENTS)
+    # documents, images, tiers and contents
+    assert len(statements) == 4
+
+
+@pytest.mark.benchmark
+def test_scheme_info_benchmark(db_session: "Session", record_property: Callable[[str, object], None]) -> None:
+    scheme_ids, _ = seed_plans(db_session)
+    record_timing(
+        record_property, f"scheme_info_{PLANS}_plans", lambda: fetch_scheme_info(db_session, scheme_ids), runs=5
+    )
+    record_property("scheme_info_rows", len(fetch_scheme_info(db_session, scheme_ids)))
@@ -0,0 +1,55 @@
+import typing
+from collections.abc import Callable
+
+import pytest
+from sqlalchemy import inspect
+
+from angelia.hermes.models import SchemeAccount
+from angelia.messaging.sender import HISTORY_DATETIME_FORMAT, get_history_extractor
+from tests.factories import LoyaltyCardFactory
+from tests.helpers.benchmark import record_timing
+from tests.helpers.query_count import count_queries
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+CARDS = 200
+
+
+def load_cards(db_session: "Session", count: int) -> list[SchemeAccount]:
+    new_cards = [LoyaltyCardFactory() for _ in range(count)]
+    db_session.commit()
+    card_ids = [card.id for card in new_cards]
+
+    db_session.expunge_all()
+    return db_session.query(SchemeAccount).filter(SchemeAccount.id.in_(card_ids)).all()
+
+
+def test_mapper_history_of_loaded_cards(db_session: "Session") -> None:
+    cards = load_cards(db_session, 3)
+    extractor = get_history_extractor(inspect(SchemeAccount))
+
+    with count_queries() as statements:
+        extracted = [extractor.extract(card) for card in cards]
+    assert not statements
+
+    for card, (payload, related) in zip(cards, extracted, strict=True):
+        assert payload["id"] == card.id
+        assert payload["card_number"] == card.card_number
+        assert payload["created"] == card.created.strftime(HISTORY_DATETIME_FORMAT)
+        # json columns aren't sent
+        assert "balances" not in payload
+        # the scheme isn't loaded, its id is taken from the foreign key
+        assert related == {"scheme": card.scheme_id}
+
+
+@pytest.mark.benchmark
+def test_mapper_history_benchmark(db_session: "Session", record_property: Callable[[str, object], None]) -> None:
+    cards = load_cards(db_session, CARDS)
+    extractor = get_history_extractor(inspect(SchemeAccount))
+
+    with count_queries() as statements:
+        record_timing(
+            record_property, f"extract_{CARDS}_cards", lambda: [extractor.extract(card) for card in cards], runs=10
+        )
+    record_property("extract_queries", len(statements))
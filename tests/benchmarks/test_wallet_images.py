@@ -0,0 +1,89 @@
+from collections.abc import Callable
+
+import pytest
+
+from angelia.handlers.helpers.images import process_images_query
+from angelia.handlers.wallet import get_image_list
+from angelia.lib.images import ImageTypes
+from tests.helpers.benchmark import record_timing
+
+CARDS = 50
+PLANS = 10
+TIERS = 3
+
+
+def image_row(image_id: int, image_type: ImageTypes, plan_id: int, account_id: int | None, reward_tier: int) -> dict:
+    return {
+        "id": image_id,
+        "type": image_type,
+        "url": f"schemes/image-{image_id}.png",
+        "cta_url": None,
+        "description": f"image {image_id}",
+        "encoding": None,
+        "reward_tier": reward_tier,
+        "plan_id": plan_id,
+        "account_id": account_id,
+        "table_type": "scheme",
+    }
+
+
+def make_wallet_image_rows() -> tuple[list[dict], list[tuple[int, int, int]]]:
+    """Plan hero, tier, banner and offer images for each plan plus account hero or tier images on some cards"""
+    rows = []
+    image_id = 1
+    for plan_id in range(1, PLANS + 1):
+        for image_type in (ImageTypes.HERO, ImageTypes.BANNER, ImageTypes.OFFER, ImageTypes.ICON):
+            rows.append(image_row(image_id, image_type, plan_id, None, 0))
+            image_id += 1
+        for tier in range(1, TIERS + 1):
+            rows.append(image_row(image_id, ImageTypes.TIER, plan_id, None, tier))
+            image_id += 1
+
+    cards = []
+    for card_id in range(1, CARDS + 1):
+        plan_id = card_id % PLANS + 1
+        cards.append((card_id, plan_id, card_id % (TIERS + 1)))
+        if card_id % 5 == 0:
+            rows.append(image_row(image_id, ImageTypes.HERO, plan_id, card_id, 0))
+            image_id += 1
+        elif card_id % 7 == 0:
+            rows.append(image_row(image_id, ImageTypes.TIER, plan_id, card_id, card_id % (TIERS + 1)))
+            image_id += 1
+
+    return rows, cards
+
+
+def wallet_image_lists(rows: list[dict], cards: list[tuple[int, int, int]]) -> list[list[dict]]:
+    images = process_images_query(rows)
+    return [get_image_list(images, "scheme", *card) for card in cards]
+
+
+def test_wallet_image_lists_do_not_share_index_images() -> None:
+    rows, cards = make_wallet_image_rows()
+    images = process_images_query(rows)
+    image_lists = [get_image_list(images, "scheme", *card) for card in cards]
+
+    # a plan tier image matching the card's tier is returned as its hero image
+    card_id, plan_id, tier = next(card for card in cards if card[2] and card[0] % 5 and card[0] % 7)
+    hero_images = [image for image in image_lists[card_id - 1] if image["type"] == ImageTypes.HERO]
+    assert [image["description"] for image in hero_images] == [
+        next(
+            row["description"]
+            for row in rows
+            if row["plan_id"] == plan_id and row["account_id"] is None and row["reward_tier"] == tier
+        )
+    ]
+
+    # responses are built from the lists so changing them mustn't change the index shared by the cards
+    for image_list in image_lists:
+        for image in image_list:
+            image["type"] = None
+            image.pop("url")
+    assert [get_image_list(images, "scheme", *card) for card in cards] == wallet_image_lists(rows, cards)
+    assert all(image["url"] for image_list in wallet_image_lists(rows, cards) for image in image_list)
+
+
+@pytest.mark.benchmark
+def test_wallet_images_benchmark(record_property: Callable[[str, object], None]) -> None:
+    rows, cards = make_wallet_image_rows()
+    record_timing(record_property, "index", lambda: wallet_image_lists(rows, cards), runs=50)
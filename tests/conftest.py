@@ -4,8 +4,12 @@ from unittest.mock import MagicMock, patch
 import pytest
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
+from angelia.api.auth import access_token_cache
+from angelia.api.helpers import vault
 from angelia.api.helpers.vault import AESKeyNames
 from angelia.api.serializers import WalletLoyaltyCardSerializer, WalletLoyaltyCardVoucherSerializer, WalletSerializer
+from angelia.handlers.helpers.images import plan_image_cache
+from angelia.handlers.helpers.plan_catalogue_cache import get_plan_catalogue_cache
 from angelia.handlers.loyalty_card import ADD, CredentialClass, LoyaltyCardHandler
 from angelia.handlers.loyalty_plan import LoyaltyPlanChannelStatus, LoyaltyPlanJourney
 from angelia.hermes.db import DB
@@ -21,6 +25,8 @@ from angelia.hermes.models import (
 )
 from angelia.lib.encryption import AESCipher
 from angelia.lib.loyalty_card import LoyaltyCardStatus
+from angelia.messaging import sender
+from angelia.settings import settings
 from tests.common import Session
 from tests.factories import (
     ChannelFactory,
@@ -38,6 +44,24 @@ from tests.factories import (
 )
 from tests.helpers.local_vault import set_vault_cache
 
+if typing.TYPE_CHECKING:
+    from pathlib import Path
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "benchmark: timing comparison, only run when selected with -m benchmark")
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    # benchmarks take too long for every run, they are run on their own with pytest -m benchmark
+    if "benchmark" in config.getoption("markexpr"):
+        return
+
+    deselected = [item for item in items if item.get_closest_marker("benchmark")]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if not item.get_closest_marker("benchmark")]
+
 
 @pytest.fixture(scope="session")
 def setup_db() -> typing.Generator[None, None, None]:
@@ -70,6 +94,43 @@ def db_session(setup_db: None) -> typing.Generator[None, None, Session]:
     connection.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_plan_image_cache() -> None:
+    # image ids are reused once each test's transaction is rolled back
+    plan_image_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_access_token_cache() -> None:
+    # tokens made within the same second for the same claims are identical but tests verify them with other secrets
+    access_token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_unknown_vault_secrets() -> None:
+    # tests look up secrets which earlier tests found missing, after setting them or mocking the vault
+    vault.unknown_secrets.clear()
+    vault.recent_reloads.clear()
+    vault._unknown_reloads_started = float("-inf")
+
+
+@pytest.fixture(autouse=True)
+def clear_plan_catalogue_cache() -> None:
+    # each test creates its own plans which may be on a previously used channel
+    get_plan_catalogue_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def hermes_spool(tmp_path: "Path") -> typing.Generator[None, None, None]:
+    # tests enabling the spool write to a directory per test, with the replayer stopped after it
+    with patch.object(settings, "SPOOL_DIR", str(tmp_path / "spool")):
+        yield
+
+    if sender._spool is not None:
+        sender._spool.stop()
+        sender._spool = None
+
+
 @pytest.fixture
 def loyalty_plan() -> dict:
     return {
@@ -11,6 +11,7 @@ from sqlalchemy import select
 from sqlalchemy.engine import Row
 
 from angelia.api.exceptions import ResourceNotFoundError
+from angelia.handlers.helpers.plan_catalogue_cache import invalidate_plan_catalogue_cache
 from angelia.handlers.loyalty_plan import (
     CredentialClass,
     CredentialField,
@@ -47,7 +48,9 @@ from tests.factories import (
     SchemeDetailFactory,
     SchemeImageFactory,
     ThirdPartyConsentLinkFactory,
+    UserFactory,
 )
+from tests.helpers.query_count import count_queries
 
 if typing.TYPE_CHECKING:
     from sqlalchemy.orm import Session
@@ -1791,3 +1794,57 @@ def test_get_all_plans_and_overview_ordering(
         assert len(res) == plan_count
         for i, plan in enumerate(res, start=1):
             assert plan["loyalty_plan_id"] == expected_order_dict[i]
+
+
+@patch.object(settings, "PLAN_CATALOGUE_CACHE_ENABLED", True)
+@pytest.mark.parametrize("method", ["get_all_plans", "get_all_plans_overview"])
+def test_get_all_plans_catalogue_is_cached_per_channel(
+    method: str,
+    db_session: "Session",
+    setup_loyalty_plans_handler: typing.Callable[..., tuple[LoyaltyPlansHandler, User, Channel, list[PlanInfo]]],
+) -> None:
+    plan_count = 3
+    loyalty_plans_handler, user, channel, all_plan_info = setup_loyalty_plans_handler(plan_count=plan_count)
+    setup_existing_loyalty_card(db_session, all_plan_info[0].plan, user)
+    other_user = UserFactory(client=channel.client_application)
+    db_session.flush()
+    other_user_handler = LoyaltyPlansHandlerFactory(
+        db_session=db_session, user_id=other_user.id, channel_id=channel.bundle_id, is_tester=False
+    )
+
+    with count_queries() as statements:
+        all_plans = getattr(loyalty_plans_handler, method)()
+    assert len(statements) > 1
+
+    with count_queries() as statements:
+        other_user_plans = getattr(other_user_handler, method)()
+    # only the other user's plans in wallet are queried
+    assert len(statements) == 1
+
+    assert [plan["loyalty_plan_id"] for plan in all_plans] == [plan["loyalty_plan_id"] for plan in other_user_plans]
+    assert {plan["loyalty_plan_id"] for plan in all_plans if plan["is_in_wallet"]} == {all_plan_info[0].plan.id}
+    assert not any(plan["is_in_wallet"] for plan in other_user_plans)
+
+    all_plan_info[1].plan.name = "Renamed plan"
+    db_session.flush()
+    invalidate_plan_catalogue_cache([channel.bundle_id])
+
+    with count_queries() as statements:
+        all_plans = getattr(loyalty_plans_handler, method)()
+    assert len(statements) > 1
+    assert "Renamed plan" in str(all_plans)
+
+
+@patch.object(settings, "PLAN_CATALOGUE_CACHE_ENABLED", True)
+def test_get_all_plans_catalogue_is_cached_per_tester_status(
+    db_session: "Session",
+    setup_loyalty_plans_handler: typing.Callable[..., tuple[LoyaltyPlansHandler, User, Channel, list[PlanInfo]]],
+) -> None:
+    loyalty_plans_handler, _, _, all_plan_info = setup_loyalty_plans_handler(plan_count=2)
+    all_plan_info[0].plan.channel_associations[0].test_scheme = True
+    db_session.flush()
+
+    assert len(loyalty_plans_handler.get_all_plans()) == 1
+
+    loyalty_plans_handler.is_tester = True
+    assert len(loyalty_plans_handler.get_all_plans()) == 2
@@ -0,0 +1,123 @@
+import typing
+from unittest.mock import MagicMock
+
+import pytest
+from pydantic import ValidationError
+from pytest_mock import MockerFixture
+
+from angelia.lib.cache import LRUCache
+from angelia.lib.wallet_cache import WalletResponseType, get_cached_wallet_response
+from angelia.settings import Settings, settings
+from tests.helpers.authenticated_request import get_authenticated_request
+from tests.helpers.database_set_up import setup_database
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def wallet_cache(mocker: MockerFixture) -> LRUCache:
+    cache = LRUCache(name="wallet", max_size=100)
+    mocker.patch("angelia.lib.wallet_cache._wallet_cache", cache)
+    mocker.patch.object(settings, "WALLET_CACHE_ENABLED", True)
+    return cache
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache = LRUCache(name="test", max_size=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3, ttl=60)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries(mocker: MockerFixture) -> None:
+    mock_time = mocker.patch("angelia.lib.cache.time.monotonic", return_value=100.0)
+    cache = LRUCache(name="test", max_size=2)
+    cache.set("a", 1, ttl=30)
+    assert cache.get("a") == 1
+
+    mock_time.return_value = 130.0
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cached_wallet_response_is_per_channel_and_type(wallet_cache: LRUCache) -> None:
+    build = MagicMock(return_value={"joins": []})
+
+    for _ in range(2):
+        get_cached_wallet_response(1, "com.bank1.test", WalletResponseType.FULL, build)
+        get_cached_wallet_response(1, "com.bank1.test", WalletResponseType.OVERVIEW, build)
+        get_cached_wallet_response(1, "com.bank2.test", WalletResponseType.FULL, build)
+
+    assert build.call_count == 3
+
+
+def test_wallet_cache_needs_shared_backend() -> None:
+    with pytest.raises(ValidationError):
+        Settings(WALLET_CACHE_ENABLED=True)
+
+    assert Settings(WALLET_CACHE_ENABLED=True, WALLET_CACHE_BACKEND="example.cache.RedisCache")
+
+
+def test_cached_wallet_response_disabled(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "WALLET_CACHE_ENABLED", False)
+    build = MagicMock(return_value={"joins": []})
+
+    get_cached_wallet_response(1, "com.bank1.test", WalletResponseType.FULL, build)
+    get_cached_wallet_response(1, "com.bank1.test", WalletResponseType.FULL, build)
+
+    assert build.call_count == 2
+
+
+def test_commit_of_watched_row_invalidates_users_wallet(db_session: "Session", wallet_cache: LRUCache) -> None:
+    _, users = setup_database(db_session)
+    user = users["bank1_0"]
+    other_user = users["bank1_1"]
+    build = MagicMock(return_value={"joins": []})
+
+    for user_id in (user.id, other_user.id):
+        get_cached_wallet_response(user_id, "com.bank1.test", WalletResponseType.FULL, build)
+
+    user.email = "changed@test.com"
+    db_session.commit()
+
+    for user_id in (user.id, other_user.id):
+        get_cached_wallet_response(user_id, "com.bank1.test", WalletResponseType.FULL, build)
+
+    assert build.call_count == 3
+
+
+def test_rolled_back_change_does_not_invalidate_wallet(db_session: "Session", wallet_cache: LRUCache) -> None:
+    _, users = setup_database(db_session)
+    user = users["bank1_0"]
+    build = MagicMock(return_value={"joins": []})
+    get_cached_wallet_response(user.id, "com.bank1.test", WalletResponseType.FULL, build)
+
+    user.email = "changed@test.com"
+    db_session.flush()
+    db_session.rollback()
+    get_cached_wallet_response(user.id, "com.bank1.test", WalletResponseType.FULL, build)
+
+    assert build.call_count == 1
+
+
+def test_wallet_endpoint_uses_cache(mocker: MockerFixture, wallet_cache: LRUCache) -> None:
+    mocked_resp = mocker.patch("angelia.handlers.wallet.WalletHandler.get_wallet_response")
+    mocked_resp.return_value = {"joins": [], "loyalty_cards": [], "payment_accounts": []}
+    mock_send_event = mocker.patch("angelia.handlers.wallet.WalletHandler.send_to_hermes_view_wallet_event")
+
+    for _ in range(2):
+        resp = get_authenticated_request(path="/v2/wallet", method="GET")
+        assert resp.status_code == 200
+        assert resp.json["loyalty_cards"] == []
+
+    assert mocked_resp.call_count == 1
+    assert mock_send_event.call_count == 2
@@ -1,11 +1,14 @@
+import json
 import typing
-from datetime import datetime, timedelta
+from datetime import UTC, datetime, timedelta
 from unittest.mock import patch
 from urllib.parse import urljoin
 
 import pytest
 
 from angelia.api.exceptions import ResourceNotFoundError
+from angelia.api.serializers import WalletOverViewSerializer, WalletSerializer
+from angelia.handlers.helpers.images import plan_image_cache
 from angelia.handlers.loyalty_plan import LoyaltyPlanChannelStatus
 from angelia.handlers.wallet import (
     WalletHandler,
@@ -35,6 +38,8 @@ from angelia.lib.payment_card import PaymentAccountStatus
 from angelia.settings import settings
 from tests.factories import (
     ChannelFactory,
+    LoyaltyCardFactory,
+    LoyaltyCardUserAssociationFactory,
     PaymentAccountFactory,
     PaymentAccountUserAssociationFactory,
     PaymentSchemeAccountAssociationFactory,
@@ -54,10 +59,19 @@ from tests.helpers.database_set_up import (
     setup_payment_card_images,
     setup_pll_links,
 )
+from tests.helpers.query_count import count_queries
 
 if typing.TYPE_CHECKING:
     from sqlalchemy.orm import Session
 
+
+@pytest.fixture(params=["orm", "json"])
+def wallet_query_engine(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Runs a test building wallet responses against both wallet query engines"""
+    monkeypatch.setattr(settings, "WALLET_QUERY_ENGINE", request.param)
+    return request.param
+
+
 test_transactions = [
     {
         "id": 239604,
@@ -425,6 +439,7 @@ def verify_voucher_earn_values(processed_vouchers: list, **kwargs: typing.Any) -
         assert processed_vouchers[0][index] == value
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_overview_with_scheme_error_override(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -452,6 +467,7 @@ def test_wallet_overview_with_scheme_error_override(db_session: "Session") -> No
             assert x["status"]["description"] == override["message"]
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -513,6 +529,7 @@ def test_wallet(db_session: "Session") -> None:
         assert resp_loyalty_card["reward_available"] is False
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_pll(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -575,6 +592,7 @@ def test_wallet_pll(db_session: "Session") -> None:
         assert resp_loyalty_card["total_payment_accounts"] == len(resp["payment_accounts"])
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_filters_inactive(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1272,6 +1290,7 @@ def test_make_display_negative_integer_value() -> None:
     assert make_display_string({"prefix": "", "value": -123, "suffix": "stamps"}) == "-123 stamps"
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_plan_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1346,6 +1365,7 @@ def test_wallet_plan_images(db_session: "Session") -> None:
             raise AssertionError()
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_account_tier_hero_override(db_session: "Session") -> None:
     balances = [
         {
@@ -1394,6 +1414,7 @@ def test_wallet_account_tier_hero_override(db_session: "Session") -> None:
     assert loyalty_card["images"][0]["type"] == ImageTypes.HERO
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_account_override_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1493,6 +1514,7 @@ def test_wallet_account_override_images(db_session: "Session") -> None:
             raise AssertionError()
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_same_multiple_plan_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1549,6 +1571,7 @@ def test_wallet_same_multiple_plan_images(db_session: "Session") -> None:
         assert resp_pay_account["images"]
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_same_multiple_plan_matching_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1602,6 +1625,7 @@ def test_wallet_same_multiple_plan_matching_images(db_session: "Session") -> Non
         assert len(loyalty_card["images"]) == 2
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_same_multiple_plan_matching_tier_images(db_session: "Session") -> None:
     balances = [
         {
@@ -1676,6 +1700,7 @@ def test_wallet_same_multiple_plan_matching_tier_images(db_session: "Session") -
         assert len(loyalty_card["images"]) == 2
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_account_no_override_not_started_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1775,6 +1800,7 @@ def test_wallet_account_no_override_not_started_images(db_session: "Session") ->
             raise AssertionError()
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_account_no_override_ended_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1874,6 +1900,7 @@ def test_wallet_account_no_override_ended_images(db_session: "Session") -> None:
             raise AssertionError()
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_account_no_override_draft_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -1973,6 +2000,7 @@ def test_wallet_account_no_override_draft_images(db_session: "Session") -> None:
             raise AssertionError()
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_plan_not_started_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -2018,6 +2046,7 @@ def test_wallet_plan_not_started_images(db_session: "Session") -> None:
         assert resp_loyalty_card["images"] == []
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_plan_ended_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -2064,6 +2093,7 @@ def test_wallet_plan_ended_images(db_session: "Session") -> None:
         assert resp_loyalty_card["images"] == []
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 def test_wallet_plan_draft_images(db_session: "Session") -> None:
     channels, users = setup_database(db_session)
     loyalty_plans = set_up_loyalty_plans(db_session, channels)
@@ -2550,6 +2580,7 @@ def test_get_loyalty_cards_channel_links_multi_pcard_same_wallet(
             assert channel_2_resp not in card["channels"]
 
 
+@pytest.mark.usefixtures("wallet_query_engine")
 @pytest.mark.parametrize("test_balance,expected_balance", zip(test_balances, expected_balances))
 def test_get_wallet_filters_unauthorised(
     db_session: "Session", test_balance: list[dict], expected_balance: dict
@@ -2589,6 +2620,63 @@ def test_get_wallet_filters_unauthorised(
             assert "vouchers" not in card
 
 
+def test_wallet_query_count_does_not_grow_with_loyalty_cards(db_session: "Session", wallet_query_engine: str) -> None:
+    channels, users = setup_database(db_session)
+    loyalty_plans = set_up_loyalty_plans(db_session, channels)
+    test_user_name = "bank2_2"
+    setup_loyalty_cards(
+        db_session,
+        users,
+        loyalty_plans,
+        transactions=test_transactions,
+        vouchers=test_vouchers,
+        balances=test_balances[0],
+        for_user=test_user_name,
+    )
+    user = users[test_user_name]
+    channel = channels["com.bank2.test"]
+
+    for _ in range(5):
+        loyalty_card = LoyaltyCardFactory(
+            scheme=loyalty_plans["merchant_1"],
+            balances=test_balances[0],
+            vouchers=test_vouchers,
+            transactions=test_transactions,
+        )
+        db_session.flush()
+        LoyaltyCardUserAssociationFactory(
+            scheme_account_id=loyalty_card.id,
+            user_id=user.id,
+            link_status=LoyaltyCardStatus.ACTIVE,
+        )
+        db_session.flush()
+    db_session.commit()
+
+    handler = WalletHandler(db_session, user_id=user.id, channel_id=channel.bundle_id)
+
+    # pll links, payment accounts, loyalty cards and images - regardless of wallet size. The json engine fetches all 4
+    # in one statement.
+    handler.get_wallet_response()
+    wallet_query_count = 1 if wallet_query_engine == "json" else 4
+    with count_queries() as statements:
+        resp = handler.get_wallet_response()
+    assert len(statements) == wallet_query_count
+
+    authorised_cards = [card for card in resp["loyalty_cards"] if card["status"]["state"] == StatusName.AUTHORISED]
+    assert len(authorised_cards) == 6
+    for card in authorised_cards:
+        assert card["balance"] == expected_balances[0]["balance"]
+
+    with count_queries() as statements:
+        handler.get_overview_wallet_response()
+    assert len(statements) == wallet_query_count
+
+    with count_queries() as statements:
+        resp = handler.get_loyalty_card_balance_response(authorised_cards[0]["id"])
+    assert len(statements) == 1
+    assert resp == expected_balances[0]
+
+
 def test_voucher_fields() -> None:
     expected_fields = [
         "state",
@@ -2630,3 +2718,138 @@ def test_send_to_hermes_view_wallet_event_event(mock_hermes_msg: "MagicMock", db
     handler = WalletHandler(db_session, user_id=user.id, channel_id=channel.bundle_id)
     handler.send_to_hermes_view_wallet_event()
     assert mock_hermes_msg.call_args[0] == ("view_wallet_event", {"user_id": user.id, "channel_slug": "com.bank2.test"})
+
+
+def test_wallet_version_token_changes_with_wallet(db_session: "Session") -> None:
+    channels, users = setup_database(db_session)
+    loyalty_plans = set_up_loyalty_plans(db_session, channels)
+    loyalty_cards = setup_loyalty_cards(db_session, users, loyalty_plans)
+    user = users["bank1_0"]
+    handler = WalletHandler(db_session, user_id=user.id, channel_id="com.bank1.test")
+    other_handler = WalletHandler(db_session, user_id=users["bank1_1"].id, channel_id="com.bank1.test")
+
+    version_token = handler.get_wallet_version_token()
+    other_version_token = other_handler.get_wallet_version_token()
+    assert version_token == handler.get_wallet_version_token()
+
+    loyalty_card = loyalty_cards["bank1_0"]["merchant_1"]
+    loyalty_card.updated = datetime.now(tz=UTC)
+    db_session.commit()
+    new_version_token = handler.get_wallet_version_token()
+    assert new_version_token != version_token
+
+    association = (
+        db_session.query(SchemeAccountUserAssociation)
+        .filter(
+            SchemeAccountUserAssociation.user_id == user.id,
+            SchemeAccountUserAssociation.scheme_account_id == loyalty_card.id,
+        )
+        .one()
+    )
+    db_session.delete(association)
+    db_session.commit()
+    assert handler.get_wallet_version_token() != new_version_token
+    assert other_handler.get_wallet_version_token() == other_version_token
+
+
+@pytest.mark.parametrize("full", [True, False])
+def test_wallet_query_engines_give_identical_responses(
+    db_session: "Session", full: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    channels, users = setup_database(db_session)
+    loyalty_plans = set_up_loyalty_plans(db_session, channels)
+    payment_cards = set_up_payment_cards(db_session)
+    test_user_name = "bank2_2"
+    loyalty_cards = setup_loyalty_cards(
+        db_session,
+        users,
+        loyalty_plans,
+        transactions=test_transactions,
+        vouchers=test_vouchers,
+        balances=test_balances[0],
+        for_user=test_user_name,
+    )
+    payment_accounts = setup_payment_accounts(db_session, users, payment_cards)
+    setup_pll_links(db_session, payment_accounts, loyalty_cards, users)
+    image_dates = {
+        "status": ImageStatus.PUBLISHED,
+        "start_date": datetime.today() - timedelta(minutes=10),
+        "end_date": datetime.today() + timedelta(minutes=10),
+    }
+    setup_loyalty_card_images(db_session, loyalty_plans, image_type=ImageTypes.HERO, **image_dates)
+    setup_loyalty_account_images(db_session, loyalty_cards, image_type=ImageTypes.TIER, **image_dates)
+    setup_payment_card_images(db_session, payment_cards, image_type=ImageTypes.HERO, **image_dates)
+    setup_payment_card_account_images(db_session, payment_accounts, image_type=ImageTypes.ICON, **image_dates)
+    setup_loyalty_scheme_override(
+        db_session,
+        loyalty_plan_id=loyalty_plans["merchant_2"].id,
+        channel_id=channels["com.bank2.test"].id,
+        error_code=LoyaltyCardStatus.WALLET_ONLY,
+    )
+
+    responses = {}
+    for engine in ("orm", "json"):
+        monkeypatch.setattr(settings, "WALLET_QUERY_ENGINE", engine)
+        handler = WalletHandler(db_session, user_id=users[test_user_name].id, channel_id="com.bank2.test")
+        responses[engine] = handler.get_wallet_response() if full else handler.get_overview_wallet_response()
+
+    serializer = WalletSerializer if full else WalletOverViewSerializer
+    assert responses["json"]["loyalty_cards"]
+    assert responses["json"]["payment_accounts"]
+    assert json.dumps(serializer(**responses["json"]).dict()) == json.dumps(serializer(**responses["orm"]).dict())
+
+
+# the json engine fetches plan images in its single statement
+@patch.object(settings, "WALLET_QUERY_ENGINE", "orm")
+@patch.object(settings, "PLAN_IMAGE_CACHE_ENABLED", True)
+def test_wallet_plan_images_are_cached(db_session: "Session") -> None:
+    channels, users = setup_database(db_session)
+    loyalty_plans = set_up_loyalty_plans(db_session, channels)
+    payment_cards = set_up_payment_cards(db_session)
+    setup_loyalty_cards(db_session, users, loyalty_plans)
+    setup_payment_accounts(db_session, users, payment_cards)
+    now = datetime.now()
+    current_images = setup_loyalty_card_images(
+        db_session,
+        loyalty_plans,
+        image_type=ImageTypes.HERO,
+        status=ImageStatus.PUBLISHED,
+        start_date=now - timedelta(minutes=10),
+        end_date=now + timedelta(minutes=30),
+    )
+    setup_loyalty_card_images(
+        db_session,
+        loyalty_plans,
+        image_type=ImageTypes.BANNER,
+        status=ImageStatus.PUBLISHED,
+        start_date=now + timedelta(minutes=5),
+        end_date=now + timedelta(minutes=60),
+    )
+    setup_payment_card_images(
+        db_session,
+        payment_cards,
+        image_type=ImageTypes.HERO,
+        status=ImageStatus.PUBLISHED,
+        start_date=now - timedelta(minutes=10),
+        end_date=now + timedelta(days=1),
+    )
+    handler = WalletHandler(db_session, user_id=users["bank2_2"].id, channel_id="com.bank2.test")
+
+    with patch.object(plan_image_cache, "set", wraps=plan_image_cache.set) as mock_cache_set:
+        with count_queries() as statements:
+            resp = handler.get_wallet_response()
+        assert len(statements) == 5
+
+    # scheme plans expire when the banner starts, payment plans after the cache ttl
+    ttls = {call.args[0].split(":")[1]: call.args[2] for call in mock_cache_set.call_args_list}
+    assert 4 * 60 < ttls["scheme"] <= 5 * 60
+    assert ttls["payment"] == pytest.approx(settings.PLAN_IMAGE_CACHE_TTL, abs=5)
+
+    with count_queries() as statements:
+        cached_resp = handler.get_wallet_response()
+    assert len(statements) == 4
+    assert cached_resp == resp
+
+    loyalty_card_images = {image["id"] for card in resp["loyalty_cards"] for image in card["images"]}
+    assert loyalty_card_images == {image.id for image in current_images.values()}
+    assert all(card["images"] for card in resp["payment_accounts"])
@@ -21,6 +21,7 @@ def get_authenticated_request(
     channel: str = "com.test.channel",
     is_tester: bool = False,
     is_trusted_channel: bool = False,
+    headers: dict | None = None,
 ) -> Response:
     test_secret_key = "test_key-1"
     auth_dict = {test_secret_key: "test_mock_secret_1"}
@@ -30,6 +31,6 @@ def get_authenticated_request(
         auth_token = create_access_token(test_secret_key, auth_dict, user_id, channel, is_tester, is_trusted_channel)
 
         resp = get_client().simulate_request(
-            path=path, json=json, body=body, headers={"Authorization": auth_token}, method=method
+            path=path, json=json, body=body, headers={"Authorization": auth_token, **(headers or {})}, method=method
         )
         return resp
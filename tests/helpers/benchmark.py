@@ -0,0 +1,53 @@
+import timeit
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import patch
+
+from angelia.settings import settings
+
+RecordProperty = Callable[[str, object], None]
+
+
+def best_time(
+    func: Callable[[], object], runs: int, repeat: int = 3, setup: Callable[[], object] | None = None
+) -> float:
+    """
+    Seconds per call of func from the fastest of repeat batches of runs calls. setup is called before each batch
+    and isn't timed, so with runs=1 it prepares every timed call.
+    """
+    return min(timeit.repeat(func, setup=setup or (lambda: None), number=runs, repeat=repeat)) / runs
+
+
+def record_timing(
+    record_property: RecordProperty,
+    name: str,
+    func: Callable[[], object],
+    runs: int,
+    repeat: int = 3,
+    setup: Callable[[], object] | None = None,
+) -> float:
+    """Times func with best_time, recording the milliseconds per call as the name_ms property of the test"""
+    seconds = best_time(func, runs, repeat, setup)
+    record_property(f"{name}_ms", round(seconds * 1000, 3))
+    return seconds
+
+
+def record_setting_timings(
+    record_property: RecordProperty,
+    setting: str,
+    values: dict[str, Any],
+    func: Callable[[], object],
+    runs: int,
+    repeat: int = 3,
+    setup: Callable[[], object] | None = None,
+) -> dict[str, float]:
+    """
+    Times func through the application code with the setting patched to each of values in turn, recording the
+    milliseconds per call under the name each value is given
+    """
+    timings = {}
+    for name, value in values.items():
+        with patch.object(settings, setting, value):
+            timings[name] = record_timing(record_property, name, func, runs, repeat, setup)
+
+    return timings
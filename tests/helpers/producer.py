@@ -0,0 +1,25 @@
+import threading
+import time
+
+
+class RecordingProducer:
+    """
+    Stands in for the Hermes queue producer, recording what is sent and the most sends seen in flight at once so
+    that tests can check publishes from different threads aren't interleaved on the shared connection.
+    """
+
+    def __init__(self, delay: float = 0.001) -> None:
+        self.delay = delay
+        self.sent: list[dict] = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def send_message(self, **msg_data: dict) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self._in_flight -= 1
+            self.sent.append(msg_data)
@@ -0,0 +1,36 @@
+import typing
+from collections.abc import Generator
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from angelia.hermes.db import DB
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy.engine import Connection
+    from sqlalchemy.engine import cursor as sqla_cursor
+
+
+@contextmanager
+def count_queries() -> Generator[list[str], None, None]:
+    """
+    Records every statement sent to the database while the context is open so that tests can assert on the
+    number of round trips an operation makes, e.g. to stop an N+1 query from creeping back in.
+    """
+    statements: list[str] = []
+
+    def before_cursor_execute(
+        conn: "Connection",
+        cursor: "sqla_cursor",
+        statement: str,
+        parameters: list,
+        context: dict,
+        executemany: bool,
+    ) -> None:
+        statements.append(statement)
+
+    event.listen(DB().engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(DB().engine, "before_cursor_execute", before_cursor_execute)
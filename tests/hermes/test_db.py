@@ -0,0 +1,121 @@
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import falcon
+from falcon import testing
+from prometheus_client import REGISTRY
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine
+
+from angelia.api.middleware import DatabaseSessionManager
+from angelia.hermes.db import DB, instrumented_pool_class
+from angelia.lib.singletons import Singleton
+from angelia.messaging.sender import send_message_to_hermes
+from angelia.settings import settings
+from tests.helpers.producer import RecordingProducer
+
+if typing.TYPE_CHECKING:
+    from pathlib import Path
+
+
+def pool_metric(name: str) -> float | None:
+    return REGISTRY.get_sample_value(name, {"database": "pool_test"})
+
+
+def test_pool_metrics(tmp_path: "Path") -> None:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class("pool_test"),
+        pool_size=1,
+        max_overflow=1,
+    )
+    DB._init_pool_metrics(engine, "pool_test")
+
+    first = engine.connect()
+    second = engine.connect()
+    assert pool_metric("db_pool_checked_out") == 2
+    assert pool_metric("db_pool_connections") == 2
+    assert pool_metric("db_pool_overflow") == 1
+    assert pool_metric("db_pool_checkout_wait_seconds_count") == 2
+    assert pool_metric("db_pool_connection_age_seconds_count") == 2
+
+    second.close()
+    assert pool_metric("db_pool_checked_out") == 1
+    assert pool_metric("db_pool_connections") == 2
+
+    first.invalidate()
+    first.close()
+    assert pool_metric("db_pool_checked_out") == 0
+    assert pool_metric("db_pool_connections") == 1
+    assert pool_metric("db_pool_invalidated_total") == 1
+    engine.dispose()
+
+
+class SessionEcho:
+    """
+    Reports the session and pending changes seen through DB() while other threads handle requests, then publishes
+    to Hermes as the history dispatched after a commit is
+    """
+
+    def on_post(self, req: falcon.Request, resp: falcon.Response) -> None:
+        n = req.media["n"]
+        session = DB().session
+        DB().history_sessions.append(n)
+        DB().wallet_changes.add(n)
+        # lets the other threads run between recording the changes and reading them back
+        time.sleep(0.001)
+        resp.media = {
+            "same_session": DB().session is session,
+            "history_sessions": list(DB().history_sessions),
+            "wallet_changes": list(DB().wallet_changes),
+        }
+        DB().history_sessions.clear()
+        DB().wallet_changes.clear()
+        send_message_to_hermes("mapped_history", {"n": n})
+
+
+def test_sessions_and_history_not_shared_between_threads(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "PUBLISH_ASYNC", False)
+    producer = RecordingProducer(delay=0.0001)
+    mocker.patch("angelia.messaging.sender.sending_service").queues = {"HERMES": producer}
+    sessions: list[MagicMock] = []
+    mocker.patch.object(DB(), "Session", side_effect=lambda: sessions.append(MagicMock()) or sessions[-1])
+    app = falcon.App(middleware=[DatabaseSessionManager()])
+    app.add_route("/echo", SessionEcho())
+    client = testing.TestClient(app)
+    requests = 500
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        responses = list(executor.map(lambda n: client.simulate_post("/echo", json={"n": n}), range(requests)))
+
+    for n, resp in enumerate(responses):
+        assert resp.json == {"same_session": True, "history_sessions": [n], "wallet_changes": [n]}
+    assert len(sessions) == requests
+    assert all(session.close.call_count == 1 for session in sessions)
+    # the producer's connection is shared by the request threads so their publishes mustn't overlap
+    assert sorted(message["payload"]["n"] for message in producer.sent) == list(range(requests))
+    assert producer.max_in_flight == 1
+
+
+def test_singleton_created_once_by_concurrent_threads() -> None:
+    created = []
+
+    class Slow(metaclass=Singleton):
+        def __init__(self) -> None:
+            time.sleep(0.01)
+            created.append(self)
+
+    start = threading.Barrier(8)
+
+    def get_instance() -> Slow:
+        start.wait()
+        return Slow()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        instances = list(executor.map(lambda _: get_instance(), range(8)))
+
+    assert len(created) == 1
+    assert all(instance is created[0] for instance in instances)
@@ -0,0 +1,51 @@
+import re
+
+from falcon import HTTP_200
+from prometheus_client import REGISTRY
+from pytest_mock import MockerFixture
+
+from angelia.hermes.query_accounting import RequestQueries, fingerprint
+from angelia.settings import settings
+from tests.helpers.authenticated_request import get_authenticated_request
+
+
+def test_fingerprint_ignores_parameters() -> None:
+    statement = "SELECT scheme.id FROM scheme\n WHERE scheme.id IN (%(id_1_1)s, %(id_1_2)s) AND scheme.name = 'a''b'"
+    other = "SELECT scheme.id FROM scheme WHERE scheme.id IN (%(id_1_1)s) AND scheme.name = 'c'"
+
+    assert fingerprint(statement) == fingerprint(other)
+    assert fingerprint(statement) == "SELECT scheme.id FROM scheme WHERE scheme.id IN (?) AND scheme.name = ?"
+
+
+def test_request_queries_recorded_for_thread() -> None:
+    assert RequestQueries.current() is None
+    queries = RequestQueries.start()
+    for n in range(3):
+        queries.record(f"SELECT * FROM card WHERE id = {n}", 0.001)
+    queries.record("SELECT * FROM scheme", 0.01)
+
+    assert RequestQueries.finish() is queries
+    assert RequestQueries.current() is None
+    assert queries.count == 4
+    assert queries.slowest_statement == "SELECT * FROM scheme"
+    assert queries.most_common() == [("SELECT * FROM card WHERE id = ?", 3), ("SELECT * FROM scheme", 1)]
+
+
+def test_request_over_query_budget(mocker: MockerFixture) -> None:
+    route = f"{settings.URL_PREFIX}/loyalty_plans"
+    labels = {"route": route, "method": "GET"}
+    mocker.patch.object(settings, "QUERY_BUDGETS", {route: 1})
+    mocker.patch.object(settings, "SERVER_TIMING", True)
+    exceeded_before = REGISTRY.get_sample_value("db_query_budget_exceeded_total", labels) or 0
+    requests_before = REGISTRY.get_sample_value("db_request_queries_count", labels) or 0
+
+    resp = get_authenticated_request(path=route, method="GET")
+
+    assert resp.status == HTTP_200
+    server_timing = re.fullmatch(
+        r'db;dur=[\d.]+;desc="(\d+) queries", db-slowest;dur=[\d.]+', resp.headers["Server-Timing"]
+    )
+    assert server_timing
+    assert int(server_timing.group(1)) > 1
+    assert REGISTRY.get_sample_value("db_query_budget_exceeded_total", labels) == exceeded_before + 1
+    assert REGISTRY.get_sample_value("db_request_queries_count", labels) == requests_before + 1
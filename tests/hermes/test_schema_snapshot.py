@@ -0,0 +1,66 @@
+import pickle
+import typing
+
+import pytest
+from sqlalchemy import MetaData, Table, create_engine, text
+
+from angelia.hermes.schema_snapshot import SnapshotError, dump_snapshot, load_snapshot, schema_differences
+
+if typing.TYPE_CHECKING:
+    from pathlib import Path
+
+    from sqlalchemy.engine import Engine
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path: "Path") -> "Engine":
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE scheme (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL)"))
+        connection.execute(
+            text("CREATE TABLE card (id INTEGER PRIMARY KEY, scheme_id INTEGER REFERENCES scheme (id), balance FLOAT)")
+        )
+    return engine
+
+
+def test_snapshot_loads_reflected_tables(sqlite_engine: "Engine", tmp_path: "Path") -> None:
+    reflected = MetaData(bind=sqlite_engine)
+    Table("card", reflected, autoload=True)
+    snapshot_path = str(tmp_path / "snapshot.pickle")
+    dump_snapshot(reflected, snapshot_path)
+
+    metadata = load_snapshot(snapshot_path, sqlite_engine)
+
+    # the referenced table is reflected with the one named
+    assert set(metadata.tables) == {"card", "scheme"}
+    assert metadata.bind is sqlite_engine
+    assert Table("card", metadata, autoload=True) is metadata.tables["card"]
+    assert [column.name for column in metadata.tables["card"].columns] == ["id", "scheme_id", "balance"]
+    assert not schema_differences(metadata, sqlite_engine)
+
+
+def test_snapshot_differences_found(sqlite_engine: "Engine", tmp_path: "Path") -> None:
+    reflected = MetaData(bind=sqlite_engine)
+    Table("card", reflected, autoload=True)
+    snapshot_path = str(tmp_path / "snapshot.pickle")
+    dump_snapshot(reflected, snapshot_path)
+
+    with sqlite_engine.begin() as connection:
+        connection.execute(text("ALTER TABLE card ADD COLUMN status INTEGER"))
+        connection.execute(text("DROP TABLE scheme"))
+
+    assert schema_differences(load_snapshot(snapshot_path, sqlite_engine), sqlite_engine) == [
+        "scheme: table not found",
+        "card.status: column not in snapshot",
+    ]
+
+
+def test_snapshot_of_other_version_not_loaded(sqlite_engine: "Engine", tmp_path: "Path") -> None:
+    snapshot_path = tmp_path / "snapshot.pickle"
+    snapshot_path.write_bytes(pickle.dumps({"version": 0, "metadata": MetaData()}))
+
+    with pytest.raises(SnapshotError):
+        load_snapshot(str(snapshot_path), sqlite_engine)
+
+    with pytest.raises(SnapshotError):
+        load_snapshot(str(tmp_path / "missing.pickle"), sqlite_engine)
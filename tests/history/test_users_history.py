@@ -1,8 +1,13 @@
 import typing
 
 import kombu.exceptions
+from sqlalchemy import inspect
 
 from angelia.api.shared_data import SharedData
+from angelia.hermes.models import SchemeAccount, User
+from angelia.hermes.utils import HISTORY_BATCH_VERSION, EventType
+from angelia.messaging.sender import mapper_history
+from angelia.settings import settings
 from tests.factories import ChannelFactory, LoyaltyCardFactory, UserFactory
 
 if typing.TYPE_CHECKING:
@@ -16,6 +21,7 @@ from tests.authentication.helpers.keys import private_key_rsa, public_key_rsa
 from tests.authentication.helpers.token_helpers import create_b2b_token
 from tests.helpers.authenticated_request import get_authenticated_request, get_client
 from tests.helpers.database_set_up import setup_database
+from tests.helpers.query_count import count_queries
 
 
 def test_user_add(db_session: "Session") -> None:
@@ -135,6 +141,71 @@ def test_history_sessions_send_hermes_messages(mock_send_hermes_msg: MagicMock,
         assert args.args[1]["event"] == event
 
 
+@patch("angelia.hermes.db.send_message_to_hermes")
+def test_history_sessions_batched_per_transaction(mock_send_hermes_msg: MagicMock, db_session: "Session") -> None:
+    request = MagicMock()
+    request.context.auth_instance.auth_data = {"sub": 1, "channel": "com.bink.whatever"}
+    SharedData(request, MagicMock(), MagicMock(), MagicMock())
+    user = UserFactory()
+
+    with patch.object(settings, "HISTORY_BATCH_ENABLED", True):
+        db_session.add(user)
+        db_session.commit()
+
+        # Update and Create in single transaction
+        loyalty_card = LoyaltyCardFactory()
+        user.email = "updated@email.com"
+        db_session.add(loyalty_card)
+        db_session.commit()
+
+    assert mock_send_hermes_msg.call_count == 2
+    for events, args in zip((["create"], ["update", "create"]), mock_send_hermes_msg.call_args_list, strict=True):
+        assert args.args[0] == "mapped_history_batch"
+        assert args.args[1]["version"] == HISTORY_BATCH_VERSION
+        assert [event["event"] for event in args.args[1]["events"]] == events
+        assert all("event_name" not in event for event in args.args[1]["events"])
+
+
+def test_mapper_history_reads_loaded_values_without_queries(db_session: "Session") -> None:
+    request = MagicMock()
+    request.context.auth_instance.auth_data = {"sub": 1, "channel": "com.bink.whatever"}
+    SharedData(request, MagicMock(), MagicMock(), MagicMock())
+    loyalty_card = LoyaltyCardFactory()
+    db_session.commit()
+    db_session.expunge_all()
+    loyalty_card = db_session.get(SchemeAccount, loyalty_card.id)
+
+    with count_queries() as statements:
+        history_data = mapper_history(loyalty_card, EventType.UPDATE, inspect(SchemeAccount))
+
+    assert not statements
+    assert history_data is not None
+    assert history_data.table == "scheme_schemeaccount"
+    assert history_data.payload["id"] == loyalty_card.id
+    assert history_data.payload["created"] == loyalty_card.created.strftime("%Y-%m-%dT%H:%M:%S.%f%z")
+    # the scheme isn't loaded, its id is read from the foreign key
+    assert history_data.related == {"scheme": loyalty_card.scheme_id}
+
+
+def test_mapper_history_sends_unset_columns_on_create(db_session: "Session") -> None:
+    request = MagicMock()
+    request.context.auth_instance.auth_data = {"sub": 1, "channel": "com.bink.whatever"}
+    SharedData(request, MagicMock(), MagicMock(), MagicMock())
+    user = UserFactory()
+    db_session.flush()
+    assert "last_login" not in user.__dict__
+
+    with count_queries() as statements:
+        history_data = mapper_history(user, EventType.CREATE, inspect(User))
+
+    assert not statements
+    assert history_data is not None
+    assert history_data.payload["id"] == user.id
+    assert history_data.payload["email"] == user.email
+    # never set on insert so null in the database, as reading it would return
+    assert history_data.payload["last_login"] is None
+
+
 @patch("angelia.hermes.db.send_message_to_hermes")
 def test_history_sessions_retries_on_failure(mock_send_hermes_msg: MagicMock, db_session: "Session") -> None:
     request = MagicMock()
@@ -158,21 +229,24 @@ def test_history_sessions_retries_on_failure(mock_send_hermes_msg: MagicMock, db
         assert args.args[1]["event"] == event
 
 
+@patch.object(settings, "SPOOL_ENABLED", True)
+@patch("angelia.hermes.db.spool_message_to_hermes")
 @patch("angelia.hermes.db.send_message_to_hermes")
-def test_history_sessions_re_queue_after_failed_retries(mock_send_hermes_msg: MagicMock, db_session: "Session") -> None:
+def test_history_sessions_spooled_after_failed_retries(
+    mock_send_hermes_msg: MagicMock, mock_spool_hermes_msg: MagicMock, db_session: "Session"
+) -> None:
     request = MagicMock()
     request.context.auth_instance.auth_data = {"sub": 1, "channel": "com.bink.whatever"}
     SharedData(request, MagicMock(), MagicMock(), MagicMock())
     user = UserFactory()
     loyalty_card = LoyaltyCardFactory()
 
-    # Default retry count is 3 so this should re-queue after the 3rd failure
+    # Default retry count is 3 so this should be spooled after the 3rd failure
     mock_send_hermes_msg.side_effect = [
         kombu.exceptions.ConnectionError("Can't connect to queue"),  # AMQP error
         kombu.exceptions.OperationalError("Something has gone horribly wrong"),  # Kombu error
         kombu.exceptions.OperationalError("Something has gone horribly wrong again"),  # Kombu error
-        None,  # Success user 2
-        None,  # Success user 1
+        None,  # Success user
     ]
 
     # Create User
@@ -180,15 +254,20 @@ def test_history_sessions_re_queue_after_failed_retries(mock_send_hermes_msg: Ma
     db_session.add(loyalty_card)
     db_session.commit()
 
-    assert mock_send_hermes_msg.call_count == 5
+    assert mock_send_hermes_msg.call_count == 4
 
     # The messages should generally be in order of each operation but this can change if they're in a
     # single transaction based on how sqlalchemy handles inserts
     # e.g in this case scheme accounts are always inserted before users
     for table, args in zip(
-        ("scheme_schemeaccount", "scheme_schemeaccount", "scheme_schemeaccount", "user", "scheme_schemeaccount"),
+        ("scheme_schemeaccount", "scheme_schemeaccount", "scheme_schemeaccount", "user"),
         mock_send_hermes_msg.call_args_list,
         strict=True,
     ):
         assert args.args[0] == "mapped_history"
         assert args.args[1]["table"] == table
+
+    # the scheme account history which failed to send is spooled rather than retried within the request
+    mock_spool_hermes_msg.assert_called_once()
+    assert mock_spool_hermes_msg.call_args.args[0] == "mapped_history"
+    assert mock_spool_hermes_msg.call_args.args[1]["table"] == "scheme_schemeaccount"
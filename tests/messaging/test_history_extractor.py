@@ -0,0 +1,66 @@
+from collections.abc import Generator
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, create_engine, event, inspect
+from sqlalchemy.orm import Session, declarative_base, relationship
+
+from angelia.messaging.sender import MapperHistoryExtractor
+
+Base = declarative_base()
+
+
+class Plan(Base):
+    __tablename__ = "plan"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+
+class Card(Base):
+    __tablename__ = "card"
+    id = Column(Integer, primary_key=True)
+    number = Column(String, nullable=False)
+    barcode = Column(String, nullable=True)
+    updated = Column(DateTime, nullable=True)
+    plan_id = Column(Integer, ForeignKey("plan.id"), nullable=True)
+    plan = relationship(Plan)
+
+
+@pytest.fixture
+def session() -> Generator[tuple[Session, list[str]], None, None]:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with Session(engine) as session:
+        yield session, statements
+
+
+def test_unset_values_sent_as_none_on_create(session: tuple[Session, list[str]]) -> None:
+    db_session, statements = session
+    card = Card(number="123")
+    db_session.add(card)
+    db_session.flush()
+    statements.clear()
+
+    payload, related = MapperHistoryExtractor(inspect(Card)).extract(card)
+
+    assert not statements
+    assert payload == {"id": card.id, "number": "123", "barcode": None, "updated": None, "plan_id": None}
+    assert related == {"plan": None}
+
+
+def test_expired_values_left_out(session: tuple[Session, list[str]]) -> None:
+    db_session, statements = session
+    plan = Plan(name="plan")
+    card = Card(number="123", plan=plan, updated=datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC))
+    db_session.add(card)
+    db_session.flush()
+    db_session.expire(card, ["barcode", "plan_id"])
+    statements.clear()
+
+    payload, related = MapperHistoryExtractor(inspect(Card)).extract(card)
+
+    assert not statements
+    assert payload == {"id": card.id, "number": "123", "updated": "2024-01-02T03:04:05.000000+0000"}
+    assert related == {}
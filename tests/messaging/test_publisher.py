@@ -0,0 +1,236 @@
+import json
+import threading
+import typing
+
+import kombu.exceptions
+import pytest
+from pydantic import ValidationError
+from pytest_mock import MockerFixture
+
+from angelia.messaging import sender
+from angelia.messaging.publisher import AsyncPublisher, OverflowPolicy
+from angelia.messaging.sender import get_publisher, send_message_to_hermes
+from angelia.messaging.spool import Spool
+from angelia.settings import Settings, settings
+from tests.helpers.producer import RecordingProducer
+
+if typing.TYPE_CHECKING:
+    from pathlib import Path
+
+
+def make_message(n: int) -> dict:
+    return {"payload": {"n": n}, "headers": {"X-http-path": "test"}}
+
+
+class BlockingPublish:
+    """Records published messages, holding the publisher thread on its first message until released"""
+
+    def __init__(self) -> None:
+        self.published: list[dict] = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, message: dict) -> None:
+        self.started.set()
+        self.release.wait(timeout=5)
+        self.published.append(message)
+
+
+def make_spool(tmp_path: "Path") -> Spool:
+    return Spool(
+        str(tmp_path / "spool"), lambda _: None, segment_max_bytes=1024, fsync_batch_size=1, replay_interval=60
+    )
+
+
+def spooled_numbers(tmp_path: "Path") -> list[int]:
+    return [
+        json.loads(line)["message"]["payload"]["n"]
+        for path in sorted((tmp_path / "spool").glob("*.seg"))
+        for line in path.read_text().splitlines()
+    ]
+
+
+@pytest.fixture
+def hermes_publisher() -> typing.Generator[None, None, None]:
+    yield
+    if sender._publisher is not None:
+        sender._publisher.stop()
+        sender._publisher = None
+
+
+def make_publisher(publish: typing.Callable[[dict], None], tmp_path: "Path", **kwargs: typing.Any) -> AsyncPublisher:
+    options = {
+        "max_size": 2,
+        "overflow_policy": OverflowPolicy.BLOCK,
+        "spool": make_spool(tmp_path),
+        "block_timeout": 0.01,
+        "drain_timeout": 5,
+        "retry_interval": 0.01,
+    } | kwargs
+    return AsyncPublisher(publish, **options)
+
+
+def wait_for_published(published: list[dict], count: int) -> None:
+    for _ in range(500):
+        if len(published) >= count:
+            return
+        threading.Event().wait(0.01)
+
+
+def fill_queue(publisher: AsyncPublisher, publish: BlockingPublish, count: int) -> None:
+    """Puts count messages after the first is taken by the publisher thread"""
+    publisher.put(make_message(0))
+    assert publish.started.wait(timeout=5)
+    for n in range(1, count + 1):
+        publisher.put(make_message(n))
+
+
+def published_numbers(published: list[dict]) -> list[int]:
+    return [message["payload"]["n"] for message in published]
+
+
+def test_publisher_publishes_in_order_and_drains_on_stop(tmp_path: "Path") -> None:
+    published: list[dict] = []
+    publisher = make_publisher(published.append, tmp_path, max_size=100)
+
+    for n in range(50):
+        publisher.put(make_message(n))
+    publisher.stop()
+
+    assert published_numbers(published) == list(range(50))
+
+
+def test_publisher_block_policy_drops_message_after_timeout(tmp_path: "Path") -> None:
+    publish = BlockingPublish()
+    publisher = make_publisher(publish, tmp_path, overflow_policy=OverflowPolicy.BLOCK)
+
+    fill_queue(publisher, publish, 3)
+    publish.release.set()
+    publisher.stop()
+
+    assert published_numbers(publish.published) == [0, 1, 2]
+
+
+def test_publisher_drop_oldest_policy(tmp_path: "Path") -> None:
+    publish = BlockingPublish()
+    publisher = make_publisher(publish, tmp_path, overflow_policy=OverflowPolicy.DROP_OLDEST)
+
+    fill_queue(publisher, publish, 4)
+    publish.release.set()
+    publisher.stop()
+
+    assert published_numbers(publish.published) == [0, 3, 4]
+
+
+def test_publisher_spill_policy(tmp_path: "Path") -> None:
+    publish = BlockingPublish()
+    publisher = make_publisher(publish, tmp_path, overflow_policy=OverflowPolicy.SPILL)
+
+    fill_queue(publisher, publish, 4)
+    publish.release.set()
+    publisher.stop()
+
+    assert published_numbers(publish.published) == [0, 1, 2]
+    assert spooled_numbers(tmp_path) == [3, 4]
+
+
+def test_publisher_retries_when_broker_unavailable(tmp_path: "Path") -> None:
+    published: list[dict] = []
+    attempts = []
+
+    def flaky_publish(message: dict) -> None:
+        attempts.append(message)
+        if len(attempts) == 1:
+            raise kombu.exceptions.OperationalError("down")
+        published.append(message)
+
+    publisher = make_publisher(flaky_publish, tmp_path, max_size=10)
+    publisher.put(make_message(0))
+    publisher.put(make_message(1))
+    wait_for_published(published, 2)
+    publisher.stop()
+
+    assert published_numbers(published) == [0, 1]
+    assert published_numbers(attempts) == [0, 0, 1]
+
+
+def test_publisher_spills_queue_left_on_stop(tmp_path: "Path") -> None:
+    def broker_down(message: dict) -> None:
+        raise kombu.exceptions.OperationalError("down")
+
+    publisher = make_publisher(
+        broker_down, tmp_path, max_size=10, overflow_policy=OverflowPolicy.SPILL, drain_timeout=0.1
+    )
+    for n in range(3):
+        publisher.put(make_message(n))
+    publisher.stop()
+
+    assert spooled_numbers(tmp_path) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("publish_async", [True, False])
+def test_send_message_to_hermes_publish_async(publish_async: bool, mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "PUBLISH_ASYNC", publish_async)
+    mock_publisher = mocker.patch("angelia.messaging.sender.get_publisher")
+    mock_sending_service = mocker.patch("angelia.messaging.sender.sending_service")
+
+    send_message_to_hermes("test_path", {"key": "value"})
+
+    producer = mock_sending_service.queues["HERMES"]
+    if publish_async:
+        message = mock_publisher.return_value.put.call_args.args[0]
+        assert message["headers"]["X-http-path"] == "test_path"
+        assert message["payload"]["key"] == "value"
+        producer.send_message.assert_not_called()
+    else:
+        mock_publisher.assert_not_called()
+        assert producer.send_message.call_args.kwargs["headers"]["X-http-path"] == "test_path"
+
+
+@pytest.mark.usefixtures("hermes_publisher")
+@pytest.mark.parametrize(
+    ("overflow_policy", "spool_enabled", "spool_used"),
+    [("block", False, False), ("drop_oldest", False, False), ("block", True, True), ("spill", False, True)],
+)
+def test_spool_only_started_when_used(
+    overflow_policy: str, spool_enabled: bool, spool_used: bool, mocker: MockerFixture
+) -> None:
+    mocker.patch.object(settings, "PUBLISH_OVERFLOW_POLICY", overflow_policy)
+    mocker.patch.object(settings, "SPOOL_ENABLED", spool_enabled)
+
+    publisher = get_publisher()
+
+    assert (publisher.spool is not None) == spool_used
+    assert (sender._spool is not None) == spool_used
+
+
+def test_spill_policy_needs_spool() -> None:
+    with pytest.raises(ValueError, match="spool"):
+        AsyncPublisher(
+            lambda _: None,
+            max_size=2,
+            overflow_policy=OverflowPolicy.SPILL,
+            spool=None,
+            block_timeout=0.01,
+            drain_timeout=5,
+        )
+
+    with pytest.raises(ValidationError):
+        Settings(PUBLISH_OVERFLOW_POLICY="spill", SPOOL_DIR="")
+
+
+@pytest.mark.usefixtures("hermes_publisher")
+def test_publisher_thread_and_replayer_publishes_not_interleaved(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "PUBLISH_ASYNC", True)
+    producer = RecordingProducer()
+    mocker.patch("angelia.messaging.sender.sending_service").queues = {"HERMES": producer}
+
+    for n in range(20):
+        send_message_to_hermes("queued", {"n": n})
+    # as the spool's replayer publishing while the publisher thread works through its queue
+    for n in range(20):
+        sender.publish_message(make_message(n))
+    get_publisher().stop()
+
+    assert len(producer.sent) == 40
+    assert producer.max_in_flight == 1
@@ -0,0 +1,166 @@
+import threading
+import typing
+
+import kombu.exceptions
+import pytest
+from pydantic import ValidationError
+from pytest_mock import MockerFixture
+
+from angelia.messaging import sender
+from angelia.messaging.sender import send_message_to_hermes
+from angelia.messaging.spool import Spool
+from angelia.settings import Settings, settings
+from tests.helpers.producer import RecordingProducer
+
+if typing.TYPE_CHECKING:
+    from pathlib import Path
+
+
+def make_message(n: int) -> dict:
+    return {"payload": {"n": n}, "headers": {"X-http-path": "test"}}
+
+
+def published_numbers(published: list[dict]) -> list[int]:
+    return [message["payload"]["n"] for message in published]
+
+
+def make_spool(tmp_path: "Path", publish: typing.Callable[[dict], None], **kwargs: typing.Any) -> Spool:
+    options = {"segment_max_bytes": 1024 * 1024, "fsync_batch_size": 1, "replay_interval": 60} | kwargs
+    return Spool(str(tmp_path / "spool"), publish, **options)
+
+
+def test_spool_replays_messages_in_order(tmp_path: "Path") -> None:
+    published: list[dict] = []
+    # small segments so the messages are spread over several
+    spool = make_spool(tmp_path, published.append, segment_max_bytes=200)
+
+    for n in range(10):
+        spool.append([make_message(n)])
+    assert len(spool.segments()) > 1
+
+    assert spool.replay() == 10
+    assert published_numbers(published) == list(range(10))
+    assert not spool.segments()
+
+
+def test_spool_replay_resumes_after_broker_failure(tmp_path: "Path") -> None:
+    published: list[dict] = []
+    broker_up = False
+
+    def publish(message: dict) -> None:
+        if not broker_up and message["payload"]["n"] == 2:
+            raise kombu.exceptions.OperationalError("down")
+        published.append(message)
+
+    spool = make_spool(tmp_path, publish)
+    spool.append([make_message(n) for n in range(5)])
+
+    assert spool.replay() == 2
+    assert len(spool.segments()) == 1
+
+    broker_up = True
+    assert spool.replay() == 3
+    assert published_numbers(published) == [0, 1, 2, 3, 4]
+    assert not spool.segments()
+
+
+def test_spool_replays_segments_left_by_another_spool(tmp_path: "Path") -> None:
+    published: list[dict] = []
+    exited_worker_spool = make_spool(tmp_path, published.append)
+    exited_worker_spool.append([make_message(0), make_message(1)])
+    spool = make_spool(tmp_path, published.append)
+
+    # the segment is locked while the other spool could still be writing to it
+    assert spool.replay() == 0
+
+    exited_worker_spool._close_segment()
+    assert spool.replay() == 2
+    assert published_numbers(published) == [0, 1]
+
+
+def test_spool_skips_partly_written_lines(tmp_path: "Path") -> None:
+    published: list[dict] = []
+    spool = make_spool(tmp_path, published.append)
+    spool.append([make_message(0)])
+    with spool.segments()[0].open("a") as segment:
+        segment.write('{"spooled_at": 1, "message": {"payl')
+
+    assert spool.replay() == 1
+    assert published_numbers(published) == [0]
+    assert not spool.segments()
+
+
+def test_send_message_to_hermes_spools_when_broker_unavailable(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "PUBLISH_ASYNC", False)
+    mocker.patch.object(settings, "SPOOL_ENABLED", True)
+    mock_sending_service = mocker.patch("angelia.messaging.sender.sending_service")
+    producer = mock_sending_service.queues["HERMES"]
+    producer.send_message.side_effect = kombu.exceptions.OperationalError("down")
+
+    send_message_to_hermes("test_path", {"key": "value"})
+
+    producer.send_message.side_effect = None
+    assert sender.get_spool().replay() == 1
+    assert producer.send_message.call_count == 2
+    replayed = producer.send_message.call_args.kwargs
+    assert replayed["headers"]["X-http-path"] == "test_path"
+    assert replayed["payload"]["key"] == "value"
+
+
+def test_send_message_to_hermes_spools_behind_pending_messages(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "PUBLISH_ASYNC", False)
+    mocker.patch.object(settings, "SPOOL_ENABLED", True)
+    mock_sending_service = mocker.patch("angelia.messaging.sender.sending_service")
+    producer = mock_sending_service.queues["HERMES"]
+    producer.send_message.side_effect = kombu.exceptions.OperationalError("down")
+    send_message_to_hermes("first", {})
+    assert sender.get_spool().pending
+
+    # the broker is back but the spooled message must be sent first
+    producer.send_message.side_effect = None
+    send_message_to_hermes("second", {})
+    assert producer.send_message.call_count == 1
+
+    assert sender.get_spool().replay() == 2
+    assert not sender.get_spool().pending
+    paths = [call.kwargs["headers"]["X-http-path"] for call in producer.send_message.call_args_list[1:]]
+    assert paths == ["first", "second"]
+
+    send_message_to_hermes("third", {})
+    assert producer.send_message.call_count == 4
+
+
+def test_send_message_to_hermes_raises_for_caller_to_retry(mocker: MockerFixture) -> None:
+    mocker.patch.object(settings, "PUBLISH_ASYNC", False)
+    mocker.patch.object(settings, "SPOOL_ENABLED", True)
+    mock_sending_service = mocker.patch("angelia.messaging.sender.sending_service")
+    mock_sending_service.queues["HERMES"].send_message.side_effect = kombu.exceptions.OperationalError("down")
+
+    with pytest.raises(kombu.exceptions.OperationalError):
+        send_message_to_hermes("test_path", {}, spool_failed=False)
+
+    assert not sender.get_spool().pending
+    assert not sender.get_spool().segments()
+
+
+def test_spool_dir_required_when_enabled() -> None:
+    with pytest.raises(ValidationError):
+        Settings(SPOOL_ENABLED=True, SPOOL_DIR="")
+
+
+def test_replay_and_request_publishes_not_interleaved(mocker: MockerFixture) -> None:
+    producer = RecordingProducer()
+    mocker.patch("angelia.messaging.sender.sending_service").queues = {"HERMES": producer}
+    spool = sender.get_spool()
+    for n in range(20):
+        spool.append([make_message(n)])
+
+    replayer = threading.Thread(target=spool.replay)
+    replayer.start()
+    # as a request thread publishing while the replayer runs
+    for n in range(20, 40):
+        sender.publish_message(make_message(n))
+    replayer.join()
+
+    assert len(producer.sent) == 40
+    assert producer.max_in_flight == 1
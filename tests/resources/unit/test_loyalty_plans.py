@@ -1,8 +1,12 @@
 from unittest.mock import MagicMock, patch
 
-from falcon import HTTP_200, HTTP_404
+import pytest
+from falcon import HTTP_200, HTTP_304, HTTP_404
+from pytest_mock import MockerFixture
 
+from angelia.hermes.db import DB, ReplicaLagMonitor
 from angelia.hermes.models import Scheme
+from angelia.settings import settings
 from tests.helpers.authenticated_request import get_authenticated_request
 
 journey_fields_resp_data = {
@@ -77,3 +81,106 @@ def test_get_all_plans_overview(mock_get_all_plans_overview: MagicMock, loyalty_
     )
     assert mock_get_all_plans_overview.called
     assert resp.status == HTTP_200
+
+
+@patch("angelia.resources.loyalty_plans.LoyaltyPlansHandler.get_all_plans")
+def test_get_all_plans_not_modified(mock_get_all_plans: MagicMock, loyalty_plan: Scheme) -> None:
+    mock_get_all_plans.return_value = [loyalty_plan]
+    resp = get_authenticated_request(path="/v2/loyalty_plans", method="GET", user_id=1, channel="com.test.channel")
+    assert resp.status == HTTP_200
+    etag = resp.headers["ETag"]
+
+    resp = get_authenticated_request(
+        path="/v2/loyalty_plans", method="GET", user_id=1, channel="com.test.channel", headers={"If-None-Match": etag}
+    )
+    assert resp.status == HTTP_304
+    assert resp.headers["ETag"] == etag
+    assert not resp.content
+
+    mock_get_all_plans.return_value = [{**loyalty_plan, "loyalty_plan_id": 2}]
+    resp = get_authenticated_request(
+        path="/v2/loyalty_plans", method="GET", user_id=1, channel="com.test.channel", headers={"If-None-Match": etag}
+    )
+    assert resp.status == HTTP_200
+    assert resp.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    ("path", "plans_fixture", "build_method"),
+    (
+        ("/v2/loyalty_plans", "loyalty_plan", "_build_plan_catalogue"),
+        ("/v2/loyalty_plans_overview", "loyalty_plan_overview", "_build_plan_catalogue_overview"),
+    ),
+)
+def test_get_all_plans_json_fragments_match_media_response(
+    path: str, plans_fixture: str, build_method: str, mocker: MockerFixture, request: pytest.FixtureRequest
+) -> None:
+    mocker.patch.object(settings, "PLAN_CATALOGUE_CACHE_ENABLED", True)
+    plan = request.getfixturevalue(plans_fixture)
+    other_plan = {**plan, "loyalty_plan_id": plan["loyalty_plan_id"] + 1}
+    mock_build = mocker.patch(
+        f"angelia.resources.loyalty_plans.LoyaltyPlansHandler.{build_method}", return_value=[plan, other_plan]
+    )
+    mock_in_wallet = mocker.patch("angelia.resources.loyalty_plans.LoyaltyPlansHandler._fetch_plan_ids_in_wallet")
+
+    responses = []
+    for json_fragments in (False, True, True):
+        mocker.patch.object(settings, "PLAN_CATALOGUE_JSON_FRAGMENTS", json_fragments)
+        mock_in_wallet.return_value = [(other_plan["loyalty_plan_id"],)]
+        resp = get_authenticated_request(path=path, method="GET", user_id=1, channel="com.test.channel")
+        assert resp.status == HTTP_200
+        responses.append(resp.content)
+
+    assert responses[0] == responses[1] == responses[2]
+    assert [item["is_in_wallet"] for item in resp.json] == [False, True]
+    # built once for each response mode then served from the catalogue cache
+    assert mock_build.call_count == 2
+
+
+@pytest.mark.parametrize(("replica_lag", "database"), [(1.0, "replica"), (10.0, "primary"), (None, "primary")])
+def test_get_journey_fields_routed_to_read_replica_within_max_lag(
+    replica_lag: float | None, database: str, mocker: MockerFixture
+) -> None:
+    mocker.patch(
+        "angelia.resources.loyalty_plans.LoyaltyPlanHandler.get_journey_fields"
+    ).return_value = journey_fields_resp_data
+    monitor = ReplicaLagMonitor(MagicMock(), max_lag=5.0, check_interval=60)
+    mocker.patch.object(monitor, "measure").return_value = replica_lag
+    mocker.patch.object(DB(), "replica_lag", monitor)
+    mock_read_session = mocker.patch.object(DB(), "ReadSession")
+    mock_open_write = mocker.spy(DB(), "open_write")
+
+    resp = get_authenticated_request(
+        path="/v2/loyalty_plans/105/journey_fields", method="GET", user_id=1, channel="com.test.channel"
+    )
+
+    assert resp.status == HTTP_200
+    assert mock_read_session.called == (database == "replica")
+    if database == "primary":
+        mock_open_write.assert_called_once_with(reason="replica_lag")
+
+
+@pytest.mark.parametrize(
+    ("path", "handler_method"),
+    [
+        ("/v2/loyalty_plans", "LoyaltyPlansHandler.get_all_plans"),
+        ("/v2/loyalty_plans_overview", "LoyaltyPlansHandler.get_all_plans_overview"),
+        ("/v2/loyalty_plans/1", "LoyaltyPlanHandler.get_plan"),
+    ],
+)
+def test_get_plans_read_from_primary(path: str, handler_method: str, loyalty_plan: dict, mocker: MockerFixture) -> None:
+    # is_in_wallet must include a loyalty card added by the user's previous request, which the replica may not have
+    mocker.patch.object(settings, "PLAN_CATALOGUE_JSON_FRAGMENTS", False)
+    plans = loyalty_plan if handler_method.endswith("get_plan") else [loyalty_plan]
+    mocker.patch(f"angelia.resources.loyalty_plans.{handler_method}").return_value = plans
+    monitor = ReplicaLagMonitor(MagicMock(), max_lag=5.0, check_interval=60)
+    mocker.patch.object(monitor, "measure").return_value = 1.0
+    mocker.patch.object(DB(), "replica_lag", monitor)
+    mock_read_session = mocker.patch.object(DB(), "ReadSession")
+    mock_open_write = mocker.spy(DB(), "open_write")
+
+    resp = get_authenticated_request(path=path, method="GET", user_id=1, channel="com.test.channel")
+
+    assert resp.status == HTTP_200
+    mock_read_session.assert_not_called()
+    mock_open_write.assert_called_once_with(reason="read_your_writes")
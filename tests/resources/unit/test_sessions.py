@@ -0,0 +1,28 @@
+import pytest
+from falcon import HTTP_200, HTTP_204, HTTP_401
+from pytest_mock import MockerFixture
+
+from angelia.hermes.db import DB
+from tests.helpers.authenticated_request import get_client
+
+
+@pytest.mark.parametrize(("path", "status"), [("/livez", HTTP_204), ("/metrics", HTTP_200)])
+def test_no_db_resources_do_not_open_session(path: str, status: str, mocker: MockerFixture) -> None:
+    mock_open = mocker.spy(DB(), "open")
+
+    resp = get_client().simulate_get(path)
+
+    assert resp.status == status
+    mock_open.assert_not_called()
+
+
+def test_session_not_created_for_request_failing_authentication(mocker: MockerFixture) -> None:
+    mock_session = mocker.patch.object(DB(), "Session", wraps=DB().Session)
+    mock_read_session = mocker.patch.object(DB(), "ReadSession", wraps=DB().ReadSession)
+
+    resp = get_client().simulate_get("/v2/loyalty_plans", headers={"Authorization": "bearer invalid"})
+
+    assert resp.status == HTTP_401
+    mock_session.assert_not_called()
+    mock_read_session.assert_not_called()
+    assert not DB().session_opened
@@ -1,6 +1,7 @@
-from falcon import HTTP_200, HTTP_403
+from falcon import HTTP_200, HTTP_304, HTTP_403
 from pytest_mock import MockerFixture
 
+from angelia.hermes.db import DB
 from tests.handlers.test_wallet_handler import expected_balances, expected_transactions
 from tests.helpers.authenticated_request import get_authenticated_request
 
@@ -15,6 +16,39 @@ def test_empty_wallet(mocker: MockerFixture) -> None:
     assert resp.status_code == 200
 
 
+def test_wallet_not_modified_skips_responder(mocker: MockerFixture) -> None:
+    mocked_resp = mocker.patch("angelia.handlers.wallet.WalletHandler.get_wallet_response")
+    mocked_resp.return_value = {"joins": [], "loyalty_cards": [], "payment_accounts": []}
+    mocked_version = mocker.patch("angelia.handlers.wallet.WalletHandler.get_wallet_version_token")
+    mocked_version.return_value = "1:com.test.channel:a:b:c"
+    mock_send_event = mocker.patch("angelia.handlers.wallet.WalletHandler.send_to_hermes_view_wallet_event")
+
+    resp = get_authenticated_request(path="/v2/wallet", method="GET")
+    assert resp.status == HTTP_200
+    etag = resp.headers["ETag"]
+
+    resp = get_authenticated_request(path="/v2/wallet", method="GET", headers={"If-None-Match": etag})
+    assert resp.status == HTTP_304
+    assert not resp.content
+    assert mocked_resp.call_count == 1
+    assert mock_send_event.call_count == 2
+
+    # the overview has its own etag for the same wallet version
+    mocker.patch("angelia.handlers.wallet.WalletHandler.get_overview_wallet_response").return_value = {
+        "joins": [],
+        "loyalty_cards": [],
+        "payment_accounts": [],
+    }
+    resp = get_authenticated_request(path="/v2/wallet_overview", method="GET", headers={"If-None-Match": etag})
+    assert resp.status == HTTP_200
+
+    mocked_version.return_value = "1:com.test.channel:a:b:d"
+    resp = get_authenticated_request(path="/v2/wallet", method="GET", headers={"If-None-Match": etag})
+    assert resp.status == HTTP_200
+    assert resp.headers["ETag"] != etag
+    assert mocked_resp.call_count == 2
+
+
 def test_loyalty_cards_in_wallet(mocker: MockerFixture) -> None:
     mocked_resp = mocker.patch("angelia.handlers.wallet.WalletHandler.get_wallet_response")
     loyalty_cards = [
@@ -526,3 +560,17 @@ def test_get_payment_account_channel_links_response_forbidden() -> None:
         is_trusted_channel=False,
     )
     assert resp.status == HTTP_403
+
+
+def test_wallet_uses_primary_database(mocker: MockerFixture) -> None:
+    mocked_resp = mocker.patch("angelia.handlers.wallet.WalletHandler.get_wallet_response")
+    mocked_resp.return_value = {"joins": [], "loyalty_cards": [], "payment_accounts": []}
+    mock_open_read = mocker.spy(DB(), "open_read")
+    mock_open_write = mocker.spy(DB(), "open_write")
+
+    resp = get_authenticated_request(path="/v2/wallet", method="GET")
+
+    assert resp.status == HTTP_200
+    # the wallet must show changes the user has just made, which the replica may not have yet
+    mock_open_write.assert_called_once_with(reason="read_your_writes")
+    mock_open_read.assert_not_called()